@@ -69,12 +69,18 @@ WMStats.namespace('JobDetailList');
             
             htmlstr += "<li><b>Lumis:</b>"
             
-            for (var i in jobDoc.lumis) {
-                for (var j in jobDoc.lumis[i]) {
-                    htmlstr += jobDoc.lumis[i][j] + " "
+            for (var run in jobDoc.lumis) {
+                htmlstr += run + ": ";
+                for (var i in jobDoc.lumis[run]) {
+                    var lumiRange = jobDoc.lumis[run][i];
+                    if (lumiRange[0] == lumiRange[1]) {
+                        htmlstr += lumiRange[0] + " ";
+                    } else {
+                        htmlstr += lumiRange[0] + "-" + lumiRange[1] + " ";
+                    }
                 }
                 htmlstr +=  "\n "
-            } 
+            }
             htmlstr += "</li>";
             
             htmlstr += "<li><b>Output:</b> " 
@@ -119,7 +119,7 @@ class DBSBufferFile(WMBSBase, WMFile):
         action = self.daoFactory(classname = "DBSBufferFiles.GetRunLumiFile")
         runs = action.execute(self["lfn"], conn = self.getDBConn(),
                               transaction = self.existingTransaction())
-        [self.addRun(run=Run(r, *runs[r])) for r in runs.keys()]
+        self.addRuns([Run(r, *runs[r]) for r in runs.keys()])
 
         action = self.daoFactory(classname = "DBSBufferFiles.GetLocation")
         self["locations"] = action.execute(self["lfn"], conn = self.getDBConn(),
@@ -429,7 +429,7 @@ class DBSBufferFile(WMBSBase, WMFile):
                               transaction = self.existingTransaction())
 
         self["runs"].clear()
-        [self.addRun(run=Run(r, *runs[r])) for r in runs.keys()]
+        self.addRuns([Run(r, *runs[r]) for r in runs.keys()])
 
         self.commitTransaction(existingTransaction)
         return
@@ -30,7 +30,8 @@ from WMCore.WMBS.File       import File
 from WMCore.WMBS.Job        import Job
 from WMCore.WMBS.JobGroup   import JobGroup
 
-from WMCore.JobStateMachine.ChangeState import ChangeState
+from WMCore.JobStateMachine.ChangeState import ChangeState, digestReport
+from WMCore.Services.Dashboard.DashboardReporter import DashboardReporter
 from WMComponent.DBS3Buffer.DBSBufferFile import DBSBufferFile
 from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
 
@@ -42,6 +43,143 @@ class AccountantWorkerException(WMException):
     """
 
 
+def createMissingFWKJR(errorCode = 999, errorDescription = 'Failure of unknown type'):
+    """
+    _createMissingFWKJR_
+
+    Create a failed report for a job whose framework job report can't be
+    found or loaded.
+    """
+    report = Report()
+    report.addError("cmsRun1", 84, errorCode, errorDescription)
+    report.data.cmsRun1.status = "Failed"
+    return report
+
+def loadJobReport(parameters):
+    """
+    _loadJobReport_
+
+    Given a framework job report on disk, load it and return a
+    FwkJobReport instance.  If there is any problem loading or parsing the
+    framework job report return a failed report instead.
+    """
+    # The jobReportPath may be prefixed with "file://" which needs to be
+    # removed so it doesn't confuse the FwkJobReport() parser.
+    jobReportPath = parameters.get("fwjr_path", None)
+    if not jobReportPath:
+        logging.error("Bad FwkJobReport Path: %s" % jobReportPath)
+        return createMissingFWKJR(99999, "FWJR path is empty")
+
+    jobReportPath = jobReportPath.replace("file://","")
+    if not os.path.exists(jobReportPath):
+        logging.error("Bad FwkJobReport Path: %s" % jobReportPath)
+        return createMissingFWKJR(99999, 'Cannot find file in jobReport path: %s' % jobReportPath)
+
+    if os.path.getsize(jobReportPath) == 0:
+        logging.error("Empty FwkJobReport: %s" % jobReportPath)
+        return createMissingFWKJR(99998, 'jobReport of size 0: %s ' % jobReportPath)
+
+    jobReport = Report()
+
+    try:
+        jobReport.load(jobReportPath)
+    except Exception, ex:
+        msg =  "Error loading jobReport %s\n" % jobReportPath
+        msg += str(ex)
+        logging.error(msg)
+        logging.debug("Failing job: %s\n" % parameters)
+        return createMissingFWKJR(99997, 'Cannot load jobReport')
+
+    if len(jobReport.listSteps()) == 0:
+        logging.error("FwkJobReport with no steps: %s" % jobReportPath)
+        return createMissingFWKJR(99997, 'jobReport with no steps: %s ' % jobReportPath)
+
+    return jobReport
+
+def didJobSucceed(jobReport):
+    """
+    _didJobSucceed_
+
+    Get the status of the jobReport.  This will loop through all the steps
+    and make sure the status is 'Success'.  If a step does not return
+    'Success', the job will fail.
+    """
+    if not hasattr(jobReport, 'data'):
+        return False
+
+    if not hasattr(jobReport.data, 'steps'):
+        return False
+
+    if not jobReport.taskSuccessful():
+        return False
+
+    return True
+
+def fileRecord(fwjrFile):
+    """
+    _fileRecord_
+
+    Turn an output file pulled out of a framework job report into a plain
+    dictionary, with its runs as (run, lumis) tuples and without the
+    reference into the report.
+    """
+    record = dict(fwjrFile)
+    del record["fileRef"]
+    record["runs"] = [(run.run, list(run.lumis)) for run in fwjrFile["runs"]]
+    record["locations"] = list(fwjrFile["locations"])
+    return record
+
+def recordFile(record):
+    """
+    _recordFile_
+
+    Give back its runs and locations to an output file made plain by
+    fileRecord().
+    """
+    record["runs"] = set([Run(run, *lumis) for (run, lumis) in record["runs"]])
+    record["locations"] = set(record["locations"])
+    return record
+
+def digestJobReport(job, maxInputFiles = None, maxSummaryFiles = None,
+                    maxErrorLength = None, returnReport = False):
+    """
+    _digestJobReport_
+
+    Load the framework job report of a complete job and pull out of it what
+    the accountant records: the outcome, the task and the output files, with
+    their runs and lumis, checksums and locations.  Failed jobs only keep the
+    output of the log archive step.  The couch documents and the dashboard
+    information of the report are built here too, in the fwjr_digest, with
+    the limits of the ChangeState.  This doesn't touch the database so it can
+    be run in the loader processes of the JobAccountantPoller.
+
+    The record is made of plain python types so it is cheap to send to
+    another process.  The report itself is only added if returnReport is set.
+    """
+    logging.info("Handling %s" % job["fwjr_path"])
+
+    jobReport = loadJobReport(job)
+    jobReport.setJobID(job["id"])
+    jobSuccess = didJobSucceed(jobReport)
+
+    if jobSuccess:
+        fileList = jobReport.getAllFiles()
+    else:
+        fileList = jobReport.getAllFilesFromStep(step = 'logArch1')
+
+    record = {"id": job["id"], "fwjr_path": job["fwjr_path"],
+              "jobSuccess": jobSuccess, "task": jobReport.getTaskName(),
+              "files": [fileRecord(x) for x in fileList]}
+
+    fwjrDigest = digestReport(jobReport, maxInputFiles, maxSummaryFiles,
+                              maxErrorLength)
+    fwjrDigest["dashboard"] = DashboardReporter.stepPackages(jobReport)
+    record["fwjr_digest"] = fwjrDigest
+
+    if returnReport:
+        record["report"] = jobReport
+    return record
+
 class AccountantWorker(WMConnectionBase):
     """
     Class that actually does the work of parsing FWJRs for the Accountant
@@ -93,6 +231,11 @@ class AccountantWorker(WMConnectionBase):
 
         self.stateChanger = ChangeState(config)
 
+        # Limits the ChangeState puts on the couch documents of the reports
+        self.digestArgs = {"maxInputFiles": self.stateChanger.maxUploadedInputFiles,
+                           "maxSummaryFiles": self.stateChanger.maxSummaryFiles,
+                           "maxErrorLength": self.stateChanger.maxSummaryErrorLength}
+
         # Decide whether or not to attach jobReport to returned value
         self.returnJobReport = getattr(config.JobAccountant, 'returnReportFromWorker', False)
 
@@ -136,101 +279,53 @@ class AccountantWorker(WMConnectionBase):
         gc.collect()
         return
 
-    def loadJobReport(self, parameters):
-        """
-        _loadJobReport_
-
-        Given a framework job report on disk, load it and return a
-        FwkJobReport instance.  If there is any problem loading or parsing the
-        framework job report return None.
-        """
-        # The jobReportPath may be prefixed with "file://" which needs to be
-        # removed so it doesn't confuse the FwkJobReport() parser.
-        jobReportPath = parameters.get("fwjr_path", None)
-        if not jobReportPath:
-            logging.error("Bad FwkJobReport Path: %s" % jobReportPath)
-            return self.createMissingFWKJR(parameters, 99999, "FWJR path is empty")
-
-        jobReportPath = jobReportPath.replace("file://","")
-        if not os.path.exists(jobReportPath):
-            logging.error("Bad FwkJobReport Path: %s" % jobReportPath)
-            return self.createMissingFWKJR(parameters, 99999, 'Cannot find file in jobReport path: %s' % jobReportPath)
-
-        if os.path.getsize(jobReportPath) == 0:
-            logging.error("Empty FwkJobReport: %s" % jobReportPath)
-            return self.createMissingFWKJR(parameters, 99998, 'jobReport of size 0: %s ' % jobReportPath)
-
-        jobReport = Report()
-
-        try:
-            jobReport.load(jobReportPath)
-        except Exception, ex:
-            msg =  "Error loading jobReport %s\n" % jobReportPath
-            msg += str(ex)
-            logging.error(msg)
-            logging.debug("Failing job: %s\n" % parameters)
-            return self.createMissingFWKJR(parameters, 99997, 'Cannot load jobReport')
-
-        if len(jobReport.listSteps()) == 0:
-            logging.error("FwkJobReport with no steps: %s" % jobReportPath)
-            return self.createMissingFWKJR(parameters, 99997, 'jobReport with no steps: %s ' % jobReportPath)
-
-        return jobReport
-
-    def didJobSucceed(self, jobReport):
+    def __call__(self, parameters):
         """
-        _didJobSucceed_
+        __call__
 
-        Get the status of the jobReport.  This will loop through all the steps
-        and make sure the status is 'Success'.  If a step does not return
-        'Success', the job will fail.
+        Handle a completed job.  The parameters dictionary will contain the job
+        ID and the path to the framework job report.
         """
-        if not hasattr(jobReport, 'data'):
-            return False
-
-        if not hasattr(jobReport.data, 'steps'):
-            return False
-
-        if not jobReport.taskSuccessful():
-            return False
-
+        records = []
+        for job in parameters:
+            records.append(digestJobReport(job, returnReport = self.returnJobReport,
+                                           **self.digestArgs))
 
-        return True
+        return self.recordJobs(records)
 
-    def __call__(self, parameters):
+    def recordJobs(self, records):
         """
-        __call__
+        _recordJobs_
 
-        Handle a completed job.  The parameters dictionary will contain the job
-        ID and the path to the framework job report.
+        Record the outcome and output of completed jobs in WMBS and DBSBuffer
+        in a single transaction, given the records made out of their framework
+        job reports by digestJobReport().  The records of the jobs are the
+        only input, their reports aren't used here.
         """
         returnList = []
         self.reset()
 
-        for job in parameters:
-            logging.info("Handling %s" % job["fwjr_path"])
-
-            # Load the job and set the ID
-            fwkJobReport = self.loadJobReport(job)
-            fwkJobReport.setJobID(job['id'])
-            jobSuccess = None
-
-            if not self.didJobSucceed(fwkJobReport):
-                logging.error("I have a bad jobReport for %i" %(job['id']))
-                self.handleFailed(jobID = job["id"],
-                                  fwkJobReport = fwkJobReport)
-                jobSuccess = False
+        for record in records:
+            jobSuccess = record["jobSuccess"]
+            fileList   = [recordFile(x) for x in record["files"]]
+
+            if not jobSuccess:
+                logging.error("I have a bad jobReport for %i" %(record['id']))
+                self.handleFailed(jobID = record["id"],
+                                  fwjrDigest = record["fwjr_digest"],
+                                  task = record["task"],
+                                  fileList = fileList)
             else:
-                self.handleSuccessful(jobID = job["id"],
-                                      fwkJobReport = fwkJobReport,
-                                      fwkJobReportPath = job['fwjr_path'])
-                jobSuccess = True
+                self.handleSuccessful(jobID = record["id"],
+                                      fwjrDigest = record["fwjr_digest"],
+                                      task = record["task"],
+                                      fileList = fileList)
 
             if self.returnJobReport:
-                returnList.append({'id': job["id"], 'jobSuccess': jobSuccess,
-                                   'jobReport': fwkJobReport})
+                returnList.append({'id': record["id"], 'jobSuccess': jobSuccess,
+                                   'jobReport': record.get("report", None)})
             else:
-                returnList.append({'id': job["id"], 'jobSuccess': jobSuccess})
+                returnList.append({'id': record["id"], 'jobSuccess': jobSuccess})
             self.count += 1
 
         self.beginTransaction()
@@ -386,7 +481,6 @@ class AccountantWorker(WMConnectionBase):
             fwjrFile["first_event"] = 0
 
         if jobType == "Merge" and fwjrFile["module_label"] != "logArchive":
-            setattr(fwjrFile["fileRef"], 'merged', True)
             fwjrFile["merged"] = True
 
         wmbsFile = self.createFileFromDataStructsFile(file = fwjrFile, jobID = jobID)
@@ -397,18 +491,53 @@ class AccountantWorker(WMConnectionBase):
         return wmbsFile
 
 
-    def _mapLocation(self, fwkJobReport):
-        for file in fwkJobReport.getAllFileRefs():
-            if file and hasattr(file, 'location'):
-                file.location = self.phedex.getBestNodeName(file.location, self.locLists)
+    def _mapLocation(self, fwjrDigest):
+        """
+        _mapLocation_
+
+        Replace the storage element of the output files by the PhEDEx node
+        name in the couch documents of a job.
+        """
+        for jsonStep in fwjrDigest["fwjr"]["steps"].values():
+            for jsonFiles in jsonStep["output"].values():
+                for jsonFile in jsonFiles:
+                    if jsonFile.has_key("location"):
+                        jsonFile["location"] = self.phedex.getBestNodeName(jsonFile["location"],
+                                                                           self.locLists)
+
+        for output in fwjrDigest["summary"]["output"]:
+            if type(output["location"]) == list:
+                output["location"] = [self.phedex.getBestNodeName(x, self.locLists)
+                                      for x in output["location"]]
+            elif output["location"] != None:
+                output["location"] = self.phedex.getBestNodeName(output["location"],
+                                                                 self.locLists)
+        return
 
+    def _markMerged(self, fwjrDigest, fileList):
+        """
+        _markMerged_
 
-    def handleSuccessful(self, jobID, fwkJobReport, fwkJobReportPath = None):
+        Mark the files that were made merged by the accountant as such in the
+        couch fwjr document of a job.
+        """
+        mergedLFNs = set([x["lfn"] for x in fileList if x["merged"]])
+        if len(mergedLFNs) == 0:
+            return
+
+        for jsonStep in fwjrDigest["fwjr"]["steps"].values():
+            for jsonFiles in jsonStep["output"].values():
+                for jsonFile in jsonFiles:
+                    if jsonFile.get("lfn", None) in mergedLFNs:
+                        jsonFile["merged"] = True
+        return
+
+    def handleSuccessful(self, jobID, fwjrDigest, task, fileList):
         """
         _handleSuccessful_
 
-        Handle a successful job, parsing the job report and updating the job in
-        WMBS.
+        Handle a successful job, given the fwjr_digest, the task and the
+        output files pulled out of its report, and update the job in WMBS.
         """
         wmbsJob = Job(id = jobID)
         wmbsJob.load()
@@ -416,7 +545,7 @@ class AccountantWorker(WMConnectionBase):
         wmbsJob.getMask()
         outputID = wmbsJob.loadOutputID()
 
-        wmbsJob["fwjr"] = fwkJobReport
+        wmbsJob["fwjr_digest"] = fwjrDigest
 
         outputMap = self.getOutputMapAction.execute(jobID = jobID,
                                                     conn = self.getDBConn(),
@@ -426,11 +555,9 @@ class AccountantWorker(WMConnectionBase):
                                                 conn = self.getDBConn(),
                                                 transaction = self.existingTransaction())
 
-        fileList = fwkJobReport.getAllFiles()
-
         for fwjrFile in fileList:
             wmbsFile = self.addFileToWMBS(jobType, fwjrFile, wmbsJob["mask"],
-                                          jobID = jobID, task = fwkJobReport.getTaskName())
+                                          jobID = jobID, task = task)
             merged = fwjrFile['merged']
             moduleLabel = fwjrFile["module_label"]
 
@@ -443,19 +570,22 @@ class AccountantWorker(WMConnectionBase):
                 self.filesetAssoc.append({"lfn": wmbsFile["lfn"], "fileset": outputFileset})
 
         # Only save once job is done, and we're sure we made it through okay
-        self._mapLocation(wmbsJob['fwjr'])
+        self._markMerged(fwjrDigest, fileList)
+        self._mapLocation(fwjrDigest)
         self.listOfJobsToSave.append(wmbsJob)
         #wmbsJob.save()
 
         return
 
-    def handleFailed(self, jobID, fwkJobReport):
+    def handleFailed(self, jobID, fwjrDigest, task, fileList):
         """
         _handleFailed_
 
-        Handle a failed job.  Update the job's metadata marking the outcome as
-        'failure' and incrementing the retry count.  Mark all the files used as
-        input for the job as failed.  Finally, update the job's state.
+        Handle a failed job, given the fwjr_digest, the task and the log
+        archive files pulled out of its report.  Update the job's metadata
+        marking the outcome as 'failure' and incrementing the retry count.
+        Mark all the files used as input for the job as failed.  Finally,
+        update the job's state.
         """
         wmbsJob = Job(id = jobID)
         wmbsJob.load()
@@ -465,7 +595,7 @@ class AccountantWorker(WMConnectionBase):
 
         # We'll fake the rest of the state transitions here as the rest of the
         # WMAgent job submission framework is not yet complete.
-        wmbsJob["fwjr"] = fwkJobReport
+        wmbsJob["fwjr_digest"] = fwjrDigest
 
         outputMap = self.getOutputMapAction.execute(jobID = jobID,
                                                     conn = self.getDBConn(),
@@ -475,11 +605,9 @@ class AccountantWorker(WMConnectionBase):
                                                 conn = self.getDBConn(),
                                                 transaction = self.existingTransaction())
 
-        fileList = fwkJobReport.getAllFilesFromStep(step = 'logArch1')
-
         for fwjrFile in fileList:
             wmbsFile = self.addFileToWMBS(jobType, fwjrFile, wmbsJob["mask"],
-                                          jobID = jobID, task = fwkJobReport.getTaskName())
+                                          jobID = jobID, task = task)
             merged = fwjrFile['merged']
             moduleLabel = fwjrFile["module_label"]
 
@@ -491,25 +619,13 @@ class AccountantWorker(WMConnectionBase):
             for outputFileset in outputFilesets:
                 self.filesetAssoc.append({"lfn": wmbsFile["lfn"], "fileset": outputFileset})
 
-        self._mapLocation(wmbsJob['fwjr'])
+        self._markMerged(fwjrDigest, fileList)
+        self._mapLocation(fwjrDigest)
         self.listOfJobsToFail.append(wmbsJob)
 
         return
 
 
-    def createMissingFWKJR(self, parameters, errorCode = 999,
-                           errorDescription = 'Failure of unknown type'):
-        """
-        _createMissingFWJR_
-
-        Create a missing FWJR if the report can't be found by the code in the
-        path location.
-        """
-        report = Report()
-        report.addError("cmsRun1", 84, errorCode, errorDescription)
-        report.data.cmsRun1.status = "Failed"
-        return report
-
     def createFilesInDBSBuffer(self):
         """
         _createFilesInDBSBuffer_
@@ -3,21 +3,29 @@
 _JobAccountantPoller_
 
 Poll WMBS for complete jobs and process their framework job reports.
-"""
-
-
 
+With config.JobAccountant.loaderProcesses set the reports are loaded by a
+pool of loader processes, which send back the records made of them by
+digestJobReport(), while this thread writes the records of the previous slice
+of jobs to the database.  Loading the reports then runs on several cores and
+overlaps with the database work, which is still done by a single writer in
+one transaction per slice.  The records are made of plain python types, the
+reports themselves don't go through the queues.
+"""
 
 import time
 import threading
 import logging
+import traceback
+import Queue
+import multiprocessing
 
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
 
 from WMCore.Agent.Harness import Harness
 from WMCore.DAOFactory import DAOFactory
 
-from WMComponent.JobAccountant.AccountantWorker import AccountantWorker
+from WMComponent.JobAccountant.AccountantWorker import AccountantWorker, digestJobReport
 
 from WMCore.WMException import WMException
 
@@ -30,12 +38,58 @@ class JobAccountantPollerException(WMException):
     from the worker).
     """
 
+def loaderWorker(input, results, digestArgs):
+    """
+    _loaderWorker_
+
+    Get complete jobs from the input, put the records made out of their
+    framework job reports in the results.  Jobs that can't be digested are
+    sent back with the error so the poller can handle them itself.
+    digestArgs are the keyword arguments passed to digestJobReport().
+    """
+    while True:
+        try:
+            job = input.get()
+        except (EOFError, IOError):
+            crashMessage = "Hit EOF/IO in getting new work\n"
+            crashMessage += "Assuming this is a graceful break attempt.\n"
+            logging.error(crashMessage)
+            break
+
+        if job == 'STOP':
+            # Then halt the process
+            break
+
+        try:
+            record = digestJobReport(job, **digestArgs)
+        except Exception, ex:
+            msg =  "Error digesting FWJR for job %s\n" % job["id"]
+            msg += str(ex)
+            logging.error(msg)
+            logging.error(str(traceback.format_exc()))
+            record = {"id": job["id"], "error": msg}
+
+        results.put(record)
+
+    return
+
 class JobAccountantPoller(BaseWorkerThread):
     def __init__(self, config):
         BaseWorkerThread.__init__(self)
         self.config = config
         self.accountantWorkSize = getattr(self.config.JobAccountant,
                                           'accountantWorkSize', 100)
+        self.loaderProcesses = getattr(self.config.JobAccountant,
+                                       'loaderProcesses', 0)
+
+        # Loader processes, the jobs they are working on and the records
+        # they sent back that haven't been written yet
+        self.pool          = []
+        self.input         = None
+        self.results       = None
+        self.pendingJobs   = {}
+        self.loadedRecords = {}
+
         # initialize the alert framework (if available - config.Alert present)
         #    self.sendAlert will be then be available
         self.initAlerts(compName = "JobAccountant")
@@ -74,24 +128,32 @@ class JobAccountantPoller(BaseWorkerThread):
             logging.debug("No work to do; exiting")
             return
 
-        while len(completeJobs) > self.accountantWorkSize:
-            try:
-                jobsSlice = completeJobs[:self.accountantWorkSize]
-                completeJobs = completeJobs[self.accountantWorkSize:]
-                self.accountantWorker(jobsSlice)
-            except WMException:
-                raise
-            except Exception, ex:
-                msg =  "Hit general exception in JobAccountantPoller while using worker.\n"
-                msg += str(ex)
-                logging.error(msg)
-                self.sendAlert(6, msg = msg)
-                logging.debug("jobsSlice:")
-                logging.debug(jobsSlice)
-                raise JobAccountantPollerException(msg)
+        jobSlices = []
+        while len(completeJobs) > 0:
+            jobSlices.append(completeJobs[:self.accountantWorkSize])
+            completeJobs = completeJobs[self.accountantWorkSize:]
 
+        if self.loaderProcesses > 0:
+            self.pipelineSlices(jobSlices)
+        else:
+            for jobsSlice in jobSlices:
+                self.recordSlice(jobsSlice)
+
+        return
+
+    def recordSlice(self, jobsSlice, records = None):
+        """
+        _recordSlice_
+
+        Pass a slice of jobs to the accountant worker, or the records already
+        made out of their reports if there are any.  Roll back the database
+        transaction if it fails.
+        """
         try:
-            self.accountantWorker(completeJobs)
+            if records == None:
+                self.accountantWorker(jobsSlice)
+            else:
+                self.accountantWorker.recordJobs(records)
         except WMException:
             myThread = threading.currentThread()
             if getattr(myThread, 'transaction', None) != None:
@@ -101,12 +163,167 @@ class JobAccountantPoller(BaseWorkerThread):
             myThread = threading.currentThread()
             if getattr(myThread, 'transaction', None) != None:
                 myThread.transaction.rollback()
-            msg =  "Hit general exception in JobAccountantPoller in last worker use.\n"
+            msg =  "Hit general exception in JobAccountantPoller while using worker.\n"
             msg += str(ex)
             logging.error(msg)
             self.sendAlert(6, msg = msg)
-            logging.debug("jobs left:")
-            logging.debug(completeJobs)
+            logging.debug("jobsSlice:")
+            logging.debug(jobsSlice)
             raise JobAccountantPollerException(msg)
 
         return
+
+    def pipelineSlices(self, jobSlices):
+        """
+        _pipelineSlices_
+
+        Have the loader processes work on the next slice of jobs while the
+        records of the current one are written to the database.  Only two
+        slices are in the pipeline at any time so the records waiting to be
+        written don't pile up in memory.
+        """
+        try:
+            self.queueSlice(jobSlices[0])
+            for index in range(len(jobSlices)):
+                if index + 1 < len(jobSlices):
+                    self.queueSlice(jobSlices[index + 1])
+                records = self.collectSlice(jobSlices[index])
+                self.recordSlice(jobSlices[index], records)
+        except:
+            # Anything left in the pipeline is stale, start over next cycle
+            self.close(terminate = True)
+            raise
+
+        return
+
+    def setupPool(self):
+        """
+        _setupPool_
+
+        Start the loader processes if they aren't running.
+        """
+        if len(self.pool) > 0:
+            return
+
+        self.input   = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+
+        for x in range(self.loaderProcesses):
+            proc = multiprocessing.Process(target = loaderWorker,
+                                           args = (self.input, self.results,
+                                                   self.accountantWorker.digestArgs))
+            proc.start()
+            self.pool.append(proc)
+
+        return
+
+    def queueSlice(self, jobsSlice):
+        """
+        _queueSlice_
+
+        Hand a slice of jobs to the loader processes.
+        """
+        self.setupPool()
+        for job in jobsSlice:
+            self.pendingJobs[job["id"]] = job
+            self.input.put(job)
+
+        return
+
+    def collectSlice(self, jobsSlice):
+        """
+        _collectSlice_
+
+        Wait for the records of a slice of jobs and return them in the order
+        of the jobs.  Records of the next slice that arrive in the meantime
+        are kept for later.  Jobs the loaders couldn't digest are digested
+        here, so their errors are handled like without loaders.
+        """
+        records = []
+        for job in jobsSlice:
+            while not self.loadedRecords.has_key(job["id"]):
+                try:
+                    record = self.results.get(timeout = 10)
+                except Queue.Empty:
+                    self.checkPool()
+                    continue
+
+                if not self.pendingJobs.has_key(record["id"]):
+                    # Left over from a previous cycle
+                    continue
+                pendingJob = self.pendingJobs.pop(record["id"])
+                if record.has_key("error"):
+                    record = digestJobReport(pendingJob, **self.accountantWorker.digestArgs)
+                self.loadedRecords[record["id"]] = record
+
+            records.append(self.loadedRecords.pop(job["id"]))
+
+        return records
+
+    def checkPool(self):
+        """
+        _checkPool_
+
+        If a loader process died the jobs it was working on are lost.  Stop
+        the loaders and digest all the pending jobs here, the loaders are
+        started again for the next slice.
+        """
+        for proc in self.pool:
+            if not proc.is_alive():
+                break
+        else:
+            return
+
+        logging.error("JobAccountant loader process %s died, loading %i reports in the poller" \
+                      % (proc.pid, len(self.pendingJobs)))
+        pendingJobs   = self.pendingJobs
+        loadedRecords = self.loadedRecords
+        self.close(terminate = True)
+
+        for job in pendingJobs.values():
+            loadedRecords[job["id"]] = digestJobReport(job, **self.accountantWorker.digestArgs)
+        self.loadedRecords = loadedRecords
+        return
+
+    def close(self, terminate = False):
+        """
+        _close_
+
+        Stop the loader processes, kill them if terminate is set and drop all
+        the work they had.
+        """
+        if not terminate:
+            for proc in self.pool:
+                try:
+                    self.input.put('STOP')
+                except Exception, ex:
+                    logging.debug("Hit exception stopping loader: %s" % str(ex))
+                    terminate = True
+
+        for proc in self.pool:
+            if terminate:
+                proc.terminate()
+            proc.join()
+
+        if self.input != None:
+            if terminate:
+                # Don't wait at exit to flush work nobody will read
+                self.input.cancel_join_thread()
+            self.input.close()
+            self.results.close()
+
+        self.pool          = []
+        self.input         = None
+        self.results       = None
+        self.pendingJobs   = {}
+        self.loadedRecords = {}
+        return
+
+    def terminate(self, params):
+        """
+        _terminate_
+
+        Stop the loader processes when the component shuts down.
+        """
+        self.close()
+        return
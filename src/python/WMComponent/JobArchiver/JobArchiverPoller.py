@@ -17,6 +17,7 @@ import shutil
 import tarfile
 import traceback
 import time
+import StringIO
 
 from WMComponent.TaskArchiver.TaskArchiverPoller import uploadPublishWorkflow
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
@@ -29,6 +30,7 @@ from WMCore.DAOFactory        import DAOFactory
 from WMCore.WMBS.Fileset      import Fileset
 from WMCore.WMException       import WMException
 from WMCore.WMBS.Workflow     import Workflow
+from WMCore.Cache.JobCacheStore import JobCacheReader, getStoreDir, cleanStore
 
 
 class JobArchiverPollerException(WMException):
@@ -239,18 +241,33 @@ class JobArchiverPoller(BaseWorkerThread):
         regarding those jobs is cleaned up.
         """
 
-        for job in doneList:
-            #print "About to clean cache for job %i" % (job['id'])
-            self.cleanJobCache(job)
+        cacheReader = JobCacheReader()
+        storeDirs   = set()
+        try:
+            for job in doneList:
+                #print "About to clean cache for job %i" % (job['id'])
+                self.cleanJobCache(job, cacheReader)
+                if job['cache_dir']:
+                    storeDirs.add(getStoreDir(job['cache_dir']))
+        finally:
+            cacheReader.close()
+
+        # Drop the job cache stores that have no jobs left
+        for storeDir in storeDirs:
+            try:
+                cleanStore(storeDir)
+            except OSError, ex:
+                logging.error("Error while removing job cache store in %s: %s" % (storeDir, str(ex)))
 
         return
 
-    def cleanJobCache(self, job):
+    def cleanJobCache(self, job, cacheReader = None):
         """
         _cleanJobCache_
 
         Clears out any files still sticking around in the jobCache,
-        tars up the contents and sends them off
+        tars up the contents and sends them off.  If the job object was
+        saved in a job cache store it is added to the tarball as job.pkl.
         """
 
         cacheDir = job['cache_dir']
@@ -263,7 +280,14 @@ class JobArchiverPoller(BaseWorkerThread):
 
         cacheDirList = os.listdir(cacheDir)
 
-        if cacheDirList == []:
+        pickledJob = None
+        if cacheReader and not 'job.pkl' in cacheDirList:
+            try:
+                pickledJob = cacheReader.loadRaw(job['id'], cacheDir)
+            except Exception, ex:
+                logging.error("Cannot read job %i from the job cache store: %s" % (job['id'], str(ex)))
+
+        if cacheDirList == [] and pickledJob == None:
             os.rmdir(cacheDir)
             return
 
@@ -299,6 +323,11 @@ class JobArchiverPoller(BaseWorkerThread):
                                 arcname = 'Job_%i/%s' %(job['id'], fileName))
                 except IOError:
                     logging.error('Cannot read %s, skipping' % fullFile)
+            if pickledJob != None:
+                tarInfo = tarfile.TarInfo(name = 'Job_%i/job.pkl' % (job['id']))
+                tarInfo.size  = len(pickledJob)
+                tarInfo.mtime = time.time()
+                tarball.addfile(tarInfo, StringIO.StringIO(pickledJob))
             tarball.close()
         except Exception, ex:
             msg =  "Exception while opening and adding to a tarfile\n"
@@ -35,6 +35,7 @@ from WMCore.WMBS.Workflow                   import Workflow
 from WMCore.WMSpec.WMWorkload               import WMWorkload, WMWorkloadHelper
 from WMCore.Database.CMSCouch               import CouchServer
 from WMCore.FwkJobReport.Report             import Report
+from WMCore.Cache.JobCacheStore             import JobCacheWriter
 
 
 def retrieveWMSpec(workflow = None, wmWorkloadURL = None):
@@ -84,31 +85,17 @@ def retrieveJobSplitParams(wmWorkload, task):
         return task.jobSplittingParameters()
 
 
-def runSplitter(jobFactory, splitParams):
-    """
-    _runSplitter_
-
-    Run the jobSplitting as a coroutine method, yielding values as required
-    """
-
-    groups = ['test']
-    while groups != []:
-        groups = jobFactory(**splitParams)
-        yield groups
-        # Dump it after one go if we're not grabbing by proxy
-        if jobFactory.grabByProxy == False:
-            break
-
-
-
 def saveJob(job, workflow, sandbox, wmTask = None, jobNumber = 0,
             wmTaskPrio = None, owner = None, ownerDN = None,
             ownerGroup = '', ownerRole = '',
-            scramArch = None, swVersion = None, agentNumber = 0 ):
+            scramArch = None, swVersion = None, agentNumber = 0,
+            cacheWriter = None):
     """
     _saveJob_
 
-    Actually do the mechanics of saving the job to a pickle file
+    Actually do the mechanics of saving the job to a pickle file.  If a
+    JobCacheWriter is passed the job is queued in it instead, the caller
+    is responsible for flushing it.
     """
     if wmTask:
             # If we managed to load the task,
@@ -129,6 +116,11 @@ def saveJob(job, workflow, sandbox, wmTask = None, jobNumber = 0,
     job['ownerRole']   = ownerRole
     job['scramArch'] = scramArch
     job['swVersion'] = swVersion
+
+    if cacheWriter:
+        cacheWriter.add(job)
+        return
+
     output = open(os.path.join(cacheDir, 'job.pkl'), 'w')
     cPickle.dump(job, output, cPickle.HIGHEST_PROTOCOL)
     output.close()
@@ -158,6 +150,7 @@ def creatorProcess(work, jobCacheDir):
         scramArch    = work.get('scramArch', None)
         swVersion    = work.get('swVersion', None)
         agentNumber  = work.get('agentNumber', 0)
+        useJobStore  = work.get('jobCacheBackend', 'store') == 'store'
 
         if ownerDN == None:
             ownerDN = owner
@@ -184,6 +177,7 @@ def creatorProcess(work, jobCacheDir):
                                    wmWorkload = wmWorkload,
                                    cache = False)
 
+        cacheWriter = JobCacheWriter(useStore = useJobStore)
         for job in wmbsJobGroup.jobs:
             jobNumber += 1
             saveJob(job = job, workflow = workflow,
@@ -197,7 +191,9 @@ def creatorProcess(work, jobCacheDir):
                     ownerRole = ownerRole,
                     scramArch = scramArch,
                     swVersion = swVersion,
-                    agentNumber = agentNumber)
+                    agentNumber = agentNumber,
+                    cacheWriter = cacheWriter)
+        cacheWriter.flush()
 
     except Exception, ex:
         # Register as failure; move on
@@ -339,10 +335,10 @@ class JobCreatorPoller(BaseWorkerThread):
                                      logger = logging,
                                      dbinterface = myThread.dbi)
 
-        self.setBulkCache     = self.daoFactory(classname = "Jobs.SetCache")
-        self.countJobs        = self.daoFactory(classname = "Jobs.GetNumberOfJobsPerWorkflow")
-        self.subscriptionList = self.daoFactory(classname = "Subscriptions.ListIncomplete")
-        self.setFWJRPath      = self.daoFactory(classname = "Jobs.SetFWJRPath")
+        self.setBulkCache      = self.daoFactory(classname = "Jobs.SetCache")
+        self.countJobs         = self.daoFactory(classname = "Jobs.GetNumberOfJobsPerWorkflow")
+        self.subscriptionMarks = self.daoFactory(classname = "Subscriptions.ListIncompleteMarks")
+        self.setFWJRPath       = self.daoFactory(classname = "Jobs.SetFWJRPath")
 
         #information
         self.config = config
@@ -351,6 +347,16 @@ class JobCreatorPoller(BaseWorkerThread):
         self.defaultJobType     = config.JobCreator.defaultJobType
         self.limit              = getattr(config.JobCreator, 'fileLoadLimit', 500)
         self.agentNumber        = int(getattr(config.Agent, 'agentNumber', 0))
+        self.groupsPerBatch     = getattr(config.JobCreator, 'jobGroupsPerBatch', 1)
+        self.maxJobsPerGroup    = getattr(config.JobCreator, 'maxJobsPerGroup', 1000)
+        self.jobCacheBackend    = getattr(config.JobCreator, 'jobCacheBackend', 'store')
+        self.fullPollInterval   = getattr(config.JobCreator, 'fullPollInterval', 600)
+
+        # Mark of the available files of each subscription when it was last
+        # split, subscriptions whose mark didn't change are only split again
+        # in the full polls every fullPollInterval seconds
+        self.splitMarks   = {}
+        self.lastFullPoll = 0
 
         # initialize the alert framework (if available - config.Alert present)
         #    self.sendAlert will be then be available
@@ -422,6 +428,36 @@ class JobCreatorPoller(BaseWorkerThread):
         self.algorithm(params)
 
 
+    def listChangedSubscriptions(self):
+        """
+        _listChangedSubscriptions_
+
+        Return the subscriptions with available files that gained or lost
+        files, or had their fileset closed, since they were last split, and
+        the current marks of all the subscriptions.  All of them are
+        returned every fullPollInterval seconds, so that splitting
+        algorithms that depend on time or on the state of the jobs still
+        get a chance to run.
+        """
+        marks = self.subscriptionMarks.execute()
+
+        if time.time() - self.lastFullPoll >= self.fullPollInterval:
+            self.lastFullPoll = time.time()
+            subscriptions = marks.keys()
+        else:
+            subscriptions = [subID for subID in marks.keys()
+                             if self.splitMarks.get(subID, None) != marks[subID]]
+
+        # Forget the subscriptions that are done
+        for subID in self.splitMarks.keys():
+            if subID not in marks:
+                del self.splitMarks[subID]
+
+        subscriptions.sort()
+        logging.info("%i out of %i incomplete subscriptions need to be split" % (len(subscriptions),
+                                                                                  len(marks)))
+        return subscriptions, marks
+
     def pollSubscriptions(self):
         """
         Poller for looking in all active subscriptions for jobs that need to be made.
@@ -431,7 +467,7 @@ class JobCreatorPoller(BaseWorkerThread):
         myThread = threading.currentThread()
 
         #First, get list of Subscriptions
-        subscriptions    = self.subscriptionList.execute()
+        subscriptions, marks = self.listChangedSubscriptions()
 
         # Okay, now we have a list of subscriptions
         for subscriptionID in subscriptions:
@@ -503,10 +539,6 @@ class JobCreatorPoller(BaseWorkerThread):
             # Turn on the jobFactory
             wmbsJobFactory.open()
 
-            # Create a function to hold it
-            jobSplittingFunction = runSplitter(jobFactory = wmbsJobFactory,
-                                               splitParams = splitParams)
-
             # Now we get to find out how many jobs there are.
             jobNumber = self.countJobs.execute(workflow = workflow.id,
                                                conn = myThread.transaction.conn,
@@ -514,97 +546,105 @@ class JobCreatorPoller(BaseWorkerThread):
             jobNumber += splitParams.get('initial_lfn_counter', 0)
             logging.debug("Have %i jobs for workflow %s already in database." % (jobNumber, workflow.name))
 
-            continueSubscription = True
-            while continueSubscription:
-                # This loop runs over the jobFactory,
-                # using yield statements and a pre-existing proxy to
-                # generate and process new jobs
-
-                # First we need the jobs.
+            # Assemble a dict of all the info
+            processDict = {'workflow': workflow,
+                           'wmWorkload': wmWorkload, 'wmTaskName': wmTask.getPathName(),
+                           'jobNumber': jobNumber, 'sandbox': wmTask.data.input.sandbox,
+                           'wmTaskPrio': wmTask.getTaskPriority(),
+                           'owner': wmWorkload.getOwner().get('name', None),
+                           'ownerDN': wmWorkload.getOwner().get('dn', None),
+                           'ownerGroup': wmWorkload.getOwner().get('vogroup', ''),
+                           'ownerRole': wmWorkload.getOwner().get('vorole', ''),
+                           'swVersion': wmTask.getSwVersion(),
+                           'scramArch': wmTask.getScramArch(),
+                           'agentNumber': self.agentNumber,
+                           'jobCacheBackend': self.jobCacheBackend,
+                           'subscriptionID': wmbsSubscription['id']}
+
+            # The splitter hands us committed jobGroups in bounded batches
+            # as it goes, each batch is processed right away so that the
+            # whole subscription is never held in memory
+            handler = lambda jobGroups: self.processJobGroups(jobGroups, processDict)
+
+            while True:
+                # Each pass over the jobFactory loads at most self.limit files
+                # from the proxy and is wrapped in a single rollback
                 myThread.transaction.begin()
-                try:
-                    wmbsJobGroups = jobSplittingFunction.next()
-                    logging.info("Retrieved %i jobGroups from jobSplitter" % (len(wmbsJobGroups)))
-                except StopIteration:
-                    # If you receive a stopIteration, we're done
+                nGroups = wmbsJobFactory.stream(handler = handler,
+                                                groupsPerBatch = self.groupsPerBatch,
+                                                maxJobsPerGroup = self.maxJobsPerGroup,
+                                                **splitParams)
+                myThread.transaction.commit()
+                logging.info("Created %i jobGroups for subscription %i" % (nGroups, subscriptionID))
+
+                # Only splitters reading files through the proxy can be
+                # called again for more work
+                if nGroups == 0 or not wmbsJobFactory.grabByProxy:
                     logging.info("Completed iteration over subscription %i" % (subscriptionID))
-                    continueSubscription = False
-                    myThread.transaction.commit()
                     break
 
-                # If we have no jobGroups, we're done
-                if len(wmbsJobGroups) == 0:
-                    logging.info("Found end in iteration over subscription %i" % (subscriptionID))
-                    continueSubscription = False
-                    myThread.transaction.commit()
-                    break
+            # END: While loop over jobFactory
 
+            # Close the jobFactory
+            wmbsJobFactory.close()
 
-                # Assemble a dict of all the info
-                processDict = {'workflow': workflow,
-                               'wmWorkload': wmWorkload, 'wmTaskName': wmTask.getPathName(),
-                               'jobNumber': jobNumber, 'sandbox': wmTask.data.input.sandbox,
-                               'wmTaskPrio': wmTask.getTaskPriority(),
-                               'owner': wmWorkload.getOwner().get('name', None),
-                               'ownerDN': wmWorkload.getOwner().get('dn', None),
-                               'ownerGroup': wmWorkload.getOwner().get('vogroup', ''),
-                               'ownerRole': wmWorkload.getOwner().get('vorole', '')}
-
-                tempSubscription = Subscription(id = wmbsSubscription['id'])
-
-                nameDictList = []
-                for wmbsJobGroup in wmbsJobGroups:
-                    # For each jobGroup, put a dictionary
-                    # together and run it with creatorProcess
-                    jobsInGroup               = len(wmbsJobGroup.jobs)
-                    wmbsJobGroup.subscription = tempSubscription
-                    tempDict = {}
-                    tempDict.update(processDict)
-                    tempDict['jobGroup']  = wmbsJobGroup
-                    tempDict['swVersion'] = wmTask.getSwVersion()
-                    tempDict['scramArch'] = wmTask.getScramArch()
-                    tempDict['jobNumber'] = jobNumber
-                    tempDict['agentNumber'] = self.agentNumber
-
-                    jobGroup = creatorProcess(work = tempDict,
-                                              jobCacheDir = self.jobCacheDir)
-                    jobNumber += jobsInGroup
-
-                    # Set jobCache for group
-                    for job in jobGroup.jobs:
-                        nameDictList.append({'jobid':job['id'],
-                                             'cacheDir':job['cache_dir']})
-                        job["user"] = wmWorkload.getOwner()["name"]
-                        job["group"] = wmWorkload.getOwner()["group"]
-                # Set the caches in the database
-                try:
-                    if len(nameDictList) > 0:
-                        self.setBulkCache.execute(jobDictList = nameDictList,
-                                                  conn = myThread.transaction.conn,
-                                                  transaction = True)
-                except WMException:
-                    raise
-                except Exception, ex:
-                    msg =  "Unknown exception while setting the bulk cache:\n"
-                    msg += str(ex)
-                    logging.error(msg)
-                    self.sendAlert(6, msg = msg)
-                    logging.debug("Error while setting bulkCache with following values: %s\n" % nameDictList)
-                    raise JobCreatorException(msg)
-
-                # Advance the jobGroup in changeState
-                for wmbsJobGroup in wmbsJobGroups:
-                    self.advanceJobGroup(wmbsJobGroup = wmbsJobGroup)
-
-                # Now end the transaction so that everything is wrapped
-                # in a single rollback
-                myThread.transaction.commit()
+            # The mark is the one from before splitting, so a subscription
+            # is split once more after it changed
+            self.splitMarks[subscriptionID] = marks[subscriptionID]
 
+        return
 
-            # END: While loop over jobFactory
+    def processJobGroups(self, wmbsJobGroups, processDict):
+        """
+        _processJobGroups_
 
-            # Close the jobFactory
-            wmbsJobFactory.close()
+        Create the work areas and job caches for a batch of committed
+        jobGroups and advance them to created.  processDict holds the
+        workflow level information and the running job counter.
+        """
+        myThread = threading.currentThread()
+
+        tempSubscription = Subscription(id = processDict['subscriptionID'])
+
+        nameDictList = []
+        for wmbsJobGroup in wmbsJobGroups:
+            # For each jobGroup, put a dictionary
+            # together and run it with creatorProcess
+            jobsInGroup               = len(wmbsJobGroup.jobs)
+            wmbsJobGroup.subscription = tempSubscription
+            tempDict = {}
+            tempDict.update(processDict)
+            tempDict['jobGroup']  = wmbsJobGroup
+
+            jobGroup = creatorProcess(work = tempDict,
+                                      jobCacheDir = self.jobCacheDir)
+            processDict['jobNumber'] += jobsInGroup
+
+            # Set jobCache for group
+            for job in jobGroup.jobs:
+                nameDictList.append({'jobid':job['id'],
+                                     'cacheDir':job['cache_dir']})
+                job["user"] = processDict['wmWorkload'].getOwner()["name"]
+                job["group"] = processDict['wmWorkload'].getOwner()["group"]
+        # Set the caches in the database
+        try:
+            if len(nameDictList) > 0:
+                self.setBulkCache.execute(jobDictList = nameDictList,
+                                          conn = myThread.transaction.conn,
+                                          transaction = True)
+        except WMException:
+            raise
+        except Exception, ex:
+            msg =  "Unknown exception while setting the bulk cache:\n"
+            msg += str(ex)
+            logging.error(msg)
+            self.sendAlert(6, msg = msg)
+            logging.debug("Error while setting bulkCache with following values: %s\n" % nameDictList)
+            raise JobCreatorException(msg)
+
+        # Advance the jobGroup in changeState
+        for wmbsJobGroup in wmbsJobGroups:
+            self.advanceJobGroup(wmbsJobGroup = wmbsJobGroup)
 
         return
 
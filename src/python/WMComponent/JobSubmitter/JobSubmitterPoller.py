@@ -13,7 +13,6 @@ Submit jobs for execution.
 import logging
 import threading
 import os.path
-import cPickle
 import traceback
 
 # WMBS objects
@@ -27,6 +26,9 @@ from WMCore.FwkJobReport.Report               import Report
 from WMCore.WMBase                            import getWMBASE
 from WMCore.WMException                       import WMException
 from WMCore.BossAir.BossAirAPI                import BossAirAPI
+from WMCore.Cache.JobCacheStore               import JobCacheReader
+from WMComponent.JobSubmitter.SubmitQueue     import SubmitQueue
+from WMComponent.JobSubmitter.ResourceSnapshot import ResourceSnapshot
 
 def siteListCompare(a, b):
     """
@@ -84,15 +86,11 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         # Additions for caching-based JobSubmitter
         self.workflowTimestamps = {}
-        self.cachedJobIDs       = set()
-        self.cachedJobs         = {}
-        self.jobDataCache       = {}
+        self.submitQueue        = SubmitQueue()
         self.jobsToPackage      = {}
         self.sandboxPackage     = {}
-        self.siteKeys           = {}
+        self.resources          = ResourceSnapshot()
         self.locationDict       = {}
-        self.cmsNames           = {}
-        self.drainSites         = []
         self.sortedSites        = []
         self.packageSize        = getattr(self.config.JobSubmitter, 'packageSize', 500)
         self.collSize           = getattr(self.config.JobSubmitter, 'collectionSize',
@@ -131,7 +129,7 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         self.locationAction = self.daoFactory(classname = "Locations.GetSiteInfo")
 
-        # Call once to fill the siteKeys
+        # Call once to fill the resource snapshot
         # TODO: Make this less clumsy!
         self.getThresholds()
         return
@@ -177,7 +175,7 @@ class JobSubmitterPoller(BaseWorkerThread):
         Add a job to a job package and then return the batch ID for the job.
         Packages are only written out to disk when they contain 100 jobs.  The
         flushJobsPackages() method must be called after all jobs have been added
-        to the cache and before they are actually submitted to make sure all the
+        to packages and before they are actually submitted to make sure all the
         job packages have been written to disk.
         """
         if not self.jobsToPackage.has_key(loadedJob["workflow"]):
@@ -238,13 +236,15 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         Query WMBS for all jobs in the 'created' state.  For all jobs returned
         from the query, check if they already exist in the cache.  If they
-        don't unpickle them and combine their site white and black list with
-        the list of locations they can run at.  Add them to the cache.
+        don't load their submit information from the job cache and combine
+        their site white and black list with the list of locations they can
+        run at.  Add them to the cache.  Jobs are only unpickled once they
+        are picked for submission, see packageJobs().
 
-        Each entry in the cache is a tuple with five items:
+        Each entry in the cache is a tuple starting with:
           - WMBS Job ID
           - Retry count
-          - Batch ID
+          - Batch ID, None until the job is packaged
           - Path to sanbox
           - Path to cache directory
         """
@@ -252,121 +252,77 @@ class JobSubmitterPoller(BaseWorkerThread):
         dbJobs = set()
 
         logging.info("Querying WMBS for jobs to be submitted...")
-        newJobs = self.listJobsAction.execute()
-        logging.info("Found %s new jobs to be submitted." % len(newJobs))
+        newJobs = self.listJobsAction.execute(stream = True)
 
         logging.info("Determining possible sites for new jobs...")
         jobCount = 0
+        cacheReader = JobCacheReader()
         for newJob in newJobs:
             jobID = newJob['id']
             dbJobs.add(jobID)
-            if jobID in self.cachedJobIDs:
+            if jobID in self.submitQueue:
                 continue
 
             jobCount += 1
             if jobCount % 5000 == 0:
-                logging.info("Processed %d/%d new jobs." % (jobCount, len(newJobs)))
-
-            pickledJobPath = os.path.join(newJob["cache_dir"], "job.pkl")
+                logging.info("Processed %d new jobs." % jobCount)
 
-            if not os.path.isfile(pickledJobPath):
-                # Then we have a problem - there's no file
-                logging.error("Could not find pickled jobObject %s" % pickledJobPath)
-                badJobs.append(newJob)
-                continue
             try:
-                jobHandle = open(pickledJobPath, "r")
-                loadedJob = cPickle.load(jobHandle)
-                jobHandle.close()
+                loadedJob = cacheReader.loadSubmitInfo(jobID, newJob["cache_dir"])
             except Exception, ex:
-                msg =  "Error while loading pickled job object %s\n" % pickledJobPath
+                msg =  "Error while loading submit information for job %i in %s\n" % (jobID, newJob["cache_dir"])
                 msg += str(ex)
                 logging.error(msg)
                 self.sendAlert(6, msg = msg)
+                cacheReader.close()
                 raise JobSubmitterPollerException(msg)
 
-
-            loadedJob['retry_count'] = newJob['retry_count']
+            if loadedJob == None:
+                # Then we have a problem - there's no file
+                logging.error("Could not find pickled jobObject for job %i in %s" % (jobID, newJob["cache_dir"]))
+                badJobs.append(newJob)
+                continue
 
             # Grab the possible locations
             # This should be in terms of siteNames
             # Because there can be multiple entry points to a site with one SE
             # And each of them can be a separate location
             # Note that all the files in a job have the same set of locations
-            possibleLocations = set()
-            rawLocations      = loadedJob["input_files"][0]["locations"]
-
-            # Transform se into siteNames
-            for loc in rawLocations:
-                if not loc in self.siteKeys.keys():
-                    # Then we have a problem
-                    logging.error('Encountered unknown location %s for job %i' % (loc, jobID))
-                    logging.error('Ignoring for now, but watch out for this')
-                else:
-                    for siteName in self.siteKeys[loc]:
-                        possibleLocations.add(siteName)
-
-            if len(loadedJob["siteWhitelist"]) > 0:
-                whiteList = []
-                for cmsName in loadedJob["siteWhitelist"]:
-                    whiteList.extend(self.cmsNames.get(cmsName, []))
-                possibleLocations = possibleLocations & set(whiteList)
-            if len(loadedJob["siteBlacklist"]) > 0:
-                blackList = []
-                for cmsName in loadedJob["siteBlacklist"]:
-                    blackList.extend(self.cmsNames.get(cmsName, []))
-                possibleLocations = possibleLocations - set(blackList)
-
-            # try to remove draining sites if possible, this is needed to stop
-            # jobs that could run anywhere blocking draining sites
-            non_draining_sites = [x for x in possibleLocations if x not in self.drainSites]
-            if non_draining_sites: # if >1 viable non-draining site remove draining ones
-                possibleLocations = non_draining_sites
+            possibleLocations = self.resources.getPossibleSites(loadedJob["locations"],
+                                                                loadedJob["siteWhitelist"],
+                                                                loadedJob["siteBlacklist"])
 
             if len(possibleLocations) == 0:
                 newJob['name'] = loadedJob['name']
                 badJobs.append(newJob)
                 continue
 
-            batchDir = self.addJobsToPackage(loadedJob)
-            self.cachedJobIDs.add(jobID)
-
-            for possibleLocation in possibleLocations:
-                if not self.cachedJobs.has_key(possibleLocation):
-                    self.cachedJobs[possibleLocation] = {}
-                if not self.cachedJobs[possibleLocation].has_key(newJob["type"]):
-                    self.cachedJobs[possibleLocation][newJob["type"]] = {}
-
-                locTypeCache = self.cachedJobs[possibleLocation][newJob["type"]]
-                workflowName = newJob['workflow']
-                timestamp    = newJob['timestamp']
-                if not locTypeCache.has_key(workflowName):
-                    locTypeCache[workflowName] = set()
-                if not self.jobDataCache.has_key(workflowName):
-                    self.jobDataCache[workflowName] = {}
-                if not workflowName in self.workflowTimestamps:
-                    self.workflowTimestamps[workflowName] = timestamp
+            # Jobs of the oldest workflows go first
+            workflowName = newJob['workflow']
+            if not workflowName in self.workflowTimestamps:
+                self.workflowTimestamps[workflowName] = newJob['timestamp']
 
-                locTypeCache[workflowName].add(jobID)
-
-            # Now that we're out of that loop, put the job data in the cache
             jobInfo = (jobID,
                        newJob["retry_count"],
-                       batchDir,
+                       None,
                        loadedJob["sandbox"],
                        loadedJob["cache_dir"],
-                       loadedJob.get("ownerDN", None),
-                       loadedJob.get("ownerGroup", ''),
-                       loadedJob.get("ownerRole", ''),
-                       loadedJob.get("priority", None),
-                       frozenset(possibleLocations),
-                       loadedJob.get("scramArch", None),
-                       loadedJob.get("swVersion", None),
+                       loadedJob["ownerDN"],
+                       loadedJob["ownerGroup"],
+                       loadedJob["ownerRole"],
+                       loadedJob["priority"],
+                       possibleLocations,
+                       loadedJob["scramArch"],
+                       loadedJob["swVersion"],
                        loadedJob["name"],
-                       loadedJob.get("proxyPath", None),
+                       loadedJob["proxyPath"],
                        newJob['request_name'])
 
-            self.jobDataCache[workflowName][jobID] = jobInfo
+            self.submitQueue.add(jobID, possibleLocations, newJob["type"], workflowName,
+                                 (self.workflowTimestamps[workflowName], jobID), jobInfo)
+
+        cacheReader.close()
+        logging.info("Found %s new jobs to be submitted." % jobCount)
 
         if len(badJobs) > 0:
             logging.error("The following jobs have no possible sites to run at: %s" % badJobs)
@@ -375,29 +331,11 @@ class JobSubmitterPoller(BaseWorkerThread):
                 job['fwjr']         = self.noSiteErrorReport
             self.changeState.propagate(badJobs, "submitfailed", "created")
 
-        # If there are any leftover jobs, we want to get rid of them.
-        self.flushJobPackages()
         logging.info("Done with refreshCache() loop, pruning killed jobs.")
 
         # We need to remove any jobs from the cache that were not returned in
         # the last call to the database.
-        jobIDsToPurge = self.cachedJobIDs - dbJobs
-        self.cachedJobIDs -= jobIDsToPurge
-
-        if len(jobIDsToPurge) == 0:
-            return
-
-        for siteName in self.cachedJobs.keys():
-            for taskType in self.cachedJobs[siteName].keys():
-                for workflow in self.cachedJobs[siteName][taskType].keys():
-                    for cachedJobID in list(self.cachedJobs[siteName][taskType][workflow]):
-                        if cachedJobID in jobIDsToPurge:
-                            self.cachedJobs[siteName][taskType][workflow].remove(cachedJobID)
-                            try:
-                                del self.jobDataCache[workflow][cachedJobID]
-                            except KeyError:
-                                # Already gone
-                                pass
+        self.submitQueue.retain(dbJobs)
 
         logging.info("Done pruning killed jobs, moving on to submit.")
         return
@@ -412,28 +350,9 @@ class JobSubmitterPoller(BaseWorkerThread):
         """
         rcThresholds = self.resourceControl.listThresholdsForSubmit()
 
-        # Since we pull the drain information each time, there is
-        # no benefit really to storing the list of drained sites from
-        # one iteration to the next
-        self.drainSites = []
-
-        for siteName in rcThresholds.keys():
-            # Add threshold if we don't have it already
-            cmsName = rcThresholds[siteName]["cms_name"]
-            state   = rcThresholds[siteName]["state"]
-
-            if not cmsName in self.cmsNames.keys():
-                self.cmsNames[cmsName] = []
-            if not siteName in self.cmsNames[cmsName]:
-                self.cmsNames[cmsName].append(siteName)
-            if state != "Normal" and siteName not in self.drainSites:
-                self.drainSites.append(siteName)
-
-            for seName in rcThresholds[siteName]["se_names"]:
-                if not seName in self.siteKeys.keys():
-                    self.siteKeys[seName] = []
-                if not siteName in self.siteKeys[seName]:
-                    self.siteKeys[seName].append(siteName)
+        # The drain information changes from one iteration to the next, so
+        # the site mappings are rebuilt from scratch every time
+        self.resources = ResourceSnapshot(rcThresholds)
 
         #Sort the sites using the following criteria:
         #T1 sites go first, then T2, then T3
@@ -462,15 +381,14 @@ class JobSubmitterPoller(BaseWorkerThread):
           - Path to cache directory
           - SE name of the site to run at
         """
-        jobsToSubmit = {}
-        jobsToPrune = {}
+        jobsToAssign = []
 
         rcThresholds = self.getThresholds()
 
         for siteName in self.sortedSites:
 
             totalPending = None
-            if siteName not in self.cachedJobs:
+            if not self.submitQueue.hasJobs(siteName):
                 logging.debug("No jobs for site %s" % siteName)
                 continue
             logging.debug("Have site %s" % siteName)
@@ -518,95 +436,26 @@ class JobSubmitterPoller(BaseWorkerThread):
                 if maxSlots >= 0 and taskRunning >= maxSlots:
                     continue
 
-                # Ignore this threshold if we've cleaned out the site
-                if siteName not in self.cachedJobs:
-                    continue
-
                 # Ignore this threshold if we have no jobs
                 # for it
-                if taskType not in self.cachedJobs[siteName]:
+                if not self.submitQueue.hasJobs(siteName, taskType):
                     continue
 
-                taskCache = self.cachedJobs[siteName][taskType]
-
                 # Calculate number of jobs we need
                 nJobsRequired = min(totalPendingSlots - totalPending, taskPendingSlots - taskPending)
-                breakLoop = False
                 logging.debug("nJobsRequired for task %s: %i" % (taskType, nJobsRequired))
+                if nJobsRequired <= 0:
+                    continue
 
-                while nJobsRequired > 0:
-                    # Do this until we have all the jobs for this threshold
-
-                    # Pull a job out of the cache for the task/site.  Verify that we
-                    # haven't already used this job in this polling cycle.
-                    cachedJob = None
-                    cachedJobWorkflow = None
-
-                    workflows = taskCache.keys()
-                    # Sorting by timestamp on the subscription
-                    sortingKey = lambda x : self.workflowTimestamps[x]
-                    workflows.sort(key = sortingKey)
-
-                    for workflow in workflows:
-                        # Run a while loop until you get a job
-                        while len(taskCache[workflow]) > 0:
-                            cachedJobID = taskCache[workflow].pop()
-                            try:
-                                cachedJob   = self.jobDataCache[workflow].get(cachedJobID, None)
-                                del self.jobDataCache[workflow][cachedJobID]
-                            except:
-                                pass
-
-                            if cachedJobID not in jobsToPrune.get(workflow, set()):
-                                cachedJobWorkflow = workflow
-                                break
-                            else:
-                                cachedJob = None
-
-                        # Remove the entry in the cache for the workflow if it is empty.
-                        if len(self.cachedJobs[siteName][taskType][workflow]) == 0:
-                            del self.cachedJobs[siteName][taskType][workflow]
-                        if self.jobDataCache.has_key(workflow) and len(self.jobDataCache[workflow].keys()) == 0:
-                            del self.jobDataCache[workflow]
-
-                        if cachedJob:
-                            # We found a job, bail out and handle it.
-                            break
-
-                    # Check to see if we need to delete this site from the cache
-                    if len(self.cachedJobs[siteName][taskType].keys()) == 0:
-                        del self.cachedJobs[siteName][taskType]
-                        breakLoop = True
-                    if len(self.cachedJobs[siteName].keys()) == 0:
-                        del self.cachedJobs[siteName]
-                        breakLoop = True
-
-                    if not cachedJob:
-                        # We didn't find a job, bail out.
-                        # This site and task type is done
-                        break
-
-                    self.cachedJobIDs.remove(cachedJob[0])
-
-                    if not jobsToPrune.has_key(cachedJobWorkflow):
-                        jobsToPrune[cachedJobWorkflow] = set()
-
-                    jobsToPrune[cachedJobWorkflow].add(cachedJob[0])
-
-                    # Sort jobs by jobPackage
-                    package = cachedJob[2]
-                    if not package in jobsToSubmit.keys():
-                        jobsToSubmit[package] = []
-
-                    # Add the sandbox to a global list
-                    self.sandboxPackage[package] = cachedJob[3]
-
+                # Pull the jobs of the oldest workflows out of the cache for
+                # the task/site, this also removes them from the other sites.
+                for jobID, cachedJob in self.submitQueue.pop(siteName, taskType, nJobsRequired):
                     # Create a job dictionary object
                     jobDict = {'id': cachedJob[0],
                                'retry_count': cachedJob[1],
                                'custom': {'location': siteName},
+                               'sandbox': cachedJob[3],
                                'cache_dir': cachedJob[4],
-                               'packageDir': package,
                                'userdn': cachedJob[5],
                                'usergroup': cachedJob[6],
                                'userrole': cachedJob[7],
@@ -619,36 +468,62 @@ class JobSubmitterPoller(BaseWorkerThread):
                                'proxyPath': cachedJob[13],
                                'requestName': cachedJob[14]}
 
-                    # Add to jobsToSubmit
-                    jobsToSubmit[package].append(jobDict)
+                    jobsToAssign.append(jobDict)
 
                     # Deal with accounting
-                    nJobsRequired -= 1
                     totalPending  += 1
-                    taskPending   += 1
-
-                    if breakLoop:
-                        break
-
-        # Remove the jobs that we're going to submit from the cache.
-        allWorkflows = set()
-        for siteName in self.cachedJobs.keys():
-            for taskType in self.cachedJobs[siteName].keys():
-                for workflow in self.cachedJobs[siteName][taskType].keys():
-                    allWorkflows.add(workflow)
-                    if workflow in jobsToPrune.keys():
-                        self.cachedJobs[siteName][taskType][workflow] -= jobsToPrune[workflow]
 
         # Remove workflows from the timestamp dictionary which are not anymore in the cache
-        workflowsWithTimestamp = self.workflowTimestamps.keys()
-        for workflow in workflowsWithTimestamp:
-            if workflow not in allWorkflows:
+        for workflow in self.workflowTimestamps.keys():
+            if not self.submitQueue.hasWorkflow(workflow):
                 del self.workflowTimestamps[workflow]
 
+        jobsToSubmit = self.packageJobs(jobsToAssign)
+
         logging.info("Have %s packages to submit." % len(jobsToSubmit))
         logging.info("Done assigning site locations.")
         return jobsToSubmit
 
+    def packageJobs(self, jobsToAssign):
+        """
+        _packageJobs_
+
+        Unpickle the jobs that are going to be submitted, add them to job
+        packages and sort them by package.  Jobs that can no longer be found
+        in the job cache are dropped.
+        """
+        jobsToSubmit = {}
+
+        cacheReader = JobCacheReader()
+        try:
+            for jobDict in jobsToAssign:
+                try:
+                    loadedJob = cacheReader.loadJob(jobDict["id"], jobDict["cache_dir"])
+                except Exception, ex:
+                    msg =  "Error while loading pickled job object for job %i in %s\n" % (jobDict["id"], jobDict["cache_dir"])
+                    msg += str(ex)
+                    logging.error(msg)
+                    self.sendAlert(6, msg = msg)
+                    raise JobSubmitterPollerException(msg)
+
+                if loadedJob == None:
+                    logging.error("Could not find pickled jobObject for job %i in %s" % (jobDict["id"], jobDict["cache_dir"]))
+                    continue
+
+                loadedJob["retry_count"] = jobDict["retry_count"]
+                package = self.addJobsToPackage(loadedJob)
+                jobDict["packageDir"] = package
+
+                # Add the sandbox to a global list
+                self.sandboxPackage[package] = jobDict.pop("sandbox")
+                jobsToSubmit.setdefault(package, []).append(jobDict)
+        finally:
+            cacheReader.close()
+
+        # If there are any leftover jobs, we want to get rid of them.
+        self.flushJobPackages()
+        return jobsToSubmit
+
 
     def submitJobs(self, jobsToSubmit):
         """
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+_ResourceSnapshot_
+
+Site information used by the JobSubmitter to find where jobs can run, built
+from a single ResourceControl.listThresholdsForSubmit() call.
+
+The snapshot maps SE names and CMS names to frozensets of site names and
+keeps the set of draining sites.  The sites a job can run at only depend on
+its input locations and its site white and black lists, which are shared
+by most of the jobs of a task, so the result is memoised on them.
+"""
+
+import logging
+
+
+class ResourceSnapshot(object):
+    """
+    _ResourceSnapshot_
+
+    Immutable view of the submit thresholds.  Build a new one every time
+    the thresholds are reloaded.
+    """
+    def __init__(self, rcThresholds = None):
+        seNames    = {}
+        cmsNames   = {}
+        drainSites = set()
+
+        rcThresholds = rcThresholds or {}
+        for siteName in rcThresholds.keys():
+            cmsName = rcThresholds[siteName]["cms_name"]
+            cmsNames.setdefault(cmsName, set()).add(siteName)
+            if rcThresholds[siteName]["state"] != "Normal":
+                drainSites.add(siteName)
+            for seName in rcThresholds[siteName]["se_names"]:
+                seNames.setdefault(seName, set()).add(siteName)
+
+        self.seNames    = dict([(x, frozenset(y)) for x, y in seNames.items()])
+        self.cmsNames   = dict([(x, frozenset(y)) for x, y in cmsNames.items()])
+        self.drainSites = frozenset(drainSites)
+        self.siteListCache = {}
+        self.locationCache = {}
+        return
+
+    def resolveSiteList(self, cmsNames):
+        """
+        _resolveSiteList_
+
+        Convert a list of CMS names into the frozenset of their site names.
+        """
+        key = tuple(cmsNames)
+        if not key in self.siteListCache:
+            sites = set()
+            for cmsName in cmsNames:
+                sites.update(self.cmsNames.get(cmsName, ()))
+            self.siteListCache[key] = frozenset(sites)
+        return self.siteListCache[key]
+
+    def getPossibleSites(self, locations, siteWhitelist = [], siteBlacklist = []):
+        """
+        _getPossibleSites_
+
+        Return the frozenset of sites a job can run at given the SE names of
+        its input files and its site white and black lists.  Draining sites
+        are left out unless the job cannot run anywhere else.
+        """
+        key = (tuple(locations), tuple(siteWhitelist), tuple(siteBlacklist))
+        if key in self.locationCache:
+            return self.locationCache[key]
+
+        possibleSites = set()
+        for seName in locations:
+            if not seName in self.seNames:
+                logging.error("Encountered unknown location %s" % seName)
+                logging.error("Ignoring for now, but watch out for this")
+                continue
+            possibleSites.update(self.seNames[seName])
+
+        if len(siteWhitelist) > 0:
+            possibleSites &= self.resolveSiteList(siteWhitelist)
+        if len(siteBlacklist) > 0:
+            possibleSites -= self.resolveSiteList(siteBlacklist)
+
+        # try to remove draining sites if possible, this is needed to stop
+        # jobs that could run anywhere blocking draining sites
+        nonDrainingSites = possibleSites - self.drainSites
+        if nonDrainingSites:
+            possibleSites = nonDrainingSites
+
+        self.locationCache[key] = frozenset(possibleSites)
+        return self.locationCache[key]
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+_SubmitQueue_
+
+Cache of jobs waiting for submission used by the JobSubmitter.
+
+Jobs are kept in a heap per site and task type, ordered by a priority key
+given when the job is added (smallest first).  A job can run at several
+sites so it is pushed on the heap of each one, and a reverse index keyed by
+job id records where the job is queued.  Removing a job only drops it from
+the index, the stale heap entries are skipped when they come up and the
+heap is rebuilt once most of its entries are stale.
+
+  - add/remove a job: O(s), s being the number of sites of the job
+  - pop the next k jobs of a site and task type: O(k log n) amortized
+"""
+
+import heapq
+
+
+class SubmitQueue(object):
+    """
+    _SubmitQueue_
+
+    Per site/task type priority queues of jobs with a job id index.
+    """
+    def __init__(self):
+        self.jobs      = {}
+        self.heaps     = {}
+        self.counts    = {}
+        self.siteJobs  = {}
+        self.workflows = {}
+        return
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __contains__(self, jobID):
+        return jobID in self.jobs
+
+    def add(self, jobID, sites, taskType, workflow, priorityKey, jobInfo):
+        """
+        _add_
+
+        Queue a job for the given sites.  Jobs with a lower priorityKey come
+        out first.  Adding a job that is already queued does nothing.
+        """
+        if jobID in self.jobs:
+            return
+
+        sites = frozenset(sites)
+        self.jobs[jobID] = (jobInfo, sites, taskType, workflow)
+        self.workflows[workflow] = self.workflows.get(workflow, 0) + 1
+
+        entry = (priorityKey, jobID)
+        for site in sites:
+            key = (site, taskType)
+            if not key in self.heaps:
+                self.heaps[key] = []
+                self.counts[key] = 0
+            heapq.heappush(self.heaps[key], entry)
+            self.counts[key] += 1
+            self.siteJobs[site] = self.siteJobs.get(site, 0) + 1
+        return
+
+    def remove(self, jobID):
+        """
+        _remove_
+
+        Remove a job from the queue and return its job information, or None
+        if the job is not queued.
+        """
+        if not jobID in self.jobs:
+            return None
+
+        jobInfo, sites, taskType, workflow = self.jobs.pop(jobID)
+
+        self.workflows[workflow] -= 1
+        if self.workflows[workflow] == 0:
+            del self.workflows[workflow]
+
+        for site in sites:
+            self.siteJobs[site] -= 1
+            if self.siteJobs[site] == 0:
+                del self.siteJobs[site]
+
+            key = (site, taskType)
+            self.counts[key] -= 1
+            if self.counts[key] == 0:
+                del self.counts[key]
+                del self.heaps[key]
+            elif len(self.heaps[key]) > 2 * self.counts[key] + 100:
+                self._compact(key)
+        return jobInfo
+
+    def retain(self, jobIDs):
+        """
+        _retain_
+
+        Remove all the queued jobs that are not in jobIDs and return their
+        ids.
+        """
+        jobIDsToPurge = [x for x in self.jobs if x not in jobIDs]
+        for jobID in jobIDsToPurge:
+            self.remove(jobID)
+        return jobIDsToPurge
+
+    def pop(self, site, taskType, nJobs = 1):
+        """
+        _pop_
+
+        Remove up to nJobs jobs with the lowest priority keys queued for the
+        given site and task type, they are also removed from any other site
+        they were queued for.  Returns a list of (jobID, jobInfo) tuples.
+        """
+        key  = (site, taskType)
+        jobs = []
+        while len(jobs) < nJobs and self.heaps.get(key, None):
+            priorityKey, jobID = heapq.heappop(self.heaps[key])
+            queuedJob = self.jobs.get(jobID, None)
+            if queuedJob == None or not site in queuedJob[1] or queuedJob[2] != taskType:
+                # Stale entry of a job that was already removed
+                continue
+            jobs.append((jobID, self.remove(jobID)))
+        return jobs
+
+    def hasJobs(self, site, taskType = None):
+        """
+        _hasJobs_
+
+        Check if there are jobs queued for a site, optionally restricted to
+        a task type.
+        """
+        if taskType != None:
+            return (site, taskType) in self.counts
+        return site in self.siteJobs
+
+    def sites(self):
+        """
+        _sites_
+
+        Return the set of sites that have jobs queued.
+        """
+        return set(self.siteJobs.keys())
+
+    def hasWorkflow(self, workflow):
+        """
+        _hasWorkflow_
+
+        Check if there are jobs of a workflow queued.
+        """
+        return workflow in self.workflows
+
+    def _compact(self, key):
+        """
+        _compact_
+
+        Drop the stale entries of a heap.
+        """
+        site, taskType = key
+        heap = []
+        for entry in self.heaps[key]:
+            queuedJob = self.jobs.get(entry[1], None)
+            if queuedJob != None and site in queuedJob[1] and queuedJob[2] == taskType:
+                heap.append(entry)
+        heapq.heapify(heap)
+        self.heaps[key] = heap
+        return
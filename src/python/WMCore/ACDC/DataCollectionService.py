@@ -19,6 +19,7 @@ import WMCore.ACDC.CollectionTypes as CollectionTypes
 from WMCore.WMException      import WMException
 from WMCore.DataStructs.File import File
 from WMCore.DataStructs.Run  import Run
+from WMCore.DataStructs.LumiMask import LumiMask
 
 class ACDCDCSException(WMException):
     """
@@ -205,7 +206,8 @@ class DataCollectionService(CouchService):
           {"run1": [[lumi1, lumi4], [lumi6, lumi10]],
            "run3": [lumi5, lumi10]}
 
-        Note that the run numbers are strings.
+        Note that the run numbers are strings.  The whitelist is returned as a
+        compiled LumiMask.
         """
         results = self.couchdb.loadView("ACDC", "owner_coll_fileset_files",
                                         {"startkey": [group, user,
@@ -214,36 +216,8 @@ class DataCollectionService(CouchService):
                                                     collectionID, taskName, {}]}, [])
 
         allRuns = {}
-        whiteList = {}
-
         for result in results["rows"]:
             for run in result["value"]["runs"]:
-                if not allRuns.has_key(run["run_number"]):
-                    allRuns[run["run_number"]] = []
-                allRuns[run["run_number"]].extend(run["lumis"])
-
-        for run in allRuns.keys():
-            lumis = []
-            lumis.extend(set(allRuns[run]))
-            lumis.sort()
-
-            whiteList[str(run)] = []
-            lastLumi = None
-            currentSet = None
-
-            while len(lumis) > 0:
-                currentLumi = lumis.pop(0)
-                if currentLumi - 1 != lastLumi:
-                    if currentSet == None:
-                        currentSet = [currentLumi]
-                    else:
-                        currentSet.append(lastLumi)
-                        whiteList[str(run)].append(currentSet)
-                        currentSet = [currentLumi]
-
-                lastLumi = currentLumi
-
-            currentSet.append(lastLumi)
-            whiteList[str(run)].append(currentSet)
-
-        return whiteList
+                allRuns.setdefault(str(run["run_number"]), []).extend(run["lumis"])
+
+        return LumiMask.fromLumis(allRuns)
@@ -26,14 +26,15 @@ class UpdateWorker(DBFormatter):
                  "worker_name": workerName,
                  "last_updated": int(time.time())}
 
+        sql = self.sqlpart1
         if state:
             binds["state"] = state
-            self.sqlpart1 += ", state = :state"
+            sql += ", state = :state"
         if pid:
             binds["pid"] = pid
-            self.sqlpart1 += ", pid = :pid"
+            sql += ", pid = :pid"
 
-        sql = self.sqlpart1 + " " + self.sqlpart2
+        sql += " " + self.sqlpart2
 
         self.dbi.processData(sql, binds, conn = conn,
                              transaction = transaction)
@@ -72,6 +72,12 @@ class BossAirAPI(WMConnectionBase):
         self.checkProxy = getattr(config.BossAir, 'checkProxy', False)
         self.cert       = getattr(config.BossAir, 'cert', None)
 
+        # With event tracking the plugins follow the jobs from the
+        # batch system events and the running jobs are kept between
+        # cycles, only the new ones are loaded from the cache
+        self.eventTracking = getattr(config.BossAir, 'eventTracking', False)
+        self.trackedJobs   = {}
+
 
         # Create a factory to load plugins
         self.pluginFactory = WMFactory("plugins", self.pluginDir)
@@ -487,6 +493,9 @@ class BossAirAPI(WMConnectionBase):
 
         OPTIONAL: You can submit a list of jobs to check, based either on wmbsIDs or
          on runjobIDs.  This takes a list of integer IDs.
+
+        With eventTracking the jobs are tracked from the batch system events
+        when all of them are, see _loadTrackedJobs.
         """
 
         jobsToChange   = []
@@ -512,9 +521,14 @@ class BossAirAPI(WMConnectionBase):
             # Then we have no running jobs
             return returnList
 
+        trackEvents = self.eventTracking and not runJobIDs and not wmbsIDs
+
         logging.info("About to start building running jobs")
 
-        loadedJobs = self._buildRunningJobsFromRunJobs(runJobs = runningJobs)
+        if trackEvents:
+            loadedJobs = self._loadTrackedJobs(runJobs = runningJobs)
+        else:
+            loadedJobs = self._buildRunningJobsFromRunJobs(runJobs = runningJobs)
 
         logging.info("About to look for %i loadedJobs.\n" % len(loadedJobs))
 
@@ -535,7 +549,10 @@ class BossAirAPI(WMConnectionBase):
                 # Then we send them to the plugins
                 # Should give you a lit of jobs to change and jobs to complete
                 pluginInst = self.plugins[plugin]
-                localRunning, localChanges, localCompletes = pluginInst.track(jobs = jobsToTrack[plugin])
+                if trackEvents:
+                    localRunning, localChanges, localCompletes = pluginInst.trackEvents(jobs = jobsToTrack[plugin])
+                else:
+                    localRunning, localChanges, localCompletes = pluginInst.track(jobs = jobsToTrack[plugin])
                 jobsToReturn.extend(localRunning)
                 jobsToChange.extend(localChanges)
                 jobsToComplete.extend(localCompletes)
@@ -559,6 +576,8 @@ class BossAirAPI(WMConnectionBase):
         self._updateJobs(jobs = jobsToChange)
         self._complete(jobs = jobsToComplete)
 
+        for rj in jobsToComplete:
+            self.trackedJobs.pop(rj['id'], None)
 
         # We should have a globalState variable for changed jobs
         # from the plugin
@@ -802,6 +821,36 @@ class BossAirAPI(WMConnectionBase):
         return finalJobs
 
 
+    def _loadTrackedJobs(self, runJobs):
+        """
+        _loadTrackedJobs_
+
+        Same as _buildRunningJobsFromRunJobs, but keeping the jobs between
+        cycles: only the jobs that weren't tracked yet are loaded from the
+        cache, the others get their state from the database in case it was
+        changed outside of track.  Jobs that are no longer active are dropped.
+        """
+        trackedJobs = {}
+        newJobs     = []
+
+        for rj in runJobs:
+            trackedJob = self.trackedJobs.get(rj['id'], None)
+            if trackedJob == None:
+                newJobs.append(rj)
+            else:
+                trackedJob['status']      = rj['status']
+                trackedJob['status_time'] = rj['status_time']
+                trackedJobs[rj['id']] = trackedJob
+
+        if len(newJobs) > 0:
+            for rj in self._buildRunningJobsFromRunJobs(runJobs = newJobs):
+                trackedJobs[rj['id']] = rj
+
+        self.trackedJobs = trackedJobs
+
+        return trackedJobs.values()
+
+
     def _buildRunningJobs(self, wmbsJobs):
         """
         _buildRunningJobs_
@@ -76,6 +76,19 @@ class BasePlugin:
         return jobs, jobs, []
 
 
+    def trackEvents(self, jobs):
+        """
+        _trackEvents_
+
+        Tracks jobs from the events of the batch system, used by
+        BossAir when event tracking is enabled.  Plugins that can't
+        read them just track the jobs.
+        Returns the same three lists as track
+        """
+
+        return self.track(jobs = jobs)
+
+
     def complete(self, jobs):
         """
         _complete_
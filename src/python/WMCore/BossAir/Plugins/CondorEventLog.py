@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+_CondorEventLog_
+
+Incremental reader for the XML user logs condor writes for every job, the
+Log file of the submit JDL, used by the CondorPlugin to track jobs from
+their events instead of polling condor_q.
+
+EventLogReplay is a stand-in for condor in tests: it writes the user logs
+of jobs the way condor does, replaying recorded events one cycle at a time.
+"""
+
+import os
+import re
+import glob
+import time
+
+from xml.sax.saxutils import escape, unescape
+
+# Condor status reached with each event type, None for events that don't
+# change it
+EVENT_STATES = {0: 'Idle',       # Submit
+                1: 'Running',    # Execute
+                4: 'Idle',       # Evicted
+                5: 'Complete',   # Terminated
+                9: 'Removed',    # Aborted
+                12: 'Held',      # Held
+                13: 'Idle'}      # Released
+
+# Events after which the job leaves the queue
+TERMINAL_EVENTS = [5, 9]
+
+EVENT_TYPES = {0: 'SubmitEvent', 1: 'ExecuteEvent', 4: 'JobEvictedEvent',
+               5: 'JobTerminatedEvent', 9: 'JobAbortedEvent',
+               12: 'JobHeldEvent', 13: 'JobReleaseEvent'}
+
+EVENT_TOKEN = re.compile(r'<a n="(\w+)">\s*<(\w)>([^<]*)</\w>\s*</a>|(</c>)')
+
+def parseEvents(text):
+    """
+    _parseEvents_
+
+    Parse the events of an XML user log in a single pass, return them as a
+    list of dictionaries with integer values for the integer attributes.
+    """
+    events = []
+    event  = {}
+    for name, valueType, value, end in EVENT_TOKEN.findall(text):
+        if end:
+            if event:
+                events.append(event)
+            event = {}
+        elif valueType == 'i':
+            event[name] = int(value)
+        else:
+            event[name] = unescape(value)
+
+    return events
+
+def eventTime(event):
+    """
+    _eventTime_
+
+    Return the time of an event in seconds since the epoch.
+    """
+    return int(time.mktime(time.strptime(event['EventTime'][:19], "%Y-%m-%dT%H:%M:%S")))
+
+def latestEventLog(cacheDir):
+    """
+    _latestEventLog_
+
+    Return the user log of the last job submitted from a job cache
+    directory, the one of the highest cluster.
+    """
+    latestLog     = None
+    latestCluster = -1
+    for logPath in glob.glob(os.path.join(cacheDir, 'condor.*.*.log')):
+        try:
+            cluster = int(os.path.basename(logPath).split('.')[1])
+        except ValueError:
+            continue
+        if cluster > latestCluster:
+            latestLog     = logPath
+            latestCluster = cluster
+
+    return latestLog
+
+class CondorEventLog(object):
+    """
+    _CondorEventLog_
+
+    Read the events appended to a user log since the last read.
+    """
+    def __init__(self, path):
+        self.path   = path
+        self.offset = 0
+        return
+
+    def readEvents(self):
+        """
+        _readEvents_
+
+        Return the complete events written since the last call, an event
+        that is still being written is left for the next one.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+
+        if size == self.offset:
+            return []
+        if size < self.offset:
+            # The log was rewritten, start over
+            self.offset = 0
+
+        handle = open(self.path, 'r')
+        try:
+            handle.seek(self.offset)
+            text = handle.read(size - self.offset)
+        finally:
+            handle.close()
+
+        end = text.rfind('</c>')
+        if end == -1:
+            return []
+        end += len('</c>')
+        self.offset += end
+
+        return parseEvents(text[:end])
+
+def formatEvent(eventType, cluster, proc = 0, eventTime = None, notes = None):
+    """
+    _formatEvent_
+
+    Format an event the way condor writes it in XML user logs.
+    """
+    if eventTime == None:
+        eventTime = time.time()
+
+    lines = ['<c>\n',
+             '    <a n="MyType"><s>%s</s></a>\n' % EVENT_TYPES.get(eventType, 'GenericEvent'),
+             '    <a n="EventTypeNumber"><i>%i</i></a>\n' % eventType,
+             '    <a n="EventTime"><s>%s</s></a>\n' % time.strftime("%Y-%m-%dT%H:%M:%S",
+                                                                    time.localtime(eventTime)),
+             '    <a n="Cluster"><i>%i</i></a>\n' % cluster,
+             '    <a n="Proc"><i>%i</i></a>\n' % proc,
+             '    <a n="Subproc"><i>0</i></a>\n']
+    if notes != None:
+        lines.append('    <a n="LogNotes"><s>%s</s></a>\n' % escape(notes))
+    lines.append('</c>\n')
+
+    return ''.join(lines)
+
+class EventLogReplay(object):
+    """
+    _EventLogReplay_
+
+    Replay recorded events into the user logs of jobs.  The events are a
+    list of cycles, each one a list of (cacheDir, cluster, eventType,
+    eventTime, notes) tuples that are written to condor.<cluster>.0.log in
+    the cache directory when the cycle is replayed.
+    """
+    def __init__(self, cycles = None):
+        self.cycles = list(cycles or [])
+        return
+
+    def addCycle(self, events):
+        """
+        _addCycle_
+
+        Add a cycle of events to replay.
+        """
+        self.cycles.append(events)
+        return
+
+    def replayCycle(self):
+        """
+        _replayCycle_
+
+        Write the events of the next cycle, return False if there are none
+        left.
+        """
+        if len(self.cycles) == 0:
+            return False
+
+        for cacheDir, cluster, eventType, eventTime, notes in self.cycles.pop(0):
+            logPath = os.path.join(cacheDir, 'condor.%i.0.log' % cluster)
+            handle = open(logPath, 'a')
+            handle.write(formatEvent(eventType, cluster, eventTime = eventTime,
+                                     notes = notes))
+            handle.close()
+
+        return True
@@ -25,6 +25,8 @@ from WMCore.DAOFactory                 import DAOFactory
 from WMCore.WMException                import WMException
 from WMCore.WMInit                     import getWMBASE
 from WMCore.BossAir.Plugins.BasePlugin import BasePlugin, BossAirPluginException
+from WMCore.BossAir.Plugins.CondorEventLog import CondorEventLog, latestEventLog, eventTime
+from WMCore.BossAir.Plugins.CondorEventLog import EVENT_STATES, TERMINAL_EVENTS
 from WMCore.FwkJobReport.Report        import Report
 from WMCore.Algorithms                 import SubprocessAlgos
 
@@ -74,14 +76,18 @@ def submitWorker(input, results, timeout = None):
             continue
 
         try:
+            startTime = time.time()
             stdout, stderr, returnCode = SubprocessAlgos.runCommand(cmd = command, shell = True, timeout = timeout)
+            submitTime = time.time() - startTime
             if returnCode == 0:
-                results.put({'stdout': stdout, 'stderr': stderr, 'idList': idList, 'exitCode': returnCode})
+                results.put({'stdout': stdout, 'stderr': stderr, 'idList': idList, 'exitCode': returnCode,
+                             'submitTime': submitTime})
             else:
                 results.put({'stdout': stdout,
                              'stderr': 'Non-zero exit code: %s\n stderr: %s' % (returnCode, stderr),
                              'exitCode': returnCode,
-                             'idList': idList})
+                             'idList': idList,
+                             'submitTime': submitTime})
         except Exception, ex:
             msg =  "Critical error in subprocess while submitting to condor"
             msg += str(ex)
@@ -92,6 +98,143 @@ def submitWorker(input, results, timeout = None):
     return 0
 
 
+CLASSAD_TOKEN = re.compile(r"\((\w+):([^)]*)\)|(:::)")
+
+def parseClassAds(output):
+    """
+    _parseClassAds_
+
+    Parse the output of a condor_q or condor_history query made with the
+    -format options of getClassAds in a single pass.  Every ad is a list of
+    (key:value) statements ended by ::: and is returned in a dictionary
+    keyed by its WMAgent job id.
+    """
+    jobInfo = {}
+    ad      = {}
+    for key, value, end in CLASSAD_TOKEN.findall(output):
+        if not end:
+            ad[key] = value
+            continue
+        if 'WMAgentID' in ad:
+            jobInfo[int(ad['WMAgentID'])] = ad
+        elif ad:
+            # Then we have an invalid job somehow
+            logging.error("Invalid job discovered in condor_q")
+            logging.error(ad)
+        ad = {}
+
+    return jobInfo
+
+
+def submitEventNotes(job):
+    """
+    _submitEventNotes_
+
+    Notes written in the submit event of the user log of a job, they tell
+    the log of this submission from the ones of the previous retries.
+    """
+    return "WMAgent_JobID %s retry %s" % (job['jobid'], job['retry_count'])
+
+JDL_SEPARATOR = re.compile(r"(,\s*|\s+)")
+
+def compactSubmit(jobBlocks):
+    """
+    _compactSubmit_
+
+    Turn the JDL blocks of several jobs into the lines they share and a
+    queue ... from table with the values that change from job to job.
+
+    The blocks must set the same attributes in the same order.  Values are
+    split on commas and whitespace and every part that changes becomes a
+    column of the table.  A single attribute whose values don't split the
+    same way for every job, like a list of sites, goes in the last column,
+    which takes the rest of the row.
+    Returns None if the jobs can't be written that way.
+    """
+    if len(jobBlocks) == 0:
+        return None
+
+    nLines = len(jobBlocks[0])
+    for block in jobBlocks:
+        if len(block) != nLines:
+            return None
+
+    lines      = []
+    columns    = []
+    restColumn = None
+    for index in range(nLines):
+        jobLines = [block[index] for block in jobBlocks]
+        if jobLines.count(jobLines[0]) == len(jobLines):
+            lines.append(jobLines[0])
+            continue
+
+        key    = jobLines[0].split(' = ', 1)[0]
+        values = []
+        for line in jobLines:
+            attribute = line.rstrip('\n').split(' = ', 1)
+            if len(attribute) != 2 or attribute[0] != key:
+                return None
+            values.append(attribute[1])
+        macro = "WMA_%s" % re.sub(r"\W", "", key)
+
+        # Find the parts of the values that change
+        splitValues = [JDL_SEPARATOR.split(x) for x in values]
+        template    = []
+        changing    = []
+        nParts      = len(splitValues[0])
+        for parts in splitValues:
+            if len(parts) != nParts:
+                template = None
+                break
+        for position in range(nParts):
+            if template == None:
+                break
+            parts = [x[position] for x in splitValues]
+            if parts.count(parts[0]) == len(parts):
+                template.append(parts[0])
+            elif position % 2 == 0 and not '' in parts:
+                template.append(None)
+                changing.append(parts)
+            else:
+                # Separators that change
+                template = None
+
+        if template != None:
+            names = [macro]
+            if len(changing) > 1:
+                names = ["%s_%i" % (macro, x) for x in range(len(changing))]
+            columns.extend(zip(names, changing))
+            names = iter(names)
+            for position in range(len(template)):
+                if template[position] == None:
+                    template[position] = "$(%s)" % names.next()
+            lines.append("%s = %s\n" % (key, ''.join(template)))
+        elif restColumn == None and not '' in [x.strip() for x in values]:
+            restColumn = (macro, [x.strip() for x in values])
+            lines.append("%s = $(%s)\n" % (key, macro))
+        else:
+            return None
+
+    if restColumn != None:
+        columns.append(restColumn)
+
+    # Values are expanded like any other macro
+    for name, values in columns:
+        for value in values:
+            if '$' in value or value.startswith('#'):
+                return None
+
+    if len(columns) == 0:
+        lines.append("Queue %i\n" % len(jobBlocks))
+        return lines
+
+    lines.append("queue %s from (\n" % ", ".join([x[0] for x in columns]))
+    for row in zip(*[x[1] for x in columns]):
+        lines.append("%s\n" % " ".join(row))
+    lines.append(")\n")
+
+    return lines
+
 def parseError(error):
     """
     Do some basic condor error parsing
@@ -188,6 +331,21 @@ class CondorPlugin(BasePlugin):
         self.errorThreshold= getattr(config.BossAir, 'submitErrorThreshold', 10)
         self.errorCount    = 0
 
+        # Submit the jobs of a JDL with a single queue ... from table
+        # instead of one block per job, needs condor 8.4 or later
+        self.compactJDL    = getattr(config.BossAir, 'condorCompactJDL', False)
+
+        # In delta tracking mode the classAds are kept between cycles and
+        # only the jobs that changed state since the last cycle are queried,
+        # everything is queried again every fullRefreshInterval seconds
+        self.deltaTracking       = getattr(config.BossAir, 'condorDeltaTracking', False)
+        self.fullRefreshInterval = getattr(config.BossAir, 'condorFullRefreshInterval', 900)
+        self.classAds            = {}
+        self.lastClassAdsPoll    = 0
+        self.lastFullRefresh     = 0
+
+        # The user logs read by trackEvents, by runjob id
+        self.eventLogs = {}
 
         # Build ourselves a pool
         self.pool     = []
@@ -336,91 +494,82 @@ class CondorPlugin(BasePlugin):
             # Then was have nothing to do
             return successfulJobs, failedJobs
 
-        if len(self.pool) == 0:
-            # Starting things up
-            # This is obviously a submit API
-            logging.info("Starting up CondorPlugin worker pool")
-            self.input    = multiprocessing.Queue()
-            self.result   = multiprocessing.Queue()
-            for x in range(self.nProcess):
-                p = multiprocessing.Process(target = submitWorker,
-                                            args = (self.input, self.result, timeout))
-                p.start()
-                self.pool.append(p)
-
         if not os.path.exists(self.submitDir):
             os.makedirs(self.submitDir)
 
 
         # Now assume that what we get is the following; a mostly
         # unordered list of jobs with random sandboxes.
-        # We intend to sort them by sandbox.
+        # We intend to sort them by sandbox, and by what else goes in
+        # the common JDL header, so it's built once for each group.
 
         submitDict = {}
-        nSubmits   = 0
         for job in jobs:
-            sandbox = job['sandbox']
-            if not sandbox in submitDict.keys():
-                submitDict[sandbox] = []
-            submitDict[sandbox].append(job)
-
-
-        # Now submit the bastards
-        queueError = False
-        for sandbox in submitDict.keys():
-            jobList = submitDict.get(sandbox, [])
-            idList = [x['jobid'] for x in jobList]
-            if queueError:
-                # If the queue has failed, then we must not process
-                # any more jobs this cycle.
-                continue
-            while len(jobList) > 0:
-                jobsReady = jobList[:self.config.JobSubmitter.jobsPerWorker]
-                jobList   = jobList[self.config.JobSubmitter.jobsPerWorker:]
-                idList    = [x['id'] for x in jobsReady]
-                jdlList = self.makeSubmit(jobList = jobsReady)
+            key = (job['sandbox'], job.get('taskType', None), job.get('userdn', None))
+            submitDict.setdefault(key, []).append(job)
+
+        # Write the JDL of every condor_submit call of the cycle
+        jobsPerWorker = self.config.JobSubmitter.jobsPerWorker
+        jobsByID      = {}
+        submits       = []
+        for jobList in submitDict.values():
+            header = self.initSubmit(jobList)
+            for start in range(0, len(jobList), jobsPerWorker):
+                jobsReady = jobList[start:start + jobsPerWorker]
+                jdlList   = self.makeSubmit(jobList = jobsReady, header = header)
                 if not jdlList or jdlList == []:
                     # Then we got nothing
                     logging.error("No JDL file made!")
                     return {'NoResult': [0]}
+                idList = []
+                for job in jobsReady:
+                    jobsByID[job['id']] = job
+                    idList.append(job['id'])
                 jdlFile = "%s/submit_%i_%i.jdl" % (self.submitDir, os.getpid(), idList[0])
                 handle = open(jdlFile, 'w')
                 handle.writelines(jdlList)
                 handle.close()
                 jdlFiles.append(jdlFile)
 
-                # Now submit them
-                logging.info("About to submit %i jobs" %(len(jobsReady)))
-                if self.glexecPath:
-                    command = 'CS=`which condor_submit`; '
-                    if self.glexecWrapScript:
-                        command += 'export GLEXEC_ENV=`%s 2>/dev/null`; ' % self.glexecWrapScript
-                    command += 'export GLEXEC_CLIENT_CERT=%s; ' % self.glexecProxyFile
-                    command += 'export GLEXEC_SOURCE_PROXY=%s; ' % self.glexecProxyFile
-                    command += 'export X509_USER_PROXY=%s; ' % self.glexecProxyFile
-                    command += 'export GLEXEC_TARGET_PROXY=%s; ' % self.jdlProxyFile
-                    if self.glexecUnwrapScript:
-                        command += '%s %s -- $CS %s' % (self.glexecPath, self.glexecUnwrapScript, jdlFile)
-                    else:
-                        command += '%s $CS %s' % (self.glexecPath, jdlFile)
-                else:
-                    command = "condor_submit %s" % jdlFile
+                submits.append({'command': self.submitCommand(jdlFile), 'idList': idList})
 
-                try:
-                    self.input.put({'command': command, 'idList': idList})
-                except AssertionError, ex:
-                    msg =  "Critical error: input pipeline probably closed.\n"
-                    msg += str(ex)
-                    msg += "Error Procedure: Something critical has happened in the worker process\n"
-                    msg += "We will now proceed to pull all useful data from the queue (if it exists)\n"
-                    msg += "Then refresh the worker pool\n"
-                    logging.error(msg)
-                    queueError = True
-                    break
-                nSubmits += 1
+        if len(self.pool) == 0:
+            # Starting things up
+            # This is obviously a submit API
+            # There are at most nCondorProcesses condor_submit running
+            # at the same time, each one killed after getTimeout seconds
+            nProcess = min(self.nProcess, len(submits))
+            logging.info("Starting up CondorPlugin worker pool with %i processes" % nProcess)
+            self.input    = multiprocessing.Queue()
+            self.result   = multiprocessing.Queue()
+            for x in range(nProcess):
+                p = multiprocessing.Process(target = submitWorker,
+                                            args = (self.input, self.result, timeout))
+                p.start()
+                self.pool.append(p)
+
+        # Now submit the bastards
+        submitStart = time.time()
+        queueError  = False
+        nSubmits    = 0
+        for work in submits:
+            logging.info("About to submit %i jobs" % len(work['idList']))
+            try:
+                self.input.put(work)
+            except AssertionError, ex:
+                msg =  "Critical error: input pipeline probably closed.\n"
+                msg += str(ex)
+                msg += "Error Procedure: Something critical has happened in the worker process\n"
+                msg += "We will now proceed to pull all useful data from the queue (if it exists)\n"
+                msg += "Then refresh the worker pool\n"
+                logging.error(msg)
+                queueError = True
+                break
+            nSubmits += 1
 
         # Now we should have sent all jobs to be submitted
         # Going to do the rest of it now
+        submitTimes = []
         for n in range(nSubmits):
             try:
                 res = self.result.get(block = True, timeout = timeout)
@@ -460,6 +609,10 @@ class CondorPlugin(BasePlugin):
                 queueError = True
                 continue
 
+            submitTime = res.get('submitTime', 0)
+            submitTimes.append(submitTime)
+            logging.debug("condor_submit of %i jobs took %.2f seconds" % (len(idList), submitTime))
+
             if not exitCode == 0:
                 logging.error("Condor returned non-zero.  Printing out command stderr")
                 logging.error(error)
@@ -474,19 +627,14 @@ class CondorPlugin(BasePlugin):
                 condorErrorReport = Report()
                 condorErrorReport.addError("JobSubmit", 61202, "CondorError", errorMsg)
                 for jobID in idList:
-                    for job in jobs:
-                        if job.get('id', None) == jobID:
-                            job['fwjr'] = condorErrorReport
-                            failedJobs.append(job)
-                            break
+                    job = jobsByID[jobID]
+                    job['fwjr'] = condorErrorReport
+                    failedJobs.append(job)
             else:
                 if self.errorCount > 0:
                     self.errorCount -= 1
                 for jobID in idList:
-                    for job in jobs:
-                        if job.get('id', None) == jobID:
-                            successfulJobs.append(job)
-                            break
+                    successfulJobs.append(jobsByID[jobID])
 
             # If we get a lot of errors in a row it's probably time to
             # report this to the operators.
@@ -507,6 +655,14 @@ class CondorPlugin(BasePlugin):
                     # There's nothing we can really do here
                     pass
 
+        if len(submitTimes) > 0:
+            elapsed = time.time() - submitStart
+            logging.info("Submitted %i jobs, %i failed, in %i condor_submit calls in %.1f seconds (%.1f jobs/s)" \
+                         % (len(successfulJobs), len(failedJobs), len(submitTimes), elapsed,
+                            (len(successfulJobs) + len(failedJobs)) / max(elapsed, 0.001)))
+            logging.info("condor_submit latency: %.2f seconds average, %.2f seconds max" \
+                         % (sum(submitTimes) / len(submitTimes), max(submitTimes)))
+
         # Remove JDL files unless commanded otherwise
         if getattr(self.config.JobSubmitter, 'deleteJDLFiles', True):
             for f in jdlFiles:
@@ -529,6 +685,30 @@ class CondorPlugin(BasePlugin):
 
 
 
+    def submitCommand(self, jdlFile):
+        """
+        _submitCommand_
+
+        Build the command submitting a JDL file, through glexec if needed
+        """
+        if self.glexecPath:
+            command = 'CS=`which condor_submit`; '
+            if self.glexecWrapScript:
+                command += 'export GLEXEC_ENV=`%s 2>/dev/null`; ' % self.glexecWrapScript
+            command += 'export GLEXEC_CLIENT_CERT=%s; ' % self.glexecProxyFile
+            command += 'export GLEXEC_SOURCE_PROXY=%s; ' % self.glexecProxyFile
+            command += 'export X509_USER_PROXY=%s; ' % self.glexecProxyFile
+            command += 'export GLEXEC_TARGET_PROXY=%s; ' % self.jdlProxyFile
+            if self.glexecUnwrapScript:
+                command += '%s %s -- $CS %s' % (self.glexecPath, self.glexecUnwrapScript, jdlFile)
+            else:
+                command += '%s $CS %s' % (self.glexecPath, jdlFile)
+        else:
+            command = "condor_submit %s" % jdlFile
+
+        return command
+
+
     def track(self, jobs, info = None):
         """
         _track_
@@ -553,12 +733,12 @@ class CondorPlugin(BasePlugin):
         jobInfo = self.getClassAds()
         if jobInfo == None:
             return runningList, changeList, completeList
-        if len(jobInfo.keys()) == 0:
+        if len(jobInfo) == 0:
             noInfoFlag = True
 
         for job in jobs:
             # Now go over the jobs from WMBS and see what we have
-            if not job['jobid'] in jobInfo.keys():
+            if not job['jobid'] in jobInfo:
                 # Two options here, either put in removed, or not
                 # Only cycle through Removed if condor_q is sending
                 # us no information
@@ -624,6 +804,93 @@ class CondorPlugin(BasePlugin):
         return runningList, changeList, completeList
 
 
+    def trackEvents(self, jobs, info = None):
+        """
+        _trackEvents_
+
+        Track the jobs from the events condor writes in their user logs
+        instead of querying the whole queue.  Only the events appended since
+        the last cycle are read, so only the jobs that had some are changed
+        or completed.  Jobs whose log can't be found yet, or was written for
+        a previous retry, are tracked with condor_q.
+        Returns the same three lists as track.
+        """
+        changeList   = []
+        completeList = []
+        runningList  = []
+        unboundJobs  = []
+        eventLogs    = {}
+
+        stateMap = CondorPlugin.stateMap()
+
+        for job in jobs:
+            eventLog = self.eventLogs.get(job['id'], None)
+            if eventLog == None:
+                eventLog, events = self.bindEventLog(job)
+                if eventLog == None:
+                    unboundJobs.append(job)
+                    continue
+            else:
+                events = eventLog.readEvents()
+
+            statName   = job['status']
+            statTime   = job['status_time']
+            isComplete = False
+            for event in events:
+                eventType = event.get('EventTypeNumber', None)
+                if eventType in EVENT_STATES:
+                    statName = EVENT_STATES[eventType]
+                    statTime = eventTime(event)
+                if eventType in TERMINAL_EVENTS:
+                    isComplete = True
+
+            if isComplete:
+                completeList.append(job)
+                continue
+
+            eventLogs[job['id']] = eventLog
+            if statName != job['status']:
+                job['status']      = statName
+                job['status_time'] = statTime
+                changeList.append(job)
+
+            job['globalState'] = stateMap[job['status']]
+            runningList.append(job)
+
+        # Forget the logs of the jobs that are gone
+        self.eventLogs = eventLogs
+
+        if len(unboundJobs) > 0:
+            logging.info("Tracking %i jobs without user log with condor_q" % len(unboundJobs))
+            localRunning, localChanges, localCompletes = self.track(jobs = unboundJobs)
+            runningList.extend(localRunning)
+            changeList.extend(localChanges)
+            completeList.extend(localCompletes)
+
+        return runningList, changeList, completeList
+
+
+    def bindEventLog(self, job):
+        """
+        _bindEventLog_
+
+        Find the user log of the current submission of a job, the one of the
+        last cluster submitted from its cache directory if its submit event
+        was written for this retry.  Return the log and the events read from
+        it, or None and an empty list.
+        """
+        logPath = latestEventLog(job['cache_dir'])
+        if logPath == None:
+            return None, []
+
+        eventLog = CondorEventLog(logPath)
+        events   = eventLog.readEvents()
+        if len(events) == 0 or events[0].get('LogNotes', None) != submitEventNotes(job):
+            return None, []
+
+        return eventLog, events
+
+
     def complete(self, jobs):
         """
         Do any completion work required
@@ -810,11 +1077,12 @@ class CondorPlugin(BasePlugin):
 
         return jdl
 
-    def makeSubmit(self, jobList):
+    def makeSubmit(self, jobList, header = None):
         """
         _makeSubmit_
 
         For a given job/cache/spec make a JDL fragment to submit the job
+        The common JDL header is built with initSubmit unless one is passed
 
         """
 
@@ -823,45 +1091,70 @@ class CondorPlugin(BasePlugin):
             logging.error("No jobs passed to plugin")
             return None
 
-        jdl = self.initSubmit(jobList)
+        if header == None:
+            jdl = self.initSubmit(jobList)
+        else:
+            jdl = list(header)
 
 
         # For each script we have to do queue a separate directory, etc.
+        jobBlocks = []
         for job in jobList:
             if job == {}:
                 # Then I don't know how we got here either
                 logging.error("Was passed a nonexistant job.  Ignoring")
                 continue
-            jdl.append("initialdir = %s\n" % job['cache_dir'])
-            jdl.append("transfer_input_files = %s, %s/%s, %s\n" \
-                       % (job['sandbox'], job['packageDir'],
-                          'JobPackage.pkl', self.unpacker))
-            argString = "arguments = %s %i\n" \
-                        % (os.path.basename(job['sandbox']), job['id'])
-            jdl.append(argString)
+            jobBlocks.append(self.makeJobSubmit(job))
+
+        if self.compactJDL:
+            table = compactSubmit(jobBlocks)
+            if table != None:
+                jdl.extend(table)
+                return jdl
+            logging.info("Jobs don't fit in a queue table, writing one JDL block per job")
 
-            jdl.extend(self.customizePerJob(job))
+        for block in jobBlocks:
+            jdl.extend(block)
+            jdl.append("Queue 1\n")
 
-            # Transfer the output files
-            jdl.append("transfer_output_files = Report.%i.pkl\n" % (job["retry_count"]))
+        return jdl
 
-            # Add priority if necessary
-            if job.get('priority', None) != None:
-                try:
-                    prio = int(job['priority'])
-                    jdl.append("priority = %i\n" % prio)
-                except ValueError:
-                    logging.error("Priority for job %i not castable to an int\n" % job['id'])
-                    logging.error("Not setting priority")
-                    logging.debug("Priority: %s" % job['priority'])
-                except Exception, ex:
-                    logging.error("Got unhandled exception while setting priority for job %i\n" % job['id'])
-                    logging.error(str(ex))
-                    logging.error("Not setting priority")
+    def makeJobSubmit(self, job):
+        """
+        _makeJobSubmit_
+
+        Make the JDL lines of a single job, without its Queue statement
+        """
+        jdl = []
+        jdl.append("initialdir = %s\n" % job['cache_dir'])
+        jdl.append("transfer_input_files = %s, %s/%s, %s\n" \
+                   % (job['sandbox'], job['packageDir'],
+                      'JobPackage.pkl', self.unpacker))
+        argString = "arguments = %s %i\n" \
+                    % (os.path.basename(job['sandbox']), job['id'])
+        jdl.append(argString)
 
-            jdl.append("+WMAgent_JobID = %s\n" % job['jobid'])
+        jdl.extend(self.customizePerJob(job))
 
-            jdl.append("Queue 1\n")
+        # Transfer the output files
+        jdl.append("transfer_output_files = Report.%i.pkl\n" % (job["retry_count"]))
+
+        # Add priority if necessary
+        if job.get('priority', None) != None:
+            try:
+                prio = int(job['priority'])
+                jdl.append("priority = %i\n" % prio)
+            except ValueError:
+                logging.error("Priority for job %i not castable to an int\n" % job['id'])
+                logging.error("Not setting priority")
+                logging.debug("Priority: %s" % job['priority'])
+            except Exception, ex:
+                logging.error("Got unhandled exception while setting priority for job %i\n" % job['id'])
+                logging.error(str(ex))
+                logging.error("Not setting priority")
+
+        jdl.append("+WMAgent_JobID = %s\n" % job['jobid'])
+        jdl.append("submit_event_notes = %s\n" % submitEventNotes(job))
 
         return jdl
 
@@ -915,62 +1208,84 @@ class CondorPlugin(BasePlugin):
         """
         _getClassAds_
 
-        Grab classAds from condor_q using xml parsing
-        """
+        Return the classAds of the jobs of this agent keyed by WMAgent job id,
+        or None if condor could not be queried.
 
-        constraint = "\"WMAgent_JobID =!= UNDEFINED\""
+        In delta tracking mode the classAds of the previous cycle are updated
+        with the jobs that entered a new state since then, and the jobs that
+        left the queue, as listed by condor_history, are dropped.
+        """
+        if not self.deltaTracking:
+            return self.queryClassAds()
+
+        pollTime = int(time.time())
+        if pollTime - self.lastFullRefresh >= self.fullRefreshInterval:
+            jobInfo = self.queryClassAds()
+            if jobInfo == None:
+                return None
+            self.classAds        = jobInfo
+            self.lastFullRefresh = pollTime
+        else:
+            # Leave some margin for the clock of the schedd
+            constraint = 'EnteredCurrentStatus >= %i' % (self.lastClassAdsPoll - 60)
+            leftJobs = self.queryClassAds(constraint = constraint, history = True)
+            changedJobs = self.queryClassAds(constraint = constraint)
+            if leftJobs == None or changedJobs == None:
+                # Start over from a full refresh
+                self.lastFullRefresh = 0
+                return None
+            for jobID in leftJobs:
+                self.classAds.pop(jobID, None)
+            self.classAds.update(changedJobs)
+            logging.info("Updated %i and removed %i out of %i classAds" % (len(changedJobs), len(leftJobs),
+                                                                          len(self.classAds)))
+
+        self.lastClassAdsPoll = pollTime
+        return self.classAds
+
+    def queryClassAds(self, constraint = None, history = False):
+        """
+        _queryClassAds_
 
+        Grab classAds from condor_q, or from condor_history for the jobs that
+        left the queue, for the jobs of this agent matching the constraint.
+        """
+        if history:
+            command = ['condor_history']
+        else:
+            command = ['condor_q']
+        command.extend(['-constraint', 'WMAgent_JobID =!= UNDEFINED',
+                        '-constraint', 'WMAgent_AgentName == \"%s\"' % (self.agent)])
+        if constraint:
+            command.extend(['-constraint', constraint])
+        if not history:
+            command.extend(['-format', '(JobStatus:\%s)  ', 'JobStatus',
+                            '-format', '(stateTime:\%s)  ', 'EnteredCurrentStatus',
+                            '-format', '(runningTime:\%s)  ', 'JobStartDate',
+                            '-format', '(submitTime:\%s)  ', 'QDate'])
+        command.extend(['-format', '(WMAgentID:\%d):::',  'WMAgent_JobID'])
+
+        stdout = self.runQuery(command)
+        if stdout == None:
+            return None
 
-        jobInfo = {}
+        jobInfo = parseClassAds(stdout)
+        logging.info("Retrieved %i classAds from %s" % (len(jobInfo), command[0]))
+        return jobInfo
 
-        command = ['condor_q', '-constraint', 'WMAgent_JobID =!= UNDEFINED',
-                   '-constraint', 'WMAgent_AgentName == \"%s\"' % (self.agent),
-                   '-format', '(JobStatus:\%s)  ', 'JobStatus',
-                   '-format', '(stateTime:\%s)  ', 'EnteredCurrentStatus',
-                   '-format', '(runningTime:\%s)  ', 'JobStartDate',
-                   '-format', '(submitTime:\%s)  ', 'QDate',
-                   '-format', '(WMAgentID:\%d):::',  'WMAgent_JobID']
+    def runQuery(self, command):
+        """
+        _runQuery_
 
+        Run a condor query, return its output or None if it failed.
+        """
         pipe = subprocess.Popen(command, stdout = subprocess.PIPE, stderr = subprocess.PIPE, shell = False)
         stdout, stderr = pipe.communicate()
-        classAdsRaw = stdout.split(':::')
 
         if not pipe.returncode == 0:
             # Then things have gotten bad - condor_q is not responding
-            logging.error("condor_q returned non-zero value %s" % str(pipe.returncode))
+            logging.error("%s returned non-zero value %s" % (command[0], str(pipe.returncode)))
             logging.error("Skipping classAd processing this round")
             return None
 
-
-        if classAdsRaw == '':
-            # We have no jobs
-            return jobInfo
-
-        for ad in classAdsRaw:
-            # There should be one for every job
-            if not re.search("\(", ad):
-                # There is no ad.
-                # Don't know what happened here
-                continue
-            statements = ad.split('(')
-            tmpDict = {}
-            for statement in statements:
-                # One for each value
-                if not re.search(':', statement):
-                    # Then we have an empty statement
-                    continue
-                key = str(statement.split(':')[0])
-                value = statement.split(':')[1].split(')')[0]
-                tmpDict[key] = value
-            if not 'WMAgentID' in tmpDict.keys():
-                # Then we have an invalid job somehow
-                logging.error("Invalid job discovered in condor_q")
-                logging.error(tmpDict)
-                continue
-            else:
-                jobInfo[int(tmpDict['WMAgentID'])] = tmpDict
-
-        logging.info("Retrieved %i classAds" % len(jobInfo))
-
-
-        return jobInfo
+        return stdout
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+"""
+_JobCacheStore_
+
+Batched storage for the job objects that the JobCreator pickles into the
+job cache.
+
+Instead of writing one job.pkl per job directory, all the jobs of a job
+collection (the JobCollection_<group>_<n> directory that holds the job
+directories) are appended to a single data file, with an index keyed by
+WMBS job id:
+
+  JobCollection_X_Y/jobCache.dat  - pickled jobs, one after the other
+  JobCollection_X_Y/jobCache.idx  - one "jobid offset length" line per job
+
+Both files are append only.  The data is written before the index so a
+reader never sees an index entry for a partially written job.  Readers fall
+back to the per job job.pkl layout when a job is not found in a store, so
+the two layouts can coexist in the same agent.
+
+Whatever the layout, the collection also gets a submitInfo.json sidecar with
+the few fields the JobSubmitter needs to place a job (SUBMIT_FIELDS).  The
+first line holds the field names, every other line the JSON list of values
+for one job, so the JobSubmitter can fill its cache without unpickling jobs.
+"""
+
+import os
+import os.path
+import json
+import cPickle
+import logging
+
+from WMCore.WMException import WMException
+
+STORE_DATA  = "jobCache.dat"
+STORE_INDEX = "jobCache.idx"
+JOB_PICKLE  = "job.pkl"
+SUBMIT_INFO = "submitInfo.json"
+
+SUBMIT_FIELDS = ["id", "name", "workflow", "sandbox", "cache_dir", "ownerDN",
+                 "ownerGroup", "ownerRole", "priority", "scramArch",
+                 "swVersion", "proxyPath", "locations", "siteWhitelist",
+                 "siteBlacklist"]
+
+class JobCacheStoreException(WMException):
+    """
+    _JobCacheStoreException_
+
+    Problems reading or writing a job cache store.
+    """
+    pass
+
+def getStoreDir(cacheDir):
+    """
+    _getStoreDir_
+
+    The store for a job lives in the directory that contains the job cache
+    directory.
+    """
+    return os.path.dirname(os.path.normpath(cacheDir))
+
+def appendJobs(storeDir, jobs):
+    """
+    _appendJobs_
+
+    Append a list of jobs to the store in storeDir, creating it if needed.
+    """
+    entries = []
+    dataFile = open(os.path.join(storeDir, STORE_DATA), "ab")
+    try:
+        dataFile.seek(0, os.SEEK_END)
+        offset = dataFile.tell()
+        for job in jobs:
+            data = cPickle.dumps(job, cPickle.HIGHEST_PROTOCOL)
+            dataFile.write(data)
+            entries.append("%i %i %i\n" % (job["id"], offset, len(data)))
+            offset += len(data)
+        dataFile.flush()
+        os.fsync(dataFile.fileno())
+    finally:
+        dataFile.close()
+
+    indexFile = open(os.path.join(storeDir, STORE_INDEX), "a")
+    try:
+        indexFile.write("".join(entries))
+        indexFile.flush()
+        os.fsync(indexFile.fileno())
+    finally:
+        indexFile.close()
+
+    return
+
+def readIndex(storeDir):
+    """
+    _readIndex_
+
+    Load the index of the store in storeDir into a dictionary keyed by job
+    id with (offset, length) values.  Returns an empty dictionary if there
+    is no store.
+    """
+    index = {}
+    indexPath = os.path.join(storeDir, STORE_INDEX)
+    if not os.path.isfile(indexPath):
+        return index
+
+    indexFile = open(indexPath, "r")
+    try:
+        for line in indexFile:
+            fields = line.split()
+            if len(fields) != 3:
+                # Incomplete last line of an interrupted write
+                continue
+            index[int(fields[0])] = (int(fields[1]), int(fields[2]))
+    finally:
+        indexFile.close()
+
+    return index
+
+def makeSubmitInfo(job):
+    """
+    _makeSubmitInfo_
+
+    Extract the JobSubmitter fields of a job into a dictionary.  The
+    locations are the ones of the first input file, all the input files of
+    a job have the same locations.
+    """
+    submitInfo = {}
+    for field in SUBMIT_FIELDS:
+        submitInfo[field] = job.get(field, None)
+
+    submitInfo["ownerGroup"] = job.get("ownerGroup", "")
+    submitInfo["ownerRole"] = job.get("ownerRole", "")
+    submitInfo["siteWhitelist"] = list(job.get("siteWhitelist", []))
+    submitInfo["siteBlacklist"] = list(job.get("siteBlacklist", []))
+    if job.get("input_files", []):
+        submitInfo["locations"] = list(job["input_files"][0]["locations"])
+    else:
+        submitInfo["locations"] = []
+
+    return submitInfo
+
+def appendSubmitInfo(storeDir, jobs):
+    """
+    _appendSubmitInfo_
+
+    Append the submit information of a list of jobs to the sidecar in
+    storeDir, creating it if needed.
+    """
+    lines = []
+    infoPath = os.path.join(storeDir, SUBMIT_INFO)
+    if not os.path.exists(infoPath):
+        lines.append(json.dumps(SUBMIT_FIELDS))
+
+    for job in jobs:
+        submitInfo = makeSubmitInfo(job)
+        lines.append(json.dumps([submitInfo[x] for x in SUBMIT_FIELDS]))
+
+    infoFile = open(infoPath, "a")
+    try:
+        infoFile.write("\n".join(lines) + "\n")
+        infoFile.flush()
+        os.fsync(infoFile.fileno())
+    finally:
+        infoFile.close()
+
+    return
+
+def readSubmitInfo(storeDir):
+    """
+    _readSubmitInfo_
+
+    Load the submit information sidecar in storeDir into a dictionary of
+    submit information dictionaries keyed by job id.  Returns an empty
+    dictionary if there is no sidecar.
+    """
+    submitInfo = {}
+    infoPath = os.path.join(storeDir, SUBMIT_INFO)
+    if not os.path.isfile(infoPath):
+        return submitInfo
+
+    infoFile = open(infoPath, "r")
+    try:
+        fields = None
+        for line in infoFile:
+            try:
+                values = json.loads(line)
+            except ValueError:
+                # Incomplete last line of an interrupted write
+                continue
+            if fields == None:
+                fields = [str(x) for x in values]
+                continue
+            jobInfo = dict(zip(fields, values))
+            submitInfo[jobInfo["id"]] = jobInfo
+    finally:
+        infoFile.close()
+
+    return submitInfo
+
+def cleanStore(storeDir):
+    """
+    _cleanStore_
+
+    Remove the store in storeDir once none of its job directories are left.
+    """
+    if not os.path.isdir(storeDir):
+        return
+    for entry in os.listdir(storeDir):
+        if entry.startswith("job_"):
+            return
+    for fileName in [SUBMIT_INFO, STORE_INDEX, STORE_DATA]:
+        filePath = os.path.join(storeDir, fileName)
+        if os.path.exists(filePath):
+            os.remove(filePath)
+    return
+
+
+class JobCacheWriter(object):
+    """
+    _JobCacheWriter_
+
+    Collect jobs and write them to the job cache.  With useStore the jobs
+    are grouped by store and appended in one go on flush(), otherwise each
+    job is written straight away as a job.pkl file in its cache directory.
+    The submit information of all the jobs is written on flush().
+    """
+    def __init__(self, useStore = True):
+        self.useStore = useStore
+        self.pending  = {}
+        return
+
+    def add(self, job):
+        """
+        _add_
+
+        Queue a job for writing.  The job must have its cache_dir set.
+        """
+        if not self.useStore:
+            output = open(os.path.join(job["cache_dir"], JOB_PICKLE), "w")
+            cPickle.dump(job, output, cPickle.HIGHEST_PROTOCOL)
+            output.close()
+
+        self.pending.setdefault(getStoreDir(job["cache_dir"]), []).append(job)
+        return
+
+    def flush(self):
+        """
+        _flush_
+
+        Write all the queued jobs to their stores.
+        """
+        for storeDir in self.pending.keys():
+            if self.useStore:
+                appendJobs(storeDir, self.pending[storeDir])
+            appendSubmitInfo(storeDir, self.pending[storeDir])
+        self.pending = {}
+        return
+
+
+class JobCacheReader(object):
+    """
+    _JobCacheReader_
+
+    Read jobs back from the job cache.  Store indexes are read once and kept
+    for the lifetime of the reader, so use a new reader for every polling
+    cycle.  Jobs that are not in a store are read from their job.pkl.
+    """
+    def __init__(self):
+        self.indexes  = {}
+        self.submitInfo = {}
+        self.dataDir  = None
+        self.dataFile = None
+        return
+
+    def _getEntry(self, jobID, cacheDir):
+        """
+        _getEntry_
+
+        Return the store directory and (offset, length) of a job, or None if
+        the job is not in a store.
+        """
+        storeDir = getStoreDir(cacheDir)
+        if not storeDir in self.indexes:
+            self.indexes[storeDir] = readIndex(storeDir)
+
+        entry = self.indexes[storeDir].get(int(jobID), None)
+        if entry == None:
+            return None
+        return (storeDir, entry[0], entry[1])
+
+    def loadRaw(self, jobID, cacheDir):
+        """
+        _loadRaw_
+
+        Return the pickled job as a string, or None if the job cannot be
+        found in either layout.
+        """
+        entry = self._getEntry(jobID, cacheDir)
+        if entry == None:
+            pickledJobPath = os.path.join(cacheDir, JOB_PICKLE)
+            if not os.path.isfile(pickledJobPath):
+                return None
+            jobHandle = open(pickledJobPath, "rb")
+            try:
+                return jobHandle.read()
+            finally:
+                jobHandle.close()
+
+        storeDir, offset, length = entry
+        if storeDir != self.dataDir:
+            # Jobs usually come ordered by id, only keep the last store open
+            self.close()
+            self.dataFile = open(os.path.join(storeDir, STORE_DATA), "rb")
+            self.dataDir  = storeDir
+
+        self.dataFile.seek(offset)
+        data = self.dataFile.read(length)
+        if len(data) != length:
+            msg = "Truncated job cache store %s for job %s" % (storeDir, jobID)
+            logging.error(msg)
+            raise JobCacheStoreException(msg)
+        return data
+
+    def loadJob(self, jobID, cacheDir):
+        """
+        _loadJob_
+
+        Return the unpickled job, or None if the job cannot be found.
+        """
+        data = self.loadRaw(jobID, cacheDir)
+        if data == None:
+            return None
+        return cPickle.loads(data)
+
+    def loadSubmitInfo(self, jobID, cacheDir):
+        """
+        _loadSubmitInfo_
+
+        Return the submit information of a job as a dictionary with the
+        SUBMIT_FIELDS keys.  Jobs created before the sidecar existed are
+        unpickled instead.  Returns None if the job cannot be found.
+        """
+        storeDir = getStoreDir(cacheDir)
+        if not storeDir in self.submitInfo:
+            self.submitInfo[storeDir] = readSubmitInfo(storeDir)
+
+        submitInfo = self.submitInfo[storeDir].get(int(jobID), None)
+        if submitInfo != None:
+            return submitInfo
+
+        job = self.loadJob(jobID, cacheDir)
+        if job == None:
+            return None
+        return makeSubmitInfo(job)
+
+    def close(self):
+        """
+        _close_
+
+        Close the open store data file.
+        """
+        if self.dataFile:
+            self.dataFile.close()
+        self.dataFile = None
+        self.dataDir  = None
+        return
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+"""
+_MemoryCache_
+
+Thread safe, size bounded LRU cache with a time to live per entry.
+
+Values are computed by a fetch function on a miss.  Threads asking for a key
+that is already being fetched wait for that fetch instead of running their
+own, and get its result or its exception.  Hits, misses, coalesced requests,
+expirations, evictions and the time spent fetching are counted in stats.
+"""
+
+import time
+import threading
+
+# Fields of the entries of the recently used list
+PREV, NEXT, KEY, EXPIRES, VALUE = 0, 1, 2, 3, 4
+
+
+class MemoryCache(object):
+    """
+    _MemoryCache_
+
+    Entries are kept in a dict and in a circular doubly linked list ordered
+    from the least to the most recently used one, so that lookups, moves and
+    evictions are all O(1).  Each entry is a list [prev, next, key, expires,
+    value], the list starts and ends at the root entry.
+    """
+    def __init__(self, maxSize = 1000):
+        self.maxSize = maxSize
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.root = []
+        self.root[:] = [self.root, self.root, None, None, None]
+        self.inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "expired": 0,
+                      "evicted": 0, "errors": 0, "fetchTime": 0.0,
+                      "maxFetchTime": 0.0}
+        return
+
+    def get(self, key, fetch, ttl):
+        """
+        _get_
+
+        Return the value cached for key, call fetch to get it if it is not
+        cached or is older than ttl seconds.
+        """
+        leader = False
+        self.lock.acquire()
+        try:
+            entry = self.entries.get(key, None)
+            if entry != None:
+                if entry[EXPIRES] > time.time():
+                    self.stats["hits"] += 1
+                    self._unlink(entry)
+                    self._append(entry)
+                    return entry[VALUE]
+                self.stats["expired"] += 1
+                self._remove(key)
+
+            request = self.inflight.get(key, None)
+            if request == None:
+                request = {"done": threading.Event(), "value": None, "error": None}
+                self.inflight[key] = request
+                self.stats["misses"] += 1
+                leader = True
+            else:
+                self.stats["coalesced"] += 1
+        finally:
+            self.lock.release()
+
+        if not leader:
+            request["done"].wait()
+            if request["error"] != None:
+                raise request["error"]
+            return request["value"]
+
+        startTime = time.time()
+        try:
+            value = fetch()
+        except Exception, ex:
+            self.lock.acquire()
+            self.stats["errors"] += 1
+            del self.inflight[key]
+            self.lock.release()
+            request["error"] = ex
+            request["done"].set()
+            raise
+
+        fetchTime = time.time() - startTime
+        self.lock.acquire()
+        try:
+            self._store(key, value, ttl)
+            del self.inflight[key]
+            self.stats["fetchTime"] += fetchTime
+            self.stats["maxFetchTime"] = max(self.stats["maxFetchTime"], fetchTime)
+        finally:
+            self.lock.release()
+
+        request["value"] = value
+        request["done"].set()
+        return value
+
+    def set(self, key, value, ttl):
+        """
+        _set_
+
+        Cache a value obtained out of get(), e.g. by a forced refresh.
+        """
+        self.lock.acquire()
+        try:
+            self._store(key, value, ttl)
+        finally:
+            self.lock.release()
+        return
+
+    def _store(self, key, value, ttl):
+        """
+        _store_
+
+        Add a value as the most recently used one and drop the least recently
+        used ones above maxSize, must be called with the lock held.
+        """
+        self._remove(key)
+        entry = [None, None, key, time.time() + ttl, value]
+        self.entries[key] = entry
+        self._append(entry)
+        while len(self.entries) > self.maxSize:
+            self._remove(self.root[NEXT][KEY])
+            self.stats["evicted"] += 1
+        return
+
+    def _append(self, entry):
+        """
+        _append_
+
+        Link an entry as the most recently used one.
+        """
+        last = self.root[PREV]
+        entry[PREV] = last
+        entry[NEXT] = self.root
+        last[NEXT] = entry
+        self.root[PREV] = entry
+        return
+
+    def _unlink(self, entry):
+        """
+        _unlink_
+
+        Take an entry out of the recently used list.
+        """
+        entry[PREV][NEXT] = entry[NEXT]
+        entry[NEXT][PREV] = entry[PREV]
+        return
+
+    def _remove(self, key):
+        """
+        _remove_
+
+        Drop the entry of key if there is one, must be called with the lock
+        held.
+        """
+        entry = self.entries.pop(key, None)
+        if entry != None:
+            self._unlink(entry)
+        return
+
+    def invalidate(self, key):
+        """
+        _invalidate_
+
+        Drop the value cached for key.
+        """
+        self.lock.acquire()
+        self._remove(key)
+        self.lock.release()
+        return
+
+    def clear(self):
+        """
+        _clear_
+
+        Drop all the cached values.
+        """
+        self.lock.acquire()
+        self.entries.clear()
+        self.root[:] = [self.root, self.root, None, None, None]
+        self.lock.release()
+        return
+
+    def getStats(self):
+        """
+        _getStats_
+
+        Return a copy of the counters with the number of cached values and
+        the mean fetch time in seconds.
+        """
+        self.lock.acquire()
+        stats = dict(self.stats)
+        stats["size"] = len(self.entries)
+        self.lock.release()
+        fetches = stats["misses"] - stats["errors"]
+        if fetches:
+            stats["meanFetchTime"] = stats["fetchTime"] / fetches
+        else:
+            stats["meanFetchTime"] = 0.0
+        return stats
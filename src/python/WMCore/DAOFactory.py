@@ -3,26 +3,57 @@ A basic action is a thing that will run a SQL statement
 
 A more complex one would be something that ran multiple SQL
 objects to produce a single output.
+
+DAO classes are cached per package, dialect and classname for all the
+factories of the process.  Factories created with cacheInstances = True
+also share the DAO objects themselves, per thread and database interface,
+so only use it for DAOs that don't keep state between calls.  The cache
+hits and misses are counted in cacheStats for profiling.
 """
+import threading
+
 from WMCore.Database.Dialects import MySQLDialect
 from WMCore.Database.Dialects import SQLiteDialect
 from WMCore.Database.Dialects import OracleDialect
 
+cacheStats = {"classHits": 0, "classMisses": 0,
+              "instanceHits": 0, "instanceMisses": 0}
+
+_daoClasses = {}
+_daoClassesLock = threading.Lock()
+_daoInstances = threading.local()
+
+def getCacheStats():
+    """
+    _getCacheStats_
+
+    Return a copy of the DAO cache counters.
+    """
+    return dict(cacheStats)
+
 class DAOFactory(object):
-    def __init__(self, package='WMCore', logger=None, dbinterface=None, owner=""):
+    def __init__(self, package='WMCore', logger=None, dbinterface=None, owner="",
+                 cacheInstances=False):
         self.package = package
         self.logger = logger
         self.dbinterface = dbinterface
         self.owner = owner
+        self.cacheInstances = cacheInstances
+        self.dialect = None
         #self.logger.debug("Instantiating DAOFactory for %s package" % self.package)
         self.dialects = {"Oracle" : OracleDialect,
                     "MySQL" : MySQLDialect,
                     "SQLite" : SQLiteDialect}
 
-    def __call__(self, classname):
+    def getDialect(self):
         """
-        Somewhat fugly method to load generic SQL classes...
+        _getDialect_
+
+        Work out the dialect of the database interface, only once.
         """
+        if self.dialect:
+            return self.dialect
+
         if not isinstance(self.dbinterface, str):
 
             dia = self.dbinterface.engine.dialect
@@ -36,12 +67,57 @@ class DAOFactory(object):
         else:
             dialect = 'CouchDB'
 
+        self.dialect = dialect
+        return dialect
+
+    def getClass(self, classname):
+        """
+        _getClass_
+
+        Import the DAO class for the given classname, or take it from the
+        cache.
+        """
+        key = (self.package, self.getDialect(), classname)
+        daoClass = _daoClasses.get(key, None)
+        if daoClass != None:
+            cacheStats["classHits"] += 1
+            return daoClass
 
-        module = "%s.%s.%s" % (self.package, dialect, classname)
+        cacheStats["classMisses"] += 1
+        module = "%s.%s.%s" % key
         #self.logger.debug("importing %s, %s" % (module, classname))
-        module = __import__(module, globals(), locals(), [classname])#, -1)
-        instance = getattr(module, classname.split('.')[-1])
+        _daoClassesLock.acquire()
+        try:
+            module = __import__(module, globals(), locals(), [classname])#, -1)
+            daoClass = getattr(module, classname.split('.')[-1])
+            _daoClasses[key] = daoClass
+        finally:
+            _daoClassesLock.release()
+        return daoClass
+
+    def __call__(self, classname):
+        """
+        Somewhat fugly method to load generic SQL classes...
+        """
+        daoClass = self.getClass(classname)
+
+        if self.cacheInstances:
+            instances = getattr(_daoInstances, "instances", None)
+            if instances == None:
+                instances = _daoInstances.instances = {}
+            key = (self.package, self.dialect, classname, self.owner,
+                   id(self.dbinterface))
+            dao = instances.get(key, None)
+            if dao != None and getattr(dao, "dbi", None) is self.dbinterface:
+                cacheStats["instanceHits"] += 1
+                return dao
+            cacheStats["instanceMisses"] += 1
+
         if self.owner:
-            return instance(self.logger, self.dbinterface, self.owner)
+            dao = daoClass(self.logger, self.dbinterface, self.owner)
         else:
-            return instance(self.logger, self.dbinterface)
+            dao = daoClass(self.logger, self.dbinterface)
+
+        if self.cacheInstances:
+            instances[key] = dao
+        return dao
@@ -9,6 +9,7 @@ __all__ = []
 
 
 import datetime
+import operator
 from WMCore.DataStructs.WMObject import WMObject
 from WMCore.DataStructs.Run import Run
 
@@ -51,21 +52,78 @@ class File(WMObject, dict):
 
         """
 
-        if not isinstance(run, Run):
-            msg = "addRun argument must be of type WMCore.DataStructs.Run"
-            raise RuntimeError, msg
+        self.addRuns([run])
+        return
+
+    def addRuns(self, runs):
+        """
+        _addRuns_
+
+        Bulk version of addRun, add a list of WMCore.DataStructs.Run
+        objects to this file.  Runs with a number the file already has are
+        merged into the existing run, the lumis of the runs in the file are
+        kept sorted.
+        """
+        runIndex = self.getRunIndex()
+
+        for run in runs:
+            if not isinstance(run, Run):
+                msg = "addRun argument must be of type WMCore.DataStructs.Run"
+                raise RuntimeError, msg
 
-        addFlag = False
-        for runMember in self['runs']:
-            if runMember.run ==  run.run:
+            if run.run in runIndex:
                 # this rely on Run object overwrite __add__ to update self
-                runMember + run
-                addFlag = True
+                runIndex[run.run] + run
+            else:
+                run.lumis.sort()
+                self['runs'].add(run)
+                runIndex[run.run] = run
 
-        if not addFlag:
-            self['runs'].add(run)
+        self._runIndex[1] = len(self['runs'])
         return
 
+    def getRunIndex(self):
+        """
+        _getRunIndex_
+
+        Return a dictionary of the runs of this file keyed by run number.
+        The index is kept with the file and is only rebuilt when the runs
+        were replaced or added without addRuns, the lumis of the runs are
+        sorted when it is.
+        """
+        runs = self['runs']
+        cached = self.__dict__.get("_runIndex", None)
+        if cached != None and cached[0] is runs and cached[1] == len(runs):
+            return cached[2]
+
+        runIndex = {}
+        for runMember in runs:
+            runMember.lumis.sort()
+            runIndex.setdefault(runMember.run, runMember)
+
+        self._runIndex = [runs, len(runs), runIndex]
+        return runIndex
+
+    def getSortedRuns(self):
+        """
+        _getSortedRuns_
+
+        Return the runs of this file as a list sorted by run number, the
+        lumis of each run are in order.
+        """
+        self.getRunIndex()
+        return sorted(self['runs'], key = operator.attrgetter("run"))
+
+    def __getstate__(self):
+        """
+        _getstate_
+
+        The run index can be rebuilt, don't pickle it.
+        """
+        state = self.__dict__.copy()
+        state.pop("_runIndex", None)
+        return state
+
     def load(self):
         """
         A DataStructs file has nothing to load from, other implementations will
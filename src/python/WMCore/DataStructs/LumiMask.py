@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+_LumiMask_
+
+Compiled run/lumi whitelist shared by the lumi based splitters, the ACDC
+service and the job Mask.
+
+A LumiMask is a dictionary with the same format used everywhere in WMCore
+for lumi masks:
+
+  {run1: [[firstLumi, lastLumi], [firstLumi, lastLumi]], run2: ...}
+
+but the ranges are kept sorted and merged, and a per-run index of range
+boundaries keyed by integer run number is maintained so that lookups are
+a bisect instead of a walk over the whole range list.
+
+An empty LumiMask accepts everything.
+"""
+
+import bisect
+import logging
+
+from WMCore.DataStructs.Run import Run
+
+
+def mergeLumiRanges(ranges):
+    """
+    _mergeLumiRanges_
+
+    Sort a list of [first, last] lumi pairs and merge the overlapping
+    and adjacent ones.  Invalid pairs are dropped.
+    """
+    pairs = []
+    for lumiRange in ranges:
+        if len(lumiRange) != 2:
+            logging.error("Invalid lumi range %s, ignoring it" % lumiRange)
+            continue
+        pairs.append((int(lumiRange[0]), int(lumiRange[1])))
+    pairs.sort()
+
+    merged = []
+    for first, last in pairs:
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1][1] = last
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def compressLumis(lumis):
+    """
+    _compressLumis_
+
+    Convert an iterable of lumi numbers into a sorted list of
+    [first, last] ranges.
+    """
+    ranges = []
+    for lumi in sorted(set(lumis)):
+        if ranges and lumi == ranges[-1][1] + 1:
+            ranges[-1][1] = lumi
+        else:
+            ranges.append([lumi, lumi])
+    return ranges
+
+
+class LumiMask(dict):
+    """
+    _LumiMask_
+
+    Run/lumi range dictionary with bisect backed lookups.  Modify it only
+    through item assignment/deletion or update(), the index is not kept in
+    sync with the lists returned by the dictionary.
+    """
+    def __init__(self, runLumis = None):
+        dict.__init__(self)
+        self._firstLumis = {}
+        self._lastLumis = {}
+        if runLumis:
+            self.update(runLumis)
+
+    @classmethod
+    def fromLumis(cls, runLumis):
+        """
+        _fromLumis_
+
+        Build a mask from a {run: [lumi1, lumi2, ...]} dictionary of
+        individual lumi sections.
+        """
+        mask = cls()
+        for run, lumis in runLumis.items():
+            mask[run] = compressLumis(lumis)
+        return mask
+
+    def __reduce__(self):
+        """
+        __reduce__
+
+        Pickle as the plain dictionary, the index is rebuilt on load.
+        """
+        return (self.__class__, (dict(self),))
+
+    def __setitem__(self, run, ranges):
+        merged = mergeLumiRanges(ranges)
+        dict.__setitem__(self, run, merged)
+        self._firstLumis[int(run)] = [x[0] for x in merged]
+        self._lastLumis[int(run)] = [x[1] for x in merged]
+        return
+
+    def __delitem__(self, run):
+        dict.__delitem__(self, run)
+        del self._firstLumis[int(run)]
+        del self._lastLumis[int(run)]
+        return
+
+    def update(self, runLumis):
+        """
+        _update_
+
+        Add or replace the ranges of several runs.
+        """
+        for run, ranges in runLumis.items():
+            self[run] = ranges
+        return
+
+    def hasRun(self, run):
+        """
+        _hasRun_
+
+        Check if any lumi of the given run passes the mask.
+        """
+        if not self:
+            return True
+        return int(run) in self._firstLumis
+
+    def hasLumi(self, run, lumi):
+        """
+        _hasLumi_
+
+        Check if a single run/lumi passes the mask.
+        """
+        if not self:
+            return True
+        firstLumis = self._firstLumis.get(int(run))
+        if not firstLumis:
+            return False
+        index = bisect.bisect_right(firstLumis, lumi) - 1
+        return index >= 0 and lumi <= self._lastLumis[int(run)][index]
+
+    def filterLumis(self, run, lumis):
+        """
+        _filterLumis_
+
+        Return the lumis of the given run that pass the mask, keeping the
+        order in which they were passed in.
+        """
+        if not self:
+            return list(lumis)
+        firstLumis = self._firstLumis.get(int(run))
+        if not firstLumis:
+            return []
+        lastLumis = self._lastLumis[int(run)]
+
+        goodLumis = []
+        for lumi in lumis:
+            index = bisect.bisect_right(firstLumis, lumi) - 1
+            if index >= 0 and lumi <= lastLumis[index]:
+                goodLumis.append(lumi)
+        return goodLumis
+
+    def filterRuns(self, runs):
+        """
+        _filterRuns_
+
+        Pass a list of Run objects, get back a list of new Run objects with
+        only the lumis that pass the mask.  Runs with the same number are
+        combined and runs without any good lumi are dropped.
+        """
+        runLumis = {}
+        for run in runs:
+            runLumis.setdefault(run.run, set()).update(run.lumis)
+
+        newRuns = []
+        for runNumber in sorted(runLumis.keys()):
+            goodLumis = self.filterLumis(runNumber, sorted(runLumis[runNumber]))
+            if goodLumis:
+                newRuns.append(Run(runNumber, *goodLumis))
+        return newRuns
+
+    def getRanges(self, run):
+        """
+        _getRanges_
+
+        Return the sorted, merged list of lumi ranges for a run.
+        """
+        return [[first, last] for first, last in zip(self._firstLumis.get(int(run), []),
+                                                     self._lastLumis.get(int(run), []))]
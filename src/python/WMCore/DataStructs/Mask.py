@@ -12,7 +12,7 @@ job in two ways:
 
 import logging
 
-from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.LumiMask import LumiMask
 
 class Mask(dict):
     """
@@ -159,6 +159,15 @@ class Mask(dict):
 
         return self['runAndLumis']
 
+    def getLumiMask(self):
+        """
+        _getLumiMask_
+
+        Return the runAndLumis compiled into a LumiMask, use it when
+        checking many lumis against the same mask.
+        """
+        return LumiMask(self['runAndLumis'])
+
     def runLumiInMask(self, run, lumi):
         """
         _runLumiInMask_
@@ -171,7 +180,7 @@ class Mask(dict):
             # ALWAYS TRUE
             return True
 
-        if not run in self['runAndLumis'].keys():
+        if not run in self['runAndLumis']:
             return False
 
         for pair in self['runAndLumis'][run]:
@@ -195,31 +204,7 @@ class Mask(dict):
             # ALWAYS TRUE
             return runs
 
-        runDict = {}
-        for r in runs:
-            if runDict.has_key(r.run):
-                runDict[r.run].lumis.extend(r.lumis)
-            else:
-                runDict[r.run] = r
-
-        maskRuns = set(self["runAndLumis"].keys())
-        passedRuns = set([r.run for r in runs])
-        filteredRuns = maskRuns.intersection(passedRuns)
-
-        newRuns = set()
-        for runNumber in filteredRuns:
-            maskLumis = set()
-            for pair in self["runAndLumis"][runNumber]:
-                if pair[0] == pair[1]:
-                    maskLumis.add(pair[0])
-                else:
-                    maskLumis = maskLumis.union(range(pair[0], pair[1] + 1, 1))
-
-            filteredLumis = set(runDict[runNumber].lumis).intersection(maskLumis)
-            if len(filteredLumis) > 0:
-                newRuns.add(Run(runNumber, *list(filteredLumis)))
-
-        return newRuns
+        return set(self.getLumiMask().filterRuns(runs))
 
 
 class InclusiveMask(Mask):
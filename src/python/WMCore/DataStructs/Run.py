@@ -63,9 +63,18 @@ class Run(WMObject):
             msg += "Run %s does not equal Run %s" % (self.run, rhs.run)
             raise RuntimeError, msg
 
-        #newRun = Run(self.run, *self)
-        #[ newRun.append(x) for x in rhs if x not in newRun ]
-        [ self.lumis.append(x) for x in rhs.lumis if x not in self.lumis ]
+        # Keep a set of the known lumis so that merging is linear instead of
+        # a list scan per added lumi, the merged lumis are sorted.
+        knownLumis = set(self.lumis)
+        newLumis = []
+        for lumi in rhs.lumis:
+            if lumi not in knownLumis:
+                newLumis.append(lumi)
+                knownLumis.add(lumi)
+
+        if newLumis:
+            self.lumis.extend(newLumis)
+            self.lumis.sort()
 
         return self
     def __iter__(self):
@@ -6,7 +6,9 @@ A simple API to CouchDB that sends HTTP requests to the REST interface.
 
 http://wiki.apache.org/couchdb/API_Cheatsheet
 
-NOT A THREAD SAFE CLASS.
+NOT A THREAD SAFE CLASS.  A Database created with asyncCommit = True hands
+its commits over to a background AsyncCommitter, which talks to couch over
+its own connections.
 """
 
 
@@ -16,6 +18,10 @@ import urllib
 import re
 import hashlib
 import base64
+import atexit
+import logging
+import threading
+import Queue
 from httplib import HTTPException
 from datetime import timedelta, datetime
 
@@ -141,6 +147,166 @@ class CouchDBRequests(JSONRequests):
 
         return
 
+class AsyncCommitter(object):
+    """
+    _AsyncCommitter_
+
+    Post the bulk commits of a Database from a small pool of background
+    threads, each one with its own connection to couch.  At most maxPending
+    batches wait to be written, submit() blocks when there are more so fast
+    producers are slowed down to the speed of couch.  Pending batches are
+    written when the process exits.
+    """
+    def __init__(self, database, threads = 1, maxPending = 10):
+        self.database = database
+        self.batches = Queue.Queue(maxPending)
+        self.lock = threading.Lock()
+        self.metrics = {"batches": 0, "docs": 0, "conflicts": 0, "errors": 0,
+                        "maxQueueDepth": 0, "commitTime": 0.0,
+                        "lastCommitTime": 0.0, "maxCommitTime": 0.0}
+
+        self.threads = []
+        for i in range(threads):
+            thread = threading.Thread(target = self.run,
+                                      name = "AsyncCommitter-%s-%s" % (database.name, i))
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+        _asyncCommitters.add(self)
+        return
+
+    def submit(self, data, viewlist = [], callback = None):
+        """
+        _submit_
+
+        Queue the data of a _bulk_docs post, wait if there are already
+        maxPending batches waiting.
+        """
+        if not self.threads:
+            raise CouchError("AsyncCommitter for %s is closed" % self.database.name,
+                             None, None)
+        self.batches.put((data, viewlist, callback))
+        depth = self.batches.qsize()
+        self.lock.acquire()
+        self.metrics["maxQueueDepth"] = max(self.metrics["maxQueueDepth"], depth)
+        self.lock.release()
+        return
+
+    def run(self):
+        """
+        _run_
+
+        Worker loop, commit the batches with a private Database instance.
+        """
+        database = Database(urllib.unquote_plus(self.database.name),
+                            self.database.url, self.database._queue_size)
+        while True:
+            batch = self.batches.get()
+            try:
+                if batch == None:
+                    return
+                self.commitBatch(database, *batch)
+            finally:
+                self.batches.task_done()
+
+    def commitBatch(self, database, data, viewlist, callback):
+        """
+        _commitBatch_
+
+        Post one batch and run the conflict callback for it, errors can't be
+        raised to the caller so they are logged and counted.
+        """
+        conflicts = 0
+        startTime = time.time()
+        try:
+            retval = database.post('/%s/_bulk_docs/' % database.name, data)
+            for v in viewlist:
+                design, view = v.split('/')
+                database.loadView(design, view, {'limit': 0})
+            for idx, result in enumerate(retval):
+                if result.get('error', None) == 'conflict':
+                    conflicts += 1
+                    if callback:
+                        retval[idx] = callback(database, data, result)
+        except Exception, ex:
+            logging.error("Error committing %s documents to %s: %s" % (len(data['docs']),
+                                                                       database.name,
+                                                                       str(ex)))
+            self.lock.acquire()
+            self.metrics["errors"] += 1
+            self.lock.release()
+            return
+
+        commitTime = time.time() - startTime
+        self.lock.acquire()
+        self.metrics["batches"] += 1
+        self.metrics["docs"] += len(data['docs'])
+        self.metrics["conflicts"] += conflicts
+        self.metrics["commitTime"] += commitTime
+        self.metrics["lastCommitTime"] = commitTime
+        self.metrics["maxCommitTime"] = max(self.metrics["maxCommitTime"], commitTime)
+        self.lock.release()
+        return
+
+    def flush(self):
+        """
+        _flush_
+
+        Wait until all the submitted batches are written.
+        """
+        self.batches.join()
+        return
+
+    def close(self):
+        """
+        _close_
+
+        Write the pending batches and stop the threads.
+        """
+        if not self.threads:
+            return
+        threads = self.threads
+        self.threads = []
+        for thread in threads:
+            self.batches.put(None)
+        for thread in threads:
+            thread.join()
+        _asyncCommitters.discard(self)
+        return
+
+    def getMetrics(self):
+        """
+        _getMetrics_
+
+        Return the commit counters, the current queue depth and the mean
+        commit latency in seconds.
+        """
+        self.lock.acquire()
+        metrics = dict(self.metrics)
+        self.lock.release()
+        metrics["queueDepth"] = self.batches.qsize()
+        if metrics["batches"]:
+            metrics["meanCommitTime"] = metrics["commitTime"] / metrics["batches"]
+        else:
+            metrics["meanCommitTime"] = 0.0
+        return metrics
+
+_asyncCommitters = set()
+
+def _closeAsyncCommitters():
+    """
+    _closeAsyncCommitters_
+
+    Commit the queues of the asynchronous databases and write what is left
+    in their background committers at exit.
+    """
+    for committer in list(_asyncCommitters):
+        committer.database.close()
+    return
+
+atexit.register(_closeAsyncCommitters)
+
 class Database(CouchDBRequests):
     """
     Object representing a connection to a CouchDB Database instance.
@@ -148,13 +314,18 @@ class Database(CouchDBRequests):
     TODO: remove leading whitespace when committing a view
     """
     def __init__(self, dbname = 'database',
-                  url = 'http://localhost:5984', size = 1000):
+                  url = 'http://localhost:5984', size = 1000,
+                  asyncCommit = False, commitThreads = 1, maxPendingCommits = 10):
         """
         A set of queries against a CouchDB database
+
+        With asyncCommit the bulk commits are posted by commitThreads
+        background threads, with at most maxPendingCommits batches waiting.
         """
         check_name(dbname)
 
         self.name = urllib.quote_plus(dbname)
+        self.url = url
 
         CouchDBRequests.__init__(self, url)
         self._reset_queue()
@@ -163,6 +334,10 @@ class Database(CouchDBRequests):
         self.threads = []
         self.last_seq = 0
 
+        self.committer = None
+        if asyncCommit:
+            self.committer = AsyncCommitter(self, commitThreads, maxPendingCommits)
+
     def _reset_queue(self):
         """
         Set the queue to an empty list, e.g. after a commit
@@ -195,7 +370,6 @@ class Database(CouchDBRequests):
         """
         if timestamp:
             self.timestamp(doc, timestamp)
-        #TODO: Thread this off so that it's non blocking...
         if len(self._queue) >= self._queue_size:
             print 'queue larger than %s records, committing' % self._queue_size
             self.commit(viewlist=viewlist, callback = callback)
@@ -249,6 +423,10 @@ class Database(CouchDBRequests):
 
         Returns a list of good documents
             throws an exception otherwise
+
+        With asyncCommit the documents are handed over to the background
+        committer and None is returned, the callback is then run from the
+        committer thread once the batch is written.
         """
         if (doc):
             self.queue(doc, timestamp, viewlist)
@@ -258,7 +436,13 @@ class Database(CouchDBRequests):
 
         if timestamp:
             self.timestamp(self._queue, timestamp)
-        # TODO: commit in thread to avoid blocking others
+
+        if self.committer:
+            data['docs'] = self._queue
+            self._reset_queue()
+            self.committer.submit(data, viewlist, callback)
+            return
+
         uri  = '/%s/_bulk_docs/' % self.name
 
         data['docs'] = list(self._queue)
@@ -274,6 +458,40 @@ class Database(CouchDBRequests):
 
         return retval
 
+    def flush(self):
+        """
+        _flush_
+
+        Commit the queue and wait until the background committer has written
+        everything.
+        """
+        self.commit()
+        if self.committer:
+            self.committer.flush()
+        return
+
+    def close(self):
+        """
+        _close_
+
+        Commit the queue and stop the background committer.
+        """
+        self.commit()
+        if self.committer:
+            self.committer.close()
+        return
+
+    def commitMetrics(self):
+        """
+        _commitMetrics_
+
+        Queue depth and commit latency of the background committer, None
+        when commits are synchronous.
+        """
+        if self.committer:
+            return self.committer.getMetrics()
+        return None
+
     def document(self, id, rev = None):
         """
         Load a document identified by id. You can specify a rev to see an older revision
@@ -798,15 +1016,16 @@ class CouchServer(CouchDBRequests):
         dbname = urllib.quote_plus(dbname)
         return self.delete("/%s" % dbname)
 
-    def connectDatabase(self, dbname = 'database', create = True, size = 1000):
+    def connectDatabase(self, dbname = 'database', create = True, size = 1000,
+                        asyncCommit = False):
         """
         Return a Database instance, pointing to a database in the server. If the
         database doesn't exist create it if create is True.
         """
         check_name(dbname)
         if create and dbname not in self.listDatabases():
-            return self.createDatabase(dbname)
-        return Database(dbname, self.url, size)
+            self.createDatabase(dbname)
+        return Database(dbname, self.url, size, asyncCommit)
 
     def replicate(self, source, destination, continuous = False,
                   create_target = False, cancel = False, doc_ids=False,
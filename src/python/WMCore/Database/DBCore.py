@@ -12,6 +12,7 @@ Core Database APIs
 from WMCore.DataStructs.WMObject import WMObject
 from WMCore.Database.ResultSet import ResultSet
 from copy import copy
+import re
 import WMCore.WMLogging
 
 class DBInterface(WMObject):
@@ -114,6 +115,126 @@ class DBInterface(WMObject):
         result = connection.execute(s, b)
         return self.makelist(result)
 
+    def buildbulkselect(self, s, b):
+        """
+        _buildbulkselect_
+
+        Rewrite a SELECT that compares its only bind variable with "=" and
+        is run for a list of binds into SELECTs with an IN clause, e.g.:
+
+        SELECT ... WHERE fileid = :id  with  [{'id': 1}, {'id': 2}]
+
+        becomes
+
+        SELECT ... WHERE fileid IN (:id_0, :id_1)  with  {'id_0': 1, 'id_1': 2}
+
+        The values are deduplicated and split in chunks of maxBindsPerQuery.
+        Returns a list of (sql, binds) tuples or None if the statement can't
+        be rewritten.
+        """
+        if len(b) == 0 or len(b[0]) != 1:
+            return None
+        name = b[0].keys()[0]
+        if len(re.findall(r":%s\b" % re.escape(name), s, re.IGNORECASE)) != 1:
+            return None
+        equalBind = re.compile(r"(?<![<>!])=\s*:%s\b" % re.escape(name),
+                               re.IGNORECASE)
+        if not equalBind.search(s):
+            return None
+
+        values = []
+        knownValues = set()
+        for bind in b:
+            if len(bind) != 1 or not name in bind:
+                return None
+            if not bind[name] in knownValues:
+                knownValues.add(bind[name])
+                values.append(bind[name])
+
+        statements = []
+        for start in range(0, len(values), self.maxBindsPerQuery):
+            chunk = values[start:start + self.maxBindsPerQuery]
+            bindNames = ["%s_%i" % (name, x) for x in range(len(chunk))]
+            inClause = "IN (%s)" % ", ".join([":%s" % x for x in bindNames])
+            statements.append((equalBind.sub(inClause, s),
+                               dict(zip(bindNames, chunk))))
+        return statements
+
+    def executebulkselect(self, s=None, b=None, connection=None,
+                          returnCursor=False):
+        """
+        _executebulkselect_
+
+        Run a SELECT for a list of binds with one query per chunk of binds
+        instead of one per bind, see buildbulkselect().  The rows of all the
+        queries are merged into a single ResultSet.  Returns None if the
+        statement can't be rewritten.
+        """
+        statements = self.buildbulkselect(s, b)
+        if statements == None:
+            return None
+
+        if returnCursor:
+            result = []
+            for sql, bind in statements:
+                result.append(self.executebinds(sql, bind, connection=connection,
+                                                returnCursor=True))
+            return result
+
+        result = ResultSet()
+        for sql, bind in statements:
+            resultproxy = self.executebinds(sql, bind, connection=connection,
+                                            returnCursor=True)
+            result.add(resultproxy)
+            resultproxy.close()
+        return [result]
+
+    def streamData(self, sqlstmt, binds=None, conn=None, fetchSize=1000):
+        """
+        _streamData_
+
+        Run a single SELECT and return a generator of ResultSets holding up
+        to fetchSize rows each, so that the full result is never held in
+        memory.  Where the engine supports it the rows are read from a server
+        side cursor.  If conn is not set a connection is taken from the pool
+        and given back once the generator is exhausted or closed.
+        """
+        connection = None
+        try:
+            if not conn:
+                connection = self.connection()
+            else:
+                connection = conn
+
+            streamConnection = connection
+            if hasattr(connection, "execution_options"):
+                streamConnection = connection.execution_options(stream_results=True)
+
+            resultproxy = self.executebinds(sqlstmt, binds or None,
+                                            connection=streamConnection,
+                                            returnCursor=True)
+            try:
+                cursor = getattr(resultproxy, "cursor", None)
+                if hasattr(cursor, "arraysize"):
+                    cursor.arraysize = fetchSize
+
+                keys = resultproxy.keys
+                if callable(keys):
+                    keys = keys()
+
+                while not resultproxy.closed:
+                    rows = resultproxy.fetchmany(fetchSize)
+                    if not rows:
+                        break
+                    result = ResultSet()
+                    result.addRows(keys, rows)
+                    yield result
+            finally:
+                resultproxy.close()
+        finally:
+            if not conn and connection != None:
+                connection.close() # Return connection to the pool
+
     def connection(self):
         """
         Return a connection to the engine (from the connection pool)
@@ -122,10 +243,13 @@ class DBInterface(WMObject):
 
 
     def processData(self, sqlstmt, binds={}, conn=None,
-                    transaction=False, returnCursor=False):
+                    transaction=False, returnCursor=False, bulkSelect=False):
         """
         set conn if you already have an active connection to reuse
         set transaction = True if you already have an active transaction
+        set bulkSelect = True to run a SELECT with a single "= :bind" for a
+        list of binds as IN queries, see buildbulkselect().  Duplicate binds
+        only return their rows once.
 
         """
         connection = None
@@ -156,15 +280,23 @@ class DBInterface(WMObject):
                 #Run single SQL statement for a list of binds - use execute_many()
                 if not transaction:
                     trans = connection.begin()
-                while(len(binds) > self.maxBindsPerQuery):
-                    result.extend(self.processData(sqlstmt, binds[:self.maxBindsPerQuery],
-                                                   conn=connection, transaction=True,
-                                                   returnCursor=returnCursor))
-                    binds = binds[self.maxBindsPerQuery:]
-
-                for i in sqlstmt:
-                    result.extend(self.executemanybinds(i, binds, connection=connection,
-                                                        returnCursor=returnCursor))
+                bulkResult = None
+                if bulkSelect:
+                    bulkResult = self.executebulkselect(sqlstmt[0], binds,
+                                                        connection=connection,
+                                                        returnCursor=returnCursor)
+                if bulkResult != None:
+                    result.extend(bulkResult)
+                else:
+                    while(len(binds) > self.maxBindsPerQuery):
+                        result.extend(self.processData(sqlstmt, binds[:self.maxBindsPerQuery],
+                                                       conn=connection, transaction=True,
+                                                       returnCursor=returnCursor))
+                        binds = binds[self.maxBindsPerQuery:]
+
+                    for i in sqlstmt:
+                        result.extend(self.executemanybinds(i, binds, connection=connection,
+                                                            returnCursor=returnCursor))
                 if not transaction:
                     trans.commit()
             elif len(binds) == len(sqlstmt):
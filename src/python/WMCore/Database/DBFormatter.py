@@ -12,8 +12,12 @@ import datetime
 import time
 
 from WMCore.DataStructs.WMObject import WMObject
+from WMCore.Database.ResultSet import ResultSet
 
 class DBFormatter(WMObject):
+    # Number of rows fetched at a time when streaming results
+    fetchSize = 1000
+
     def __init__(self, logger, dbinterface):
         """
         The class holds a connection to the database in self.dbi. This is a
@@ -37,21 +41,40 @@ class DBFormatter(WMObject):
         t = datetime.datetime.now()
         return self.convertdatetime(t)
 
-    def format(self, result):
+    def fetchRows(self, r):
         """
-        Some standard formatting, put all records into a list
+        Iterate over the rows of a ResultSet or of a cursor, cursors are read
+        fetchSize rows at a time
         """
-        out = []
-        for r in result:
+        if isinstance(r, ResultSet):
             for i in r.fetchall():
-                row = []
-                for j in i:
-                    row.append(j)
-                out.append(row)
+                yield i
+            return
+
+        while not r.closed:
+            rows = r.fetchmany(self.fetchSize)
+            if not rows:
+                break
+            for i in rows:
+                yield i
+        return
+
+    def formatIter(self, result):
+        """
+        Generator version of format(), result can also be the generator
+        returned by DBInterface.streamData()
+        """
+        for r in result:
+            for i in self.fetchRows(r):
+                yield list(i)
 
             r.close()
 
-        return out
+    def format(self, result):
+        """
+        Some standard formatting, put all records into a list
+        """
+        return list(self.formatIter(result))
 
     def formatOne(self, result):
         """
@@ -65,14 +88,14 @@ class DBFormatter(WMObject):
                 out.append(i)
         return out
 
-    def formatDict(self, result):
+    def formatDictIter(self, result):
         """
-        Returns an array of dictionaries representing the results
+        Generator version of formatDict(), result can also be the generator
+        returned by DBInterface.streamData()
         """
-        dictOut = []
         for r in result:
             descriptions = r.keys
-            for i in r.fetchall():
+            for i in self.fetchRows(r):
                 #WARNING: this can generate errors for some stupid reason
                 # in both oracle and mysql.
                 entry = {}
@@ -83,11 +106,15 @@ class DBFormatter(WMObject):
                     else:
                         entry[str(descriptions[index].lower())] = i[index]
 
-                dictOut.append(entry)
+                yield entry
 
             r.close()
 
-        return dictOut
+    def formatDict(self, result):
+        """
+        Returns an array of dictionaries representing the results
+        """
+        return list(self.formatDictIter(result))
 
     def formatOneDict(self, result):
         """
@@ -135,6 +162,14 @@ class DBFormatter(WMObject):
             binds = self.dbi.buildbinds(self.dbi.makelist(kwargs[i]), i, binds)
         return binds
 
+    def stream(self, binds = None, conn = None):
+        """
+        Run self.sql and return a generator of ResultSets of fetchSize rows,
+        to be passed to formatIter() or formatDictIter()
+        """
+        return self.dbi.streamData(self.sql, binds, conn = conn,
+                                   fetchSize = self.fetchSize)
+
     def execute(self, conn = None, transaction = False, returnCursor = False):
         """
         A simple select with no binds/arguments is the default
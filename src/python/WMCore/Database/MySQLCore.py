@@ -10,6 +10,12 @@ import copy
 from WMCore.Database.DBCore import DBInterface
 from WMCore.Database.ResultSet import ResultSet
 
+# The rewritten SQL and the order of the bind variables only depend on the
+# SQL and the bind variable names, so they're cached for the whole process.
+substituteCache = {}
+maxSubstituteCacheSize = 10000
+substituteCacheStats = {"hits": 0, "misses": 0}
+
 def bindVarCompare(a, b):
     """
     _bindVarCompare_
@@ -65,6 +71,37 @@ class MySQLInterface(DBInterface):
         origBindsList = self.makelist(origBindsList)
         origBind = origBindsList[0]
 
+        cacheKey = (origSQL, tuple(sorted(origBind.keys())))
+        cached = substituteCache.get(cacheKey, None)
+        if cached != None:
+            substituteCacheStats["hits"] += 1
+        else:
+            substituteCacheStats["misses"] += 1
+            cached = self.parseBinds(origSQL, origBind.keys())
+            if len(substituteCache) >= maxSubstituteCacheSize:
+                # Some DAOs build their SQL on the fly, don't grow forever
+                substituteCache.clear()
+            substituteCache[cacheKey] = cached
+
+        updatedSQL, bindVarNameList = cached
+        mySQLBindVarsList = []
+        for origBind in origBindsList:
+            mySQLBindVars = []
+            for bindVarName in bindVarNameList:
+                mySQLBindVars.append(origBind[bindVarName])
+
+            mySQLBindVarsList.append(tuple(mySQLBindVars))
+
+        return (updatedSQL, mySQLBindVarsList)
+
+    def parseBinds(self, origSQL, bindVarNames):
+        """
+        _parseBinds_
+
+        Replace the bind variables in the SQL with %s and return the new SQL
+        together with the list of bind variable names in the order in which
+        they appear in the query.
+        """
         bindVarPositionList = []
         updatedSQL = copy.copy(origSQL)
 
@@ -73,7 +110,7 @@ class MySQLInterface(DBInterface):
         # variables: RELEASE_VERSION and RELEASE_VERSION_ID the former will
         # match against the latter, causing problems.  We'll sort the variable
         # names by length to guard against this.
-        bindVarNames = origBind.keys()
+        bindVarNames = list(bindVarNames)
         bindVarNames.sort(stringLengthCompare)
 
         bindPositions = {}
@@ -105,15 +142,7 @@ class MySQLInterface(DBInterface):
 
         bindVarPositionList.sort(bindVarCompare)
 
-        mySQLBindVarsList = []
-        for origBind in origBindsList:
-            mySQLBindVars = []
-            for bindVarPosition in bindVarPositionList:
-                mySQLBindVars.append(origBind[bindVarPosition[0]])
-
-            mySQLBindVarsList.append(tuple(mySQLBindVars))
-
-        return (updatedSQL, mySQLBindVarsList)
+        return (updatedSQL, [x[0] for x in bindVarPositionList])
 
     def executebinds(self, s = None, b = None, connection = None,
                      returnCursor = False):
@@ -28,6 +28,18 @@ class ResultSet:
     def fetchall(self):
         return self.data
 
+    def addRows(self, keys, rows):
+        """
+        _addRows_
+
+        Add rows that were already fetched from a cursor.
+        """
+        if len(self.keys) == 0:
+            self.keys.extend(keys)
+        self.data.extend(rows)
+        self.rowcount += len(rows)
+        return
+
     def add(self, resultproxy):
         myThread = threading.currentThread()
 
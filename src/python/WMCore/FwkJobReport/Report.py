@@ -5,6 +5,14 @@
 _Report_
 
 Framework job report object.
+
+Reports are saved in a compact, versioned format: a header line with the
+format version followed by a pickle of plain python containers instead of
+the ConfigSection tree.  The input section of each step, which holds the
+input file lists, is kept encoded until it is used, the couch JSON document
+can be made from it without decoding it.  Reports pickled by older versions
+can still be loaded and can be rewritten in the new format with
+convertReport().
 """
 
 import re
@@ -33,6 +41,121 @@ class FwkJobReportException(WMException):
     """
     pass
 
+REPORT_MAGIC   = "WMFWJR"
+REPORT_VERSION = 1
+
+class LazyConfigSection(ConfigSection):
+    """
+    _LazyConfigSection_
+
+    ConfigSection loaded from a compact report that is only decoded the first
+    time it is used, it then turns into a plain ConfigSection.
+    """
+    def __init__(self, name, encoded):
+        ConfigSection.__init__(self, name)
+        object.__setattr__(self, "_internal_encoded", encoded)
+
+    def __getattribute__(self, name):
+        if object.__getattribute__(self, "__class__") is LazyConfigSection:
+            encoded = object.__getattribute__(self, "_internal_encoded")
+            object.__delattr__(self, "_internal_encoded")
+            object.__setattr__(self, "__class__", ConfigSection)
+            decodeSection(cPickle.loads(encoded), self)
+        return object.__getattribute__(self, name)
+
+def encodeSection(section):
+    """
+    _encodeSection_
+
+    Turn a ConfigSection tree into nested tuples of its name, values,
+    children, documentation and docstrings.
+    """
+    values   = {}
+    children = {}
+    for attr in section._internal_settings:
+        value = getattr(section, attr)
+        if type(value) is LazyConfigSection:
+            # Still encoded, no need to decode it
+            children[attr] = object.__getattribute__(value, "_internal_encoded")
+        elif attr in section._internal_children:
+            children[attr] = encodeSection(value)
+        else:
+            values[attr] = value
+
+    return (section._internal_name, values, children,
+            section._internal_documentation, section._internal_docstrings)
+
+def decodeSection(encoded, section = None):
+    """
+    _decodeSection_
+
+    Build a ConfigSection tree out of encodeSection() output, filling
+    section if it is given.  Children encoded as strings are left encoded
+    in a LazyConfigSection.
+    """
+    (name, values, children, documentation, docstrings) = encoded
+    if section == None:
+        # Skip ConfigSection.__init__ and __setattr__, they are slow
+        section = ConfigSection.__new__(ConfigSection)
+
+    settings      = set(values)
+    childrenNames = set(children)
+    settings.update(childrenNames)
+
+    sectionDict = section.__dict__
+    sectionDict.update(values)
+    sectionDict.update({"_internal_name": name,
+                        "_internal_documentation": documentation,
+                        "_internal_docstrings": docstrings,
+                        "_internal_settings": settings,
+                        "_internal_children": childrenNames})
+    sectionDict.setdefault("_internal_parent_ref", None)
+
+    for attr, child in children.iteritems():
+        if type(child) == str:
+            child = LazyConfigSection(attr, child)
+        else:
+            child = decodeSection(child)
+        object.__setattr__(child, "_internal_parent_ref", section)
+        sectionDict[attr] = child
+
+    return section
+
+def jsonizeEncodedInput(encoded):
+    """
+    _jsonizeEncodedInput_
+
+    Build the JSON version of a step input section that is still encoded,
+    the same as Report.jsonizeFiles() gives for each input source but without
+    building the ConfigSection tree.
+    """
+    jsonInput = {}
+    (name, values, children, documentation, docstrings) = cPickle.loads(encoded)
+    for inputSource in values:
+        jsonInput[inputSource] = []
+
+    for inputSource, source in children.iteritems():
+        jsonFiles = []
+        jsonInput[inputSource] = jsonFiles
+        files = source[2].get("files", None)
+        if files == None:
+            continue
+
+        fileCount = files[1].get("fileCount", 0)
+        for i in range(fileCount):
+            (fileName, jsonFile, fileChildren, fileDoc, fileDocstrings) = \
+                       files[2]["file%s" % i]
+            for attr, child in fileChildren.iteritems():
+                if attr == "runs":
+                    jsonFile["runs"] = {}
+                    for runNumber, lumis in child[1].iteritems():
+                        jsonFile["runs"][str(runNumber)] = lumis
+                else:
+                    jsonFile[attr] = decodeSection(child)
+            jsonFiles.append(jsonFile)
+
+    return jsonInput
+
 def checkFileForCompletion(file):
     """
     _checkFileForCompletion_
@@ -244,10 +367,16 @@ class Report:
             if analysisSection:
                 jsonStep["output"]['analysis'] = self.jsonizeFiles(analysisSection)
 
-            jsonStep["input"] = {}
-            for inputSource in reportStep.input.listSections_():
-                reportInputSource = getattr(reportStep.input, inputSource)
-                jsonStep["input"][inputSource] = self.jsonizeFiles(reportInputSource)
+            inputSection = reportStep.input
+            if type(inputSection) is LazyConfigSection:
+                # Don't decode the input files just to convert them
+                encoded = object.__getattribute__(inputSection, "_internal_encoded")
+                jsonStep["input"] = jsonizeEncodedInput(encoded)
+            else:
+                jsonStep["input"] = {}
+                for inputSource in inputSection.listSections_():
+                    reportInputSource = getattr(inputSection, inputSource)
+                    jsonStep["input"][inputSource] = self.jsonizeFiles(reportInputSource)
 
             jsonStep["errors"] = []
             errorCount = getattr(reportStep.errors, "errorCount", 0)
@@ -316,10 +445,20 @@ class Report:
         """
         _persist_
 
-        Pickle this object and save it to disk.
+        Save this report to disk in the compact format, with the input
+        sections of the steps encoded separately.  Input sections that were
+        never decoded are saved as they were loaded.
         """
-        handle = open(filename, 'w')
-        cPickle.dump(self.data, handle)
+        encoded = encodeSection(self.data)
+        for stepName in self.listSteps():
+            stepChildren = encoded[2].get(stepName, (None, {}, {}))[2]
+            if type(stepChildren.get("input", None)) == tuple:
+                stepChildren["input"] = cPickle.dumps(stepChildren["input"],
+                                                      cPickle.HIGHEST_PROTOCOL)
+
+        handle = open(filename, 'wb')
+        handle.write("%s %i\n" % (REPORT_MAGIC, REPORT_VERSION))
+        cPickle.dump({"data": encoded}, handle, cPickle.HIGHEST_PROTOCOL)
         handle.close()
         return
 
@@ -327,12 +466,19 @@ class Report:
         """
         _unpersist_
 
-        Load a pickled FWJR from disk.
+        Load a FWJR from disk, either in the compact format or pickled.
         """
-        handle = open(filename, 'r')
-        self.data = cPickle.load(handle)
+        handle = open(filename, 'rb')
+        content = loadReportContent(handle)
         handle.close()
 
+        if content == None:
+            handle = open(filename, 'rb')
+            self.data = cPickle.load(handle)
+            handle.close()
+        else:
+            self.data = decodeSection(content["data"])
+
         # old self.report (if it existed) became unattached
         if reportname:
             self.report = getattr(self.data, reportname)
@@ -1326,6 +1472,51 @@ class Report:
         return
 
 
+def loadReportContent(handle):
+    """
+    _loadReportContent_
+
+    Read a report in the compact format from an open file, return None if
+    the file isn't in that format.
+    """
+    header = handle.readline()
+    if not header.startswith(REPORT_MAGIC):
+        return None
+
+    try:
+        version = int(header[len(REPORT_MAGIC):])
+    except ValueError:
+        raise FwkJobReportException("Bad FWJR header: %s" % header.strip())
+    if version > REPORT_VERSION:
+        msg = "FWJR format version %i is newer than the supported %i" \
+              % (version, REPORT_VERSION)
+        raise FwkJobReportException(msg)
+
+    return cPickle.load(handle)
+
+def loadReportJSON(filename):
+    """
+    _loadReportJSON_
+
+    Return the couch JSON document of a report on disk.  The input sections
+    of compact reports are converted without being decoded.
+    """
+    report = Report()
+    report.unpersist(filename)
+    return report.__to_json__(None)
+
+def convertReport(filename, newFilename = None):
+    """
+    _convertReport_
+
+    Rewrite a pickled report in the compact format, in place unless a new
+    file name is given.
+    """
+    report = Report()
+    report.unpersist(filename)
+    report.persist(newFilename or filename)
+    return
+
 def addFiles(file1, file2):
     """
     _addFiles_
@@ -3,6 +3,11 @@
 _XMLParser_
 
 Read the raw XML output from the cmsRun executable.
+
+xmlToJobReport streams the XML through expat into the report.  The older
+parser that builds a Node tree first is kept as nodeXmlToJobReport.  If the
+XML is broken the streaming parser leaves the elements read before the error
+in the report.
 """
 
 
@@ -314,16 +319,26 @@ def perfSummaryHandler():
     """
     while True:
         report, node = (yield)
-        summary = node.attrs.get('Metric', None)
-        if summary == None: continue
-        # Add performance section if it doesn't exist
-        if not hasattr(report, summary):
-            report.section_(summary)
-        summRep = getattr(report, summary)
+        addPerfSummary(report, node.attrs.get('Metric', None),
+                       [x.attrs for x in node.children])
 
-        for subnode in node.children:
-            setattr(summRep, subnode.attrs['Name'],
-                    subnode.attrs['Value'])
+def addPerfSummary(report, summary, properties):
+    """
+    _addPerfSummary_
+
+    Add the Name/Value attributes of the properties of a performance
+    summary to its section
+    """
+    if summary == None:
+        return
+    # Add performance section if it doesn't exist
+    if not hasattr(report, summary):
+        report.section_(summary)
+    summRep = getattr(report, summary)
+
+    for prop in properties:
+        setattr(summRep, prop['Name'], prop['Value'])
+    return
 
 
 @coroutine
@@ -336,8 +351,18 @@ def perfCPUHandler():
     """
     while True:
         report, node = (yield)
-        for subnode in node.children:
-            setattr(report, subnode.attrs['Name'], subnode.attrs['Value'])
+        addPerfCPU(report, [x.attrs for x in node.children])
+
+def addPerfCPU(report, properties):
+    """
+    _addPerfCPU_
+
+    Pack the Name/Value attributes of the CPU report properties into the
+    job report
+    """
+    for prop in properties:
+        setattr(report, prop['Name'], prop['Value'])
+    return
 
 @coroutine
 def perfMemHandler():
@@ -346,18 +371,27 @@ def perfMemHandler():
 
     Pack memory performance reports into the report
     """
+    while True:
+        report, node = (yield)
+        addPerfMem(report, [x.attrs for x in node.children])
+
+def addPerfMem(report, properties):
+    """
+    _addPerfMem_
+
+    Pack the memory statistics we want into the report
+    """
     # Make a list of performance info we actually want
     goodStatistics = ['PeakValueRss', 'PeakValueVsize', 'LargestRssEvent-h-PSS']
 
-    while True:
-        report, node = (yield)
-        for prop in node.children:
-            if prop.attrs['Name'] in goodStatistics:
-                if prop.attrs['Name'] == 'LargestRssEvent-h-PSS':
-                    # need to remove - chars from name as it buggers up downtstream code
-                    setattr(report, 'PeakValuePss', prop.attrs['Value'])
-                else:
-                    setattr(report, prop.attrs['Name'], prop.attrs['Value'])
+    for prop in properties:
+        if prop['Name'] in goodStatistics:
+            if prop['Name'] == 'LargestRssEvent-h-PSS':
+                # need to remove - chars from name as it buggers up downtstream code
+                setattr(report, 'PeakValuePss', prop['Value'])
+            else:
+                setattr(report, prop['Name'], prop['Value'])
+    return
 
 def checkRegEx(regexp, candidate):
     if re.compile(regexp).match(candidate) == None:
@@ -372,7 +406,17 @@ def perfStoreHandler():
 
     Handle the information from the Storage report
     """
+    while True:
+        report, node = (yield)
+        addPerfStorage(report, [x.attrs for x in node.children])
+
+def addPerfStorage(report, properties):
+    """
+    _addPerfStorage_
 
+    Work out the read and write statistics out of the Storage report
+    properties and add them to the report
+    """
     # Make a list of performance info we actually want
     goodStatistics = ['Timing-([a-z]{4})-read(v?)-totalMegabytes',
                       'Timing-([a-z]{4})-write(v?)-totalMegabytes',
@@ -388,97 +432,306 @@ def perfStoreHandler():
                       'Timing-tstoragefile-write-totalMsecs',
                       ]
 
-    while True:
-        report, node = (yield)
-        logging.debug("Preparing to parse storage statistics")
-        storageValues = {}
-        for prop in node.children:
-            name = prop.attrs['Name']
-            for statName in goodStatistics:
-                if checkRegEx(statName, name):
-                    storageValues[name] = float(prop.attrs['Value'])
-                    #setattr(report, name, prop.attrs['Value'])
-
-        writeMethod = None
-        readMethod  = None
-        # Figure out read method
-        for key in storageValues.keys():
-            if checkRegEx('Timing-([a-z]{4})-read(v?)-numOperations', key):
-                if storageValues[key] != 0.0:
-                    # This is the reader
-                    readMethod = key.split('-')[1]
-                    break
-        # Figure out the write method
-        for key in storageValues.keys():
-            if checkRegEx('Timing-([a-z]{4})-write(v?)-numOperations', key):
-                if storageValues[key] != 0.0:
-                    # This is the reader
-                    writeMethod = key.split('-')[1]
-                    break
-
-        # Then assemble the information
-        # Calculate the values
-        logging.debug("ReadMethod: %s" % readMethod)
-        logging.debug("WriteMethod: %s" % writeMethod)
-        try:
-            readTotalMB = storageValues.get("Timing-%s-read-totalMegabytes" % readMethod, 0) \
-                          + storageValues.get("Timing-%s-readv-totalMegabytes" % readMethod, 0)
-            readMSecs   = (storageValues.get("Timing-%s-read-totalMsecs" % readMethod, 0)\
-                           + storageValues.get("Timing-%s-readv-totalMsecs" % readMethod, 0))
-            totalReads  = storageValues.get("Timing-%s-read-numOperations" % readMethod, 0) \
-                          + storageValues.get("Timing-%s-readv-numOperations" % readMethod, 0)
-            readMaxMSec = max(storageValues.get("Timing-%s-read-maxMsecs" % readMethod, 0),
-                              storageValues.get("Timing-%s-readv-maxMsecs" % readMethod, 0))
-            readPercOps = storageValues.get("Timing-tstoragefile-readActual-numOperations", 0)/\
-                          storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            readCachOps = storageValues.get("Timing-tstoragefile-readViaCache-numSuccessfulOperations", 0)/\
-                          storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            readTotalT  = 1000 * storageValues.get("Timing-tstoragefile-read-totalMSecs", 0)
-            readNOps    = storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            writeTime   = storageValues.get("Timing-tstoragefile-write-totalMsecs", 0) * 1000
-            writeTotMB  = storageValues.get("Timing-%s-write-totalMegabytes" % writeMethod, 0) \
-                          + storageValues.get("Timing-%s-writev-totalMegabytes" % writeMethod, 0)
-
-            if readMSecs > 0:
-                readMBSec = readTotalMB/readMSecs
-            else:
-                readMBSec = 0
-            if totalReads > 0:
-                readAveragekB = 1024* readTotalMB/totalReads
-            else:
-                readAveragekB = 0
-
-
-            # Attach them to the report
-            setattr(report, 'readTotalMB', readTotalMB)
-            setattr(report, 'readMBSec', readMBSec)
-            setattr(report, 'readAveragekB', readAveragekB)
-            setattr(report, 'readMaxMSec', readMaxMSec)
-            setattr(report, 'readPercentageOps', readPercOps)
-            setattr(report, 'readTotalSecs', readTotalT)
-            setattr(report, 'readNumOps', readNOps)
-            setattr(report, 'writeTotalSecs', writeTime)
-            setattr(report, 'writeTotalMB', writeTotMB)
-            setattr(report, 'readCachePercentageOps', readCachOps)
-        except ZeroDivisionError:
-            logging.error("Tried to divide by zero doing storage statistics report parsing.")
-            logging.error("Either you aren't reading and writing data, or you aren't reporting it.")
-            logging.error("Not adding any storage performance info to report.")
+    logging.debug("Preparing to parse storage statistics")
+    storageValues = {}
+    for prop in properties:
+        name = prop['Name']
+        for statName in goodStatistics:
+            if checkRegEx(statName, name):
+                storageValues[name] = float(prop['Value'])
+                #setattr(report, name, prop.attrs['Value'])
+
+    writeMethod = None
+    readMethod  = None
+    # Figure out read method
+    for key in storageValues.keys():
+        if checkRegEx('Timing-([a-z]{4})-read(v?)-numOperations', key):
+            if storageValues[key] != 0.0:
+                # This is the reader
+                readMethod = key.split('-')[1]
+                break
+    # Figure out the write method
+    for key in storageValues.keys():
+        if checkRegEx('Timing-([a-z]{4})-write(v?)-numOperations', key):
+            if storageValues[key] != 0.0:
+                # This is the reader
+                writeMethod = key.split('-')[1]
+                break
+
+    # Then assemble the information
+    # Calculate the values
+    logging.debug("ReadMethod: %s" % readMethod)
+    logging.debug("WriteMethod: %s" % writeMethod)
+    try:
+        readTotalMB = storageValues.get("Timing-%s-read-totalMegabytes" % readMethod, 0) \
+                      + storageValues.get("Timing-%s-readv-totalMegabytes" % readMethod, 0)
+        readMSecs   = (storageValues.get("Timing-%s-read-totalMsecs" % readMethod, 0)\
+                       + storageValues.get("Timing-%s-readv-totalMsecs" % readMethod, 0))
+        totalReads  = storageValues.get("Timing-%s-read-numOperations" % readMethod, 0) \
+                      + storageValues.get("Timing-%s-readv-numOperations" % readMethod, 0)
+        readMaxMSec = max(storageValues.get("Timing-%s-read-maxMsecs" % readMethod, 0),
+                          storageValues.get("Timing-%s-readv-maxMsecs" % readMethod, 0))
+        readPercOps = storageValues.get("Timing-tstoragefile-readActual-numOperations", 0)/\
+                      storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        readCachOps = storageValues.get("Timing-tstoragefile-readViaCache-numSuccessfulOperations", 0)/\
+                      storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        readTotalT  = 1000 * storageValues.get("Timing-tstoragefile-read-totalMSecs", 0)
+        readNOps    = storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        writeTime   = storageValues.get("Timing-tstoragefile-write-totalMsecs", 0) * 1000
+        writeTotMB  = storageValues.get("Timing-%s-write-totalMegabytes" % writeMethod, 0) \
+                      + storageValues.get("Timing-%s-writev-totalMegabytes" % writeMethod, 0)
+
+        if readMSecs > 0:
+            readMBSec = readTotalMB/readMSecs
+        else:
+            readMBSec = 0
+        if totalReads > 0:
+            readAveragekB = 1024* readTotalMB/totalReads
+        else:
+            readAveragekB = 0
+
+
+        # Attach them to the report
+        setattr(report, 'readTotalMB', readTotalMB)
+        setattr(report, 'readMBSec', readMBSec)
+        setattr(report, 'readAveragekB', readAveragekB)
+        setattr(report, 'readMaxMSec', readMaxMSec)
+        setattr(report, 'readPercentageOps', readPercOps)
+        setattr(report, 'readTotalSecs', readTotalT)
+        setattr(report, 'readNumOps', readNOps)
+        setattr(report, 'writeTotalSecs', writeTime)
+        setattr(report, 'writeTotalMB', writeTotMB)
+        setattr(report, 'readCachePercentageOps', readCachOps)
+    except ZeroDivisionError:
+        logging.error("Tried to divide by zero doing storage statistics report parsing.")
+        logging.error("Either you aren't reading and writing data, or you aren't reporting it.")
+        logging.error("Not adding any storage performance info to report.")
 
+    return
 
+class ReportBuilder(object):
+    """
+    _ReportBuilder_
+
+    expat handlers that fill a Report while the XML is parsed, without
+    building a Node tree.  Each element under FrameworkJobReport is added to
+    the report when it closes, only the data it needs is kept until then:
+    attributes and text of its children, runs and lumis and input
+    associations of files and the properties of performance summaries.
+    """
+    def __init__(self, report):
+        self.report   = report
+        self.stack    = []
+        self.chars    = []
+        self.handling = False
+        self.element  = None
+        self.child    = None
+        self.run      = None
+        self.input    = None
+        return
+
+    def startElement(self, name, attrs):
+        """
+        _startElement_
+
+        """
+        self.chars = []
+        self.stack.append(name)
+        depth = len(self.stack) - 1
+
+        if depth == 0:
+            self.handling = (name == "FrameworkJobReport")
+            if not self.handling:
+                logging.debug("Not Handling: %s" % name)
+        elif not self.handling:
+            pass
+        elif depth == 1:
+            self.element = {"name": name, "attrs": attrs, "children": [],
+                            "runs": [], "inputs": []}
+        elif depth == 2:
+            self.child = (name, attrs, [])
+        elif depth == 3:
+            parent = self.stack[2]
+            if parent == "Runs":
+                if name == "Run" and attrs.has_key("ID"):
+                    self.run = Run(runNumber = attrs["ID"])
+                else:
+                    self.run = None
+            elif parent == "Inputs":
+                self.input = {}
+            elif parent != "Branches":
+                self.child[2].append(attrs)
+        elif depth == 4:
+            if self.stack[2] == "Runs" and self.run != None \
+                   and attrs.has_key("ID"):
+                self.run.lumis.append(int(attrs["ID"]))
+        return
+
+    def characters(self, data):
+        """
+        _characters_
+
+        """
+        self.chars.append(data)
+        return
+
+    def endElement(self, name):
+        """
+        _endElement_
+
+        """
+        text = ''.join(self.chars).strip()
+        self.chars = []
+        depth = len(self.stack) - 1
+        self.stack.pop()
+
+        if not self.handling or depth == 0:
+            return
+        elif depth == 1:
+            self.addElement(self.element, text)
+            self.element = None
+        elif depth == 2:
+            self.element["children"].append((self.child[0], self.child[1],
+                                             text, self.child[2]))
+        elif depth == 3:
+            parent = self.stack[2]
+            if parent == "Runs" and self.run != None:
+                self.element["runs"].append(self.run)
+                self.run = None
+            elif parent == "Inputs":
+                self.element["inputs"].append(self.input)
+        elif depth == 4:
+            if self.stack[2] == "Inputs":
+                self.input[name] = text
+        return
+
+    def addElement(self, element, text):
+        """
+        _addElement_
+
+        Add an element under FrameworkJobReport to the report.
+        """
+        name   = element["name"]
+        attrs  = element["attrs"]
+        report = self.report
+
+        if name == "File":
+            fileAttrs = {}
+            for (childName, childAttrs, childText, properties) in element["children"]:
+                if childName not in ("Inputs", "Runs", "Branches"):
+                    fileAttrs[childName] = childText
+
+            moduleName = fileAttrs["ModuleLabel"]
+            report.addOutputModule(moduleName)
+            fileRef = report.addOutputFile(moduleName)
+            for runInfo in element["runs"]:
+                Report.addRunInfoToFile(fileRef, runInfo)
+            for data in element["inputs"]:
+                Report.addInputToFile(fileRef, data["LFN"], data['PFN'])
+
+            Report.addAttributesToFile(fileRef, lfn = fileAttrs["LFN"],
+                                       pfn = fileAttrs["PFN"], catalog = fileAttrs["Catalog"],
+                                       module_label = fileAttrs["ModuleLabel"],
+                                       guid = fileAttrs["GUID"],
+                                       ouput_module_class = fileAttrs["OutputModuleClass"],
+                                       events = int(fileAttrs["TotalEvents"]),
+                                       branch_hash = fileAttrs["BranchHash"])
+        elif name == "InputFile":
+            fileAttrs = {}
+            for (childName, childAttrs, childText, properties) in element["children"]:
+                if childName not in ("Runs", "Branches"):
+                    fileAttrs[childName] = childText
+
+            moduleName = fileAttrs["ModuleLabel"]
+            report.addInputSource(moduleName)
+            fileRef = report.addInputFile(moduleName)
+            for runInfo in element["runs"]:
+                Report.addRunInfoToFile(fileRef, runInfo)
+
+            Report.addAttributesToFile(fileRef, lfn = fileAttrs["LFN"],
+                                       pfn = fileAttrs["PFN"], catalog = fileAttrs["Catalog"],
+                                       module_label = fileAttrs["ModuleLabel"],
+                                       guid = fileAttrs["GUID"], input_type = fileAttrs["InputType"],
+                                       input_source_class = fileAttrs["InputSourceClass"],
+                                       events = int(fileAttrs["EventsRead"]))
+        elif name == "AnalysisFile":
+            filename = None
+            fileAttrs = {}
+            for (childName, childAttrs, childText, properties) in element["children"]:
+                if childName == "FileName":
+                    filename = childText
+                else:
+                    fileAttrs[childName] = childAttrs.get('Value', None)
+
+            report.addAnalysisFile(filename, **fileAttrs)
+        elif name == "PerformanceReport":
+            perfRep = report.report.performance
+            perfRep.section_("summaries")
+            perfRep.section_("cpu")
+            perfRep.section_("memory")
+            perfRep.section_("storage")
+            for (childName, childAttrs, childText, properties) in element["children"]:
+                metric = childAttrs.get('Metric', None)
+                if metric == "Timing":
+                    addPerfCPU(perfRep.cpu, properties)
+                elif metric == "SystemMemory" or metric == "ApplicationMemory":
+                    addPerfMem(perfRep.memory, properties)
+                elif metric == "StorageStatistics":
+                    addPerfStorage(perfRep.storage, properties)
+                else:
+                    addPerfSummary(perfRep.summaries, metric, properties)
+        elif name == "FrameworkError":
+            excepcode = attrs.get("ExitStatus", 8001)
+            exceptype = attrs.get("Type", "CMSException")
+
+            # There should be atmost one step in the report at this point in time.
+            if len(report.listSteps()) == 0:
+                report.addError("unknownStep", excepcode, exceptype, text)
+            else:
+                report.addError(report.listSteps()[0], excepcode, exceptype, text)
+        elif name == "SkippedFile":
+            report.addSkippedFile(attrs.get("Lfn", None), attrs.get("Pfn", None))
+        elif name == "SkippedEvent":
+            run = attrs.get("Run", None)
+            event = attrs.get("Event", None)
+            if run != None and event != None:
+                report.addSkippedEvent(run, event)
+        else:
+            setattr(report.report.parameters, name, text)
 
+        return
 
+def xmlToJobReport(reportInstance, xmlFile):
+    """
+    _xmlToJobReport_
 
+    parse the XML file and insert the information into the
+    Report instance provided, as the XML is read
 
+    """
+    builder = ReportBuilder(reportInstance)
 
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.returns_unicode = False
+    parser.StartElementHandler  = builder.startElement
+    parser.EndElementHandler    = builder.endElement
+    parser.CharacterDataHandler = builder.characters
 
+    handle = open(xmlFile, 'r')
+    try:
+        parser.ParseFile(handle)
+    finally:
+        handle.close()
+    return
 
-def xmlToJobReport(reportInstance, xmlFile):
+def nodeXmlToJobReport(reportInstance, xmlFile):
     """
-    _xmlToJobReport_
+    _nodeXmlToJobReport_
 
-    parse the XML file and insert the information into the
-    Report instance provided
+    parse the XML file into a Node tree and insert the information into
+    the Report instance provided, kept to check and benchmark the
+    streaming parser against
 
     """
     # read XML, build node structure
@@ -19,7 +19,7 @@ import math
 
 from WMCore.DataStructs.Run         import Run
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.JobSplitting.LumiBased  import isGoodLumi, isGoodRun
+from WMCore.DataStructs.LumiMask    import LumiMask
 from WMCore.WMBS.File               import File
 from WMCore.WMSpec.WMTask           import buildLumiMask
 
@@ -46,11 +46,11 @@ class EventAwareLumiBased(JobFactory):
         collectionName  = kwargs.get('collectionName', None)
         splitOnRun      = kwargs.get('splitOnRun', True)
         getParents      = kwargs.get('include_parents', False)
-        runWhitelist    = kwargs.get('runWhitelist', [])
+        runWhitelist    = set(kwargs.get('runWhitelist', []))
         runs            = kwargs.get('runs', None)
         lumis           = kwargs.get('lumis', None)
 
-        goodRunList = {}
+        goodRunList = LumiMask()
         if runs and lumis:
             goodRunList = buildLumiMask(runs, lumis)
 
@@ -75,7 +75,7 @@ class EventAwareLumiBased(JobFactory):
                     msg += str(ex)
                     msg += str(traceback.format_exc())
                     logging.error(msg)
-                    goodRunList = {}
+                    goodRunList = LumiMask()
                 else:
                     msg +=  "Refusing to create any jobs.\n"
                     msg += str(ex)
@@ -97,16 +97,14 @@ class EventAwareLumiBased(JobFactory):
                 fileLumis = loadRunLumi.execute(files = lDict[key])
                 for f in lDict[key]:
                     lumiDict = fileLumis.get(f['id'], {})
-                    for run in lumiDict.keys():
-                        f.addRun(run = Run(run, *lumiDict[run]))
+                    f.addRuns([Run(run, *lumiDict[run]) for run in lumiDict.keys()])
 
             for f in lDict[key]:
                 if len(f['runs']) == 0:
                     continue
-                f['runs'] = sorted(f['runs'])
+                f['runs'] = f.getSortedRuns()
                 f['lumiCount'] = 0
                 for run in f['runs']:
-                    run.lumis.sort()
                     f['lumiCount'] += len(run.lumis)
                 f['lowestRun'] = f['runs'][0]
 
@@ -172,13 +170,14 @@ class EventAwareLumiBased(JobFactory):
                     lumisPerJob = max(lumisInJob + lumisAllowed, 1)
 
                 for run in f['runs']:
-                    if not isGoodRun(goodRunList = goodRunList, run = run.run):
+                    if not goodRunList.hasRun(run.run):
                         # Then skip this one
                         continue
                     if len(runWhitelist) > 0 and not run.run in runWhitelist:
                         # Skip due to run whitelist
                         continue
                     firstLumi = None
+                    goodLumis = set(goodRunList.filterLumis(run.run, run.lumis))
 
                     if splitOnRun and run.run != lastRun:
                         # Then we need to kill this job and get a new one
@@ -186,7 +185,7 @@ class EventAwareLumiBased(JobFactory):
 
                     # Now loop over the lumis
                     for lumi in run:
-                        if not isGoodLumi(goodRunList, run = run.run, lumi = lumi):
+                        if not lumi in goodLumis:
                             # Kill the chain of good lumis
                             # Skip this lumi
                             if firstLumi != None and firstLumi != lumi:
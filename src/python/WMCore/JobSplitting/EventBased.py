@@ -47,8 +47,7 @@ class EventBased(JobFactory):
                     fileLumis = loadRunLumi.execute(files = fileList)
                     for f in fileList:
                         lumiDict = fileLumis.get(f['id'], {})
-                        for run in lumiDict.keys():
-                            f.addRun(run = Run(run, *lumiDict[run]))
+                        f.addRuns([Run(run, *lumiDict[run]) for run in lumiDict.keys()])
             for f in fileList:
                 currentEvent = f['first_event']
                 eventsInFile = f['events']
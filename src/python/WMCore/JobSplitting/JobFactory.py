@@ -44,6 +44,10 @@ class JobFactory(WMObject):
         self.proxies       = []
         self.grabByProxy   = False
         self.daoFactory    = None
+        self.nGroups       = 0
+        self.groupHandler  = None
+        self.groupsPerBatch  = 1
+        self.maxJobsPerGroup = 0
         self.timing = {'jobInstance': 0, 'sortByLocation': 0, 'acquireFiles': 0, 'jobGroup': 0}
 
         if package == 'WMCore.WMBS':
@@ -70,6 +74,7 @@ class JobFactory(WMObject):
 
         # Every time we restart, re-zero the jobs
         self.nJobs = 0
+        self.nGroups = 0
 
         # Create a new name
         self.baseUUID = makeUUID()
@@ -93,6 +98,35 @@ class JobFactory(WMObject):
         map(lambda x: x.finish(), self.generators)
         return self.jobGroups
 
+    def stream(self, handler, groupsPerBatch = 1, maxJobsPerGroup = 0,
+               *args, **kwargs):
+        """
+        _stream_
+
+        Run the splitting algorithm in streaming mode: instead of keeping
+        every JobGroup until the algorithm finishes, JobGroups are committed
+        and passed to handler in batches of groupsPerBatch as soon as they
+        are complete, and then dropped.  If maxJobsPerGroup is set a new
+        JobGroup is started whenever the current one reaches that many jobs,
+        so that the number of jobs held in memory stays bounded no matter
+        how many jobs the algorithm produces.
+
+        Works with every splitting algorithm, the other arguments are the
+        same as for __call__.  Returns the number of JobGroups created.
+        """
+        self.groupHandler    = handler
+        self.groupsPerBatch  = max(int(groupsPerBatch), 1)
+        self.maxJobsPerGroup = int(maxJobsPerGroup)
+
+        try:
+            self(*args, **kwargs)
+        finally:
+            self.groupHandler    = None
+            self.groupsPerBatch  = 1
+            self.maxJobsPerGroup = 0
+
+        return self.nGroups
+
     def algorithm(self, *args, **kwargs):
         """
         _algorithm_
@@ -117,6 +151,15 @@ class JobFactory(WMObject):
         """
         Instantiate a new Job onject, apply all the generators to it
         """
+        if self.groupHandler:
+            # The previous job is complete, in streaming mode this is the
+            # point where full JobGroups are rolled over and handed out
+            if self.maxJobsPerGroup > 0 and \
+                   len(self.currentGroup.newjobs) >= self.maxJobsPerGroup:
+                self.newGroup()
+            if len(self.jobGroups) >= self.groupsPerBatch:
+                self.flushJobGroups()
+
         self.currentJob = self.jobInstance(name, files)
         self.currentJob["task"] = self.subscription.taskName()
         self.currentJob["workflow"] = self.subscription.workflowName()
@@ -152,6 +195,7 @@ class JobFactory(WMObject):
         if self.currentGroup:
             self.jobGroups.append(self.currentGroup)
             self.currentGroup = None
+            self.nGroups += 1
 
         return
 
@@ -161,7 +205,16 @@ class JobFactory(WMObject):
         Bulk commit the JobGroups all at once
         """
         self.appendJobGroup()
+        self.flushJobGroups()
+        return
+
+    def flushJobGroups(self):
+        """
+        _flushJobGroups_
 
+        Bulk commit the completed JobGroups.  In streaming mode hand them to
+        the group handler and forget about them afterwards.
+        """
         if len(self.jobGroups) == 0:
             return
 
@@ -179,6 +232,11 @@ class JobFactory(WMObject):
                     job.save()
             self.subscription.save()
 
+        if self.groupHandler:
+            jobGroups = self.jobGroups
+            self.jobGroups = []
+            self.groupHandler(jobGroups)
+
         #gc.collect()
         return
 
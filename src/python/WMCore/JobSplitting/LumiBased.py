@@ -16,6 +16,7 @@ import threading
 import traceback
 
 from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.LumiMask import LumiMask
 
 from WMCore.JobSplitting.JobFactory import JobFactory
 from WMCore.WMBS.File               import File
@@ -28,10 +29,15 @@ def isGoodLumi(goodRunList, run, lumi):
 
     Checks to see if runs match a run-lumi combination in the goodRunList
     This is a pain in the ass.
+
+    Prefer passing a LumiMask, plain dictionaries are walked range by range.
     """
     if goodRunList == None or goodRunList == {}:
         return True
 
+    if isinstance(goodRunList, LumiMask):
+        return goodRunList.hasLumi(run, lumi)
+
     if not isGoodRun(goodRunList = goodRunList, run = run):
         return False
 
@@ -54,7 +60,10 @@ def isGoodRun(goodRunList, run):
     if goodRunList == None or goodRunList == {}:
         return True
 
-    if str(run) in goodRunList.keys():
+    if isinstance(goodRunList, LumiMask):
+        return goodRunList.hasRun(run)
+
+    if str(run) in goodRunList:
         # @e can find a run
         return True
 
@@ -84,11 +93,11 @@ class LumiBased(JobFactory):
         collectionName  = kwargs.get('collectionName', None)
         splitOnRun      = kwargs.get('splitOnRun', True)
         getParents      = kwargs.get('include_parents', False)
-        runWhitelist    = kwargs.get('runWhitelist', [])
+        runWhitelist    = set(kwargs.get('runWhitelist', []))
         runs            = kwargs.get('runs', None)
         lumis           = kwargs.get('lumis', None)
 
-        goodRunList = {}
+        goodRunList = LumiMask()
         if runs and lumis:
             goodRunList = buildLumiMask(runs, lumis)
 
@@ -113,7 +122,7 @@ class LumiBased(JobFactory):
                     msg += str(ex)
                     msg += str(traceback.format_exc())
                     logging.error(msg)
-                    goodRunList = {}
+                    goodRunList = LumiMask()
                 else:
                     msg +=  "Refusing to create any jobs.\n"
                     msg += str(ex)
@@ -135,17 +144,14 @@ class LumiBased(JobFactory):
                 fileLumis = loadRunLumi.execute(files = lDict[key])
                 for f in lDict[key]:
                     lumiDict = fileLumis.get(f['id'], {})
-                    for run in lumiDict.keys():
-                        f.addRun(run = Run(run, *lumiDict[run]))
+                    f.addRuns([Run(run, *lumiDict[run]) for run in lumiDict.keys()])
 
             for f in lDict[key]:
                 #if hasattr(f, 'loadData'):
                 #    f.loadData()
                 if len(f['runs']) == 0:
                     continue
-                f['runs'] = sorted(f['runs'])
-                for run in f['runs']:
-                    run.lumis.sort()
+                f['runs'] = f.getSortedRuns()
                 f['lowestRun'] = f['runs'][0]
                 #f['lowestRun'] = list(sorted(f['runs']))[0]
                 newlist.append(f)
@@ -182,13 +188,14 @@ class LumiBased(JobFactory):
                     stopJob = True
 
                 for run in f['runs']:
-                    if not isGoodRun(goodRunList = goodRunList, run = run.run):
+                    if not goodRunList.hasRun(run.run):
                         # Then skip this one
                         continue
                     if len(runWhitelist) > 0 and not run.run in runWhitelist:
                         # Skip due to run whitelist
                         continue
                     firstLumi = None
+                    goodLumis = set(goodRunList.filterLumis(run.run, run.lumis))
 
                     if splitOnRun and run.run != lastRun:
                         # Then we need to kill this job and get a new one
@@ -196,7 +203,7 @@ class LumiBased(JobFactory):
 
                     # Now loop over the lumis
                     for lumi in run:
-                        if not isGoodLumi(goodRunList, run = run.run, lumi = lumi):
+                        if not lumi in goodLumis:
                             # Kill the chain of good lumis
                             # Skip this lumi
                             if firstLumi != None and firstLumi != lumi:
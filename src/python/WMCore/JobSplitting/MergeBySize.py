@@ -46,19 +46,23 @@ class MergeBySize(JobFactory):
         locationDict = self.sortByLocation()
         for location in locationDict:
             baseName = makeUUID()
+            # Count jobs per name rather than per group, in streaming
+            # mode a location may span several groups
+            jobNumber = 1
             self.newGroup()
             for f in locationDict[location]:
                 accumSize += f['size']
                 jobFiles.addFile(f)
                 if accumSize >= mergeSize:
-                    self.newJob(name = '%s-%s' % (baseName, len(self.currentGroup.jobs) + 1),
+                    self.newJob(name = '%s-%s' % (baseName, jobNumber),
                                       files = jobFiles)
                     self.currentJob["mask"].setMaxAndSkipEvents(-1, 0)
+                    jobNumber += 1
                     accumSize = 0
                     jobFiles = Fileset()
 
             if len(jobFiles) > 0:
                 if overflow:
-                    self.newJob(name = '%s-%s' % (baseName, len(self.currentGroup.jobs) + 1),
+                    self.newJob(name = '%s-%s' % (baseName, jobNumber),
                                       files = jobFiles)
                     self.currentJob["mask"].setMaxAndSkipEvents(-1, 0)
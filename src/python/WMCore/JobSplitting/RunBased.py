@@ -80,6 +80,9 @@ class RunBased(JobFactory):
 
                 self.newGroup()
                 baseName = makeUUID()
+                # Count jobs per name rather than per group, in streaming
+                # mode a run may span several groups
+                jobNumber = 0
 
                 #Now split them into sections according to files per job
                 while len(runDict[run]) > 0:
@@ -90,5 +93,6 @@ class RunBased(JobFactory):
                             jobFiles.append(runDict[run].pop())
 
                     # Create the job
-                    currentJob = self.newJob('%s-%s' % (baseName, len(self.currentGroup.newjobs)),
+                    currentJob = self.newJob('%s-%s' % (baseName, jobNumber),
                                              files = jobFiles)
+                    jobNumber += 1
@@ -11,7 +11,8 @@ import traceback
 import re
 
 from WMCore.Database.CMSCouch import CouchServer
-from WMCore.Database.CMSCouch import CouchNotFoundError, CouchError
+from WMCore.Database.CMSCouch import CouchError
+from WMCore.DataStructs.LumiMask import compressLumis
 from WMCore.DataStructs.WMObject import WMObject
 from WMCore.JobStateMachine.Transitions import Transitions
 from WMCore.Services.Dashboard.DashboardReporter import DashboardReporter
@@ -56,6 +57,159 @@ def discardConflictingDocument(couchDbInstance, data, result):
         return result
 
 
+def loadDocuments(couchDbInstance, docIDs):
+    """
+    _loadDocuments_
+
+    Load the given documents with a single _all_docs call, return them in a
+    dictionary keyed by id.  Documents that don't exist or were deleted are
+    left out.
+    """
+    documents = {}
+    if len(docIDs) == 0:
+        return documents
+
+    result = couchDbInstance.allDocs(options = {"include_docs": True},
+                                     keys = list(set(docIDs)))
+    for row in result["rows"]:
+        if row.get("doc", None):
+            documents[row["id"]] = row["doc"]
+
+    return documents
+
+def appendStateTransition(jobDocument, transition):
+    """
+    _appendStateTransition_
+
+    Add a state transition to a job document, this does the same as the
+    stateTransition update handler of the JobDump couchapp.
+    """
+    states = jobDocument.setdefault("states", {})
+    maxKey = 0
+    for key in states.keys():
+        maxKey = max(maxKey, int(key))
+
+    states[str(maxKey + 1)] = transition
+    return
+
+def summarizeReport(report, maxFiles = None, maxErrorLength = None):
+    """
+    _summarizeReport_
+
+    Extract the parts of a framework job report that go into the job summary
+    document in a single pass over the report steps: the errors per step,
+    the lumis of the primary input as ranges per run, the input and output
+    files and the output dataset.
+
+    Only the first maxFiles input and output files and the first
+    maxErrorLength characters of the error details are kept, the number of
+    entries that were dropped is recorded under "truncated".
+    """
+    errors = {}
+    lumis = {}
+    inputFiles = []
+    outputs = []
+    outputDataset = None
+    truncated = {}
+
+    for stepName in report.listSteps():
+        reportStep = report.retrieveStep(stepName)
+        if reportStep == None:
+            continue
+
+        errorCount = getattr(reportStep.errors, "errorCount", 0)
+        if errorCount:
+            stepErrors = []
+            for i in range(errorCount):
+                reportError = getattr(reportStep.errors, "error%i" % i)
+                details = reportError.details
+                if maxErrorLength != None and details and len(details) > maxErrorLength:
+                    truncated["errors"] = truncated.get("errors", 0) + 1
+                    details = details[:maxErrorLength]
+                stepErrors.append({"type": reportError.type,
+                                   "details": details,
+                                   "exitCode": reportError.exitCode})
+            errors[stepName] = stepErrors
+
+        for inputSource in reportStep.input.listSections_():
+            source = getattr(reportStep.input, inputSource)
+            for fileNum in range(source.files.fileCount):
+                fileRef = getattr(source.files, "file%d" % fileNum)
+                if inputSource == "source":
+                    for run in fileRef.runs.listSections_():
+                        lumis.setdefault(run, []).extend(getattr(fileRef.runs, run))
+                if maxFiles != None and len(inputFiles) >= maxFiles:
+                    truncated["inputfiles"] = truncated.get("inputfiles", 0) + 1
+                    continue
+                inputFiles.append({"lfn": getattr(fileRef, "lfn", None),
+                                   "input_type": getattr(fileRef, "input_type", None)})
+
+        if CMSSTEP.match(stepName):
+            fileType = "output"
+        else:
+            fileType = None
+        for outputModule in getattr(reportStep, "outputModules", []):
+            outputMod = getattr(reportStep.output, outputModule, None)
+            if outputMod == None:
+                continue
+            for fileNum in range(outputMod.files.fileCount):
+                fileRef = getattr(outputMod.files, "file%d" % fileNum)
+                if not outputDataset:
+                    outputDataset = getattr(fileRef, "dataset", None)
+                if maxFiles != None and len(outputs) >= maxFiles:
+                    truncated["output"] = truncated.get("output", 0) + 1
+                    continue
+                locations = getattr(fileRef, "location", None) or []
+                if isinstance(locations, basestring):
+                    locations = [locations]
+                locations = list(set(locations))
+                if len(locations) == 1:
+                    locations = locations[0]
+                elif len(locations) == 0:
+                    locations = None
+                outputs.append({"type": fileType or getattr(fileRef, "module_label", None),
+                                "lfn": getattr(fileRef, "lfn", None),
+                                "location": locations,
+                                "checksums": getattr(fileRef, "checksums", {}),
+                                "size": int(getattr(fileRef, "size", 0))})
+
+    for run in lumis.keys():
+        lumis[run] = compressLumis(lumis[run])
+
+    summary = {"errors": errors,
+               "lumis": lumis,
+               "inputfiles": inputFiles,
+               "output": outputs,
+               "outputdataset": outputDataset}
+    if truncated:
+        summary["truncated"] = truncated
+    return summary
+
+def digestReport(report, maxInputFiles = None, maxFiles = None, maxErrorLength = None):
+    """
+    _digestReport_
+
+    Pull out of a framework job report what recordInCouch() needs to write
+    the fwjr and the job summary documents, as plain python types that are
+    cheap to send to another process.  The input files are stripped from the
+    report first if there are more than maxInputFiles of them.
+
+    A job carrying the result in "fwjr_digest" doesn't need its report.
+    """
+    if maxInputFiles != None:
+        # This is not critical
+        try:
+            if len(report.getAllInputFiles()) > maxInputFiles:
+                report.stripInputFiles()
+        except:
+            logging.error("Error while trying to strip input files from FWJR.  Ignoring.")
+
+    return {"fwjr": report.__to_json__(None),
+            "summary": summarizeReport(report, maxFiles, maxErrorLength),
+            "cms_location": report.getSiteName(),
+            "exitcode": report.getExitCode()}
+
+
 class ChangeState(WMObject, WMConnectionBase):
     """
     Propagate the state of a job through the JSM.
@@ -93,6 +247,8 @@ class ChangeState(WMObject, WMConnectionBase):
         self.jobTypeDAO = self.daofactory("Jobs.GetType")
 
         self.maxUploadedInputFiles = getattr(self.config.JobStateMachine, 'maxFWJRInputFiles', 1000)
+        self.maxSummaryFiles = getattr(self.config.JobStateMachine, 'maxSummaryFiles', 1000)
+        self.maxSummaryErrorLength = getattr(self.config.JobStateMachine, 'maxSummaryErrorLength', 10000)
         return
 
     def propagate(self, jobs, newstate, oldstate, updatesummary = False):
@@ -152,7 +308,12 @@ class ChangeState(WMObject, WMConnectionBase):
 
         Record relevant job information in couch. If the job does not yet exist
         in couch it will be saved as a seperate document.  If the job has a FWJR
-        attached that will be saved as a seperate document.
+        attached, or the fwjr_digest made of it by digestReport(), that will be
+        saved as a seperate document.
+
+        The documents of the jobs already in couch and their job summaries are
+        loaded with one _all_docs call per database, the state transitions are
+        added here and everything is written back with _bulk_docs on commit.
         """
         if not self.jobsdatabase or not self.fwjrdatabase:
             return
@@ -160,6 +321,20 @@ class ChangeState(WMObject, WMConnectionBase):
         timestamp = int(time.time())
         couchRecordsToUpdate = []
 
+        jobDocIDs = []
+        summaryIDs = []
+        for job in jobs:
+            couchDocID = job.get("couch_record", None)
+            if couchDocID != None:
+                jobDocIDs.append(couchDocID)
+            hasReport = job.get("fwjr", None) or job.get("fwjr_digest", None)
+            if updatesummary or (couchDocID != None and hasReport):
+                summaryIDs.append(job["name"])
+
+        jobDocuments = loadDocuments(self.jobsdatabase, jobDocIDs)
+        summaryDocuments = loadDocuments(self.jsumdatabase, summaryIDs)
+        updatedJobDocuments = {}
+
         for job in jobs:
             couchDocID = job.get("couch_record", None)
 
@@ -223,124 +398,84 @@ class ChangeState(WMObject, WMConnectionBase):
                                              "couchid": jobDocument["_id"]})
                 self.jobsdatabase.queue(jobDocument, callback = discardConflictingDocument)
             else:
-                # We send a PUT request to the stateTransition update handler.
-                # Couch expects the parameters to be passed as arguments to in
-                # the URI while the Requests class will only encode arguments
-                # this way for GET requests.  Changing the Requests class to
-                # encode PUT arguments as couch expects broke a bunch of code so
-                # we'll just do our own encoding here.
-                updateUri = "/" + self.jobsdatabase.name + "/_design/JobDump/_update/stateTransition/" + couchDocID
-                updateUri += "?oldstate=%s&newstate=%s&location=%s&timestamp=%s" % (oldstate,
-                                                                                    newstate,
-                                                                                    jobLocation,
-                                                                                    timestamp)
-                self.jobsdatabase.makeRequest(uri = updateUri, type = "PUT", decode = False)
+                jobDocument = jobDocuments.get(couchDocID, None)
+                if jobDocument == None:
+                    jobDocument = {"_id": couchDocID, "states": {}}
+                    jobDocuments[couchDocID] = jobDocument
+                appendStateTransition(jobDocument, {"oldstate": oldstate,
+                                                    "newstate": newstate,
+                                                    "location": jobLocation,
+                                                    "timestamp": timestamp})
+                updatedJobDocuments[couchDocID] = jobDocument
 
             # updating the status of the summary doc only when it is explicitely requested
             # doc is already in couch
             if updatesummary:
                 jobSummaryId = job["name"]
-                updateUri = "/" + self.jsumdatabase.name + "/_design/WMStats/_update/jobSummaryState/" + jobSummaryId
-                updateUri += "?newstate=%s&timestamp=%s" % (newstate, timestamp)
-                self.jsumdatabase.makeRequest(uri = updateUri, type = "PUT", decode = False)
-                logging.debug("Updated job summary status for job %s" % jobSummaryId)
-                
-                updateUri = "/" + self.jsumdatabase.name + "/_design/WMStats/_update/jobStateTransition/" + jobSummaryId
-                updateUri += "?oldstate=%s&newstate=%s&location=%s&timestamp=%s" % (oldstate,
-                                                                                    newstate,
-                                                                                    job["location"],
-                                                                                    timestamp)
-                self.jsumdatabase.makeRequest(uri = updateUri, type = "PUT", decode = False)
+                jobSummary = summaryDocuments.setdefault(jobSummaryId, {"_id": jobSummaryId})
+                jobSummary["state"] = newstate
+                jobSummary["timestamp"] = timestamp
+                jobSummary.setdefault("state_history", []).append({"oldstate": oldstate,
+                                                                   "newstate": newstate,
+                                                                   "location": job["location"],
+                                                                   "timestamp": timestamp})
                 logging.debug("Updated job summary state history for job %s" % jobSummaryId)
 
-            if job.get("fwjr", None):
-
+            fwjrDigest = job.get("fwjr_digest", None)
+            if fwjrDigest == None and job.get("fwjr", None):
                 # If there are too many input files, strip them out
                 # of the FWJR, as they should already
                 # be in the database
-                # This is not critical
-                try:
-                    if len(job['fwjr'].getAllInputFiles()) > self.maxUploadedInputFiles:
-                        job['fwjr'].stripInputFiles()
-                except:
-                    logging.error("Error while trying to strip input files from FWJR.  Ignoring.")
-                    pass
+                job["fwjr"].setTaskName(job["task"])
+                fwjrDigest = digestReport(job["fwjr"], self.maxUploadedInputFiles,
+                                          self.maxSummaryFiles, self.maxSummaryErrorLength)
 
+            if fwjrDigest != None:
                 # complete fwjr document
-                job["fwjr"].setTaskName(job["task"])
+                fwjrDigest["fwjr"]["task"] = job["task"]
                 fwjrDocument = {"_id": "%s-%s" % (job["id"], job["retry_count"]),
                                 "jobid": job["id"],
                                 "retrycount": job["retry_count"],
-                                "fwjr": job["fwjr"].__to_json__(None),
+                                "fwjr": fwjrDigest["fwjr"],
                                 "type": "fwjr"}
                 self.fwjrdatabase.queue(fwjrDocument, timestamp = True, callback = discardConflictingDocument)
 
                 jobSummaryId = job["name"]
                 # building a summary of fwjr
                 logging.debug("Pushing job summary for job %s" % jobSummaryId)
-                errmsgs = {}
-                inputs = []
-                if "steps" in fwjrDocument["fwjr"]:
-                    for step in fwjrDocument["fwjr"]["steps"]:
-                        if "errors" in fwjrDocument["fwjr"]["steps"][step]:
-                            errmsgs[step] = [error for error in fwjrDocument["fwjr"]["steps"][step]["errors"]]
-                        if "input" in fwjrDocument["fwjr"]["steps"][step] and "source" in fwjrDocument["fwjr"]["steps"][step]["input"]:
-                            inputs.extend( [source["runs"] for source in fwjrDocument["fwjr"]['steps'][step]["input"]["source"] if "runs" in source] )
-
-                outputs = []
-                outputDataset = None
-                for singlestep in job["fwjr"].listSteps():
-                    for singlefile in job["fwjr"].getAllFilesFromStep(step=singlestep):
-                        if singlefile:
-                            outputs.append({'type': 'output' if CMSSTEP.match(singlestep) else singlefile.get('module_label', None),
-                                            'lfn': singlefile.get('lfn', None),
-                                            'location': list(singlefile.get('locations', set([]))) if len(singlefile.get('locations', set([]))) > 1
-                                                                                                   else singlefile['locations'].pop(),
-                                            'checksums': singlefile.get('checksums', {}),
-                                            'size': singlefile.get('size', None) })
-                            #it should have one output dataset for all the files
-                            outputDataset = singlefile.get('dataset', None) if not outputDataset else outputDataset
-                inputFiles = []
-                for inputFileStruct in job["fwjr"].getAllInputFiles():
-                    # check if inputFileSummary needs to be extended
-                    inputFileSummary = {}
-                    inputFileSummary["lfn"] = inputFileStruct["lfn"]
-                    inputFileSummary["input_type"] = inputFileStruct["input_type"]
-                    inputFiles.append(inputFileSummary)
-                    
-                jobSummary = {"_id": jobSummaryId,
-                              "wmbsid": job["id"],
-                              "type": "jobsummary",
-                              "retrycount": job["retry_count"],
-                              "workflow": job["workflow"],
-                              "task": job["task"],
-                              "jobtype": job["jobType"],
-                              "state": newstate,
-                              "site": job.get("location", None),
-                              "cms_location": job["fwjr"].getSiteName(),
-                              "exitcode": job["fwjr"].getExitCode(),
-                              "errors": errmsgs,
-                              "lumis": inputs,
-                              "outputdataset": outputDataset,
-                              "inputfiles": inputFiles,
-                              "output": outputs }
-                if couchDocID is not None:
-                    try:
-                        currentJobDoc = self.jsumdatabase.document(id = jobSummaryId)
+                jobSummary = dict(fwjrDigest["summary"])
+                jobSummary.update({"_id": jobSummaryId,
+                                   "wmbsid": job["id"],
+                                   "type": "jobsummary",
+                                   "retrycount": job["retry_count"],
+                                   "workflow": job["workflow"],
+                                   "task": job["task"],
+                                   "jobtype": job["jobType"],
+                                   "state": newstate,
+                                   "site": job.get("location", None),
+                                   "cms_location": fwjrDigest["cms_location"],
+                                   "exitcode": fwjrDigest["exitcode"]})
+                currentJobDoc = summaryDocuments.get(jobSummaryId, None)
+                if currentJobDoc != None:
+                    if "_rev" in currentJobDoc:
                         jobSummary['_rev'] = currentJobDoc['_rev']
-                        jobSummary['state_history'] = currentJobDoc.get('state_history', [])
-                    except CouchNotFoundError:
-                        pass
-                self.jsumdatabase.queue(jobSummary, timestamp = True)
+                    jobSummary['state_history'] = currentJobDoc.get('state_history', [])
+                jobSummary["timestamp"] = timestamp
+                summaryDocuments[jobSummaryId] = jobSummary
 
         if len(couchRecordsToUpdate) > 0:
             self.setCouchDAO.execute(bulkList = couchRecordsToUpdate,
                                      conn = self.getDBConn(),
                                      transaction = self.existingTransaction())
 
+        for jobDocument in updatedJobDocuments.values():
+            self.jobsdatabase.queue(jobDocument, callback = discardConflictingDocument)
+        for jobSummary in summaryDocuments.values():
+            self.jsumdatabase.queue(jobSummary, callback = discardConflictingDocument)
+
         self.jobsdatabase.commit(callback = discardConflictingDocument)
         self.fwjrdatabase.commit(callback = discardConflictingDocument)
-        self.jsumdatabase.commit()
+        self.jsumdatabase.commit(callback = discardConflictingDocument)
         return
 
     def persist(self, jobs, newstate, oldstate):
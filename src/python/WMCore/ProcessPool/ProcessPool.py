@@ -3,6 +3,14 @@
 """
 _ProcessPool_
 
+Run work in a pool of slave processes.
+
+By default the work and the results are JSON encoded and go through two ZMQ
+TCP sockets shared by all the slaves.  In fast mode every slave gets its own
+ipc socket, the work is sent in pickled batches of up to batchSize units and
+the pool keeps track of the batches each slave is working on.  When a slave
+dies its batches are given to the other slaves and a new slave is started,
+and getWorkerStats() reports the throughput of every slave.
 """
 
 
@@ -15,6 +23,10 @@ import os
 import threading
 import traceback
 import cPickle
+import time
+import shutil
+import tempfile
+from collections import deque
 
 from logging.handlers import RotatingFileHandler
 
@@ -60,10 +72,26 @@ class ProcessPoolWorker:
         return
 
 
+def slaveCrashMessage():
+    """
+    _slaveCrashMessage_
+
+    Format the exception being handled by a slave.
+    """
+    crashMessage = "Slave process crashed with exception: " + str(sys.exc_info()[1])
+    crashMessage += "\nStacktrace:\n"
+
+    stackTrace = traceback.format_tb(sys.exc_info()[2], None)
+    for stackFrame in stackTrace:
+        crashMessage += stackFrame
+    return crashMessage
+
+
 class ProcessPool:
     def __init__(self, slaveClassName, totalSlaves, componentDir,
                  config, namespace = 'WMComponent', inPort = '5555',
-                 outPort = '5558'):
+                 outPort = '5558', fastMode = False, batchSize = 100,
+                 maxRetries = 3):
         """
         __init__
 
@@ -77,7 +105,13 @@ class ProcessPool:
         parameters.  It is not passed to the slave class.  The slaveInit
         parameter will be serialized and passed to the slave class's
         constructor.
+
+        With fastMode the ports are not used, work that was running in a
+        slave that died is retried up to maxRetries times.
         """
+        self.fastMode     = fastMode
+        self.batchSize    = batchSize
+        self.maxRetries   = maxRetries
         self.enqueueIndex = 0
         self.dequeueIndex = 0
         self.runningWork  = 0
@@ -119,6 +153,10 @@ class ProcessPool:
         cPickle.dump(config, f)
         f.close()
 
+        if self.fastMode:
+            self.setupFastMode()
+            return
+
         # Set up ZMQ
         try:
             context = zmq.Context()
@@ -153,6 +191,144 @@ class ProcessPool:
         return
 
 
+    def setupFastMode(self):
+        """
+        _setupFastMode_
+
+        Bind the ipc socket the slaves send their results to and start the
+        slaves.  The sockets live in a private temporary directory as the
+        path of an ipc socket is limited in length.
+        """
+        self.socketDir    = tempfile.mkdtemp(prefix = "ProcessPool_")
+        self.context      = zmq.Context()
+        self.sinkEndpoint = "ipc://%s/sink" % self.socketDir
+        self.sink         = self.context.socket(zmq.PULL)
+        self.sink.bind(self.sinkEndpoint)
+        self.poller       = zmq.Poller()
+        self.poller.register(self.sink, zmq.POLLIN)
+
+        self.slaves      = []
+        self.pending     = deque()
+        self.results     = deque()
+        self.errors      = []
+        self.nextBatchID = 0
+        self.maxInflight = 2
+
+        for slaveID in range(self.nSlaves):
+            self.slaves.append({"id": slaveID, "process": None, "socket": None,
+                                "inflight": {}, "starts": 0, "batches": 0,
+                                "items": 0, "busyTime": 0.0})
+            self.startSlave(self.slaves[slaveID])
+        return
+
+    def startSlave(self, slave):
+        """
+        _startSlave_
+
+        Start the process of a fast mode slave.  Every start uses a new
+        socket so that work queued for a dead slave is dropped.
+        """
+        if slave["socket"] != None:
+            slave["socket"].close()
+
+        endpoint = "ipc://%s/slave_%s_%s" % (self.socketDir, slave["id"],
+                                             slave["starts"])
+        slaveArgs = [self.versionString, __file__, self.slaveClassName,
+                     endpoint, self.sinkEndpoint, self.configPath,
+                     self.componentDir, self.namespace, "fast",
+                     str(slave["id"])]
+        slave["process"] = subprocess.Popen(slaveArgs, stdin = subprocess.PIPE,
+                                            stdout = subprocess.PIPE)
+        slave["socket"] = self.context.socket(zmq.PUSH)
+        slave["socket"].setsockopt(zmq.LINGER, 0)
+        slave["socket"].connect(endpoint)
+        slave["starts"] += 1
+        return
+
+    def checkSlaves(self):
+        """
+        _checkSlaves_
+
+        Give the batches of the slaves that died back to the queue and restart
+        them.  A batch that has already been retried maxRetries times is
+        probably what kills the slaves, give up.
+        """
+        for slave in self.slaves:
+            if slave["process"].poll() == None:
+                continue
+
+            logging.error("ProcessPool slave %s (pid %s) died with exit code %s, restarting it" % \
+                          (slave["id"], slave["process"].pid, slave["process"].returncode))
+            for batchID, (work, attempts) in slave["inflight"].items():
+                if attempts >= self.maxRetries:
+                    msg = "Work in batch %s killed %s slaves, giving up" % (batchID, attempts + 1)
+                    logging.error(msg)
+                    raise ProcessPoolException(msg)
+                self.pending.appendleft((batchID, work, attempts + 1))
+            slave["inflight"] = {}
+            self.startSlave(slave)
+        return
+
+    def dispatch(self):
+        """
+        _dispatch_
+
+        Send the pending batches to the slaves with less than maxInflight
+        batches.
+        """
+        for slave in self.slaves:
+            while self.pending and len(slave["inflight"]) < self.maxInflight:
+                batchID, work, attempts = self.pending.popleft()
+                slave["socket"].send(cPickle.dumps((batchID, work),
+                                                   cPickle.HIGHEST_PROTOCOL))
+                slave["inflight"][batchID] = (work, attempts)
+        return
+
+    def receiveBatch(self, message):
+        """
+        _receiveBatch_
+
+        Store the results of a batch.  Results from a slave that was declared
+        dead are dropped, the batch has already been given to another slave.
+        """
+        slaveID, batchID, results, busyTime = cPickle.loads(message)
+        slave = self.slaves[slaveID]
+        if slave["inflight"].pop(batchID, None) == None:
+            return
+
+        slave["batches"]  += 1
+        slave["items"]    += len(results)
+        slave["busyTime"] += busyTime
+        for status, output in results:
+            if status == "ERROR":
+                logging.error("Received Error Message from ProcessPool Slave")
+                logging.error(output)
+                self.errors.append(output)
+                self.runningWork -= 1
+            else:
+                self.results.append(output)
+        return
+
+    def getWorkerStats(self):
+        """
+        _getWorkerStats_
+
+        Return the number of batches and work units each slave processed,
+        how long it has been busy, its throughput in units per second and
+        how many times it was started.
+        """
+        stats = []
+        for slave in self.slaves:
+            throughput = 0.0
+            if slave["busyTime"] > 0:
+                throughput = slave["items"] / slave["busyTime"]
+            stats.append({"id": slave["id"], "pid": slave["process"].pid,
+                          "starts": slave["starts"], "batches": slave["batches"],
+                          "items": slave["items"], "busyTime": slave["busyTime"],
+                          "throughput": throughput,
+                          "inflight": len(slave["inflight"])})
+        return stats
+
     def createSlaves(self):
         """
         _createSlaves_
@@ -161,6 +337,10 @@ class ProcessPool:
         Moving it into a separate function allows us to restart
         all of them.
         """
+        if self.fastMode:
+            for slave in self.slaves:
+                self.startSlave(slave)
+            return
 
         totalSlaves    = self.nSlaves
         slaveClassName = self.slaveClassName
@@ -212,6 +392,15 @@ class ProcessPool:
         b) Closing the pipes
         c) Shutting down the workers themselves
         """
+        if self.fastMode:
+            self.stopSlaves()
+            if self.socketDir:
+                self.sink.close()
+                self.context.term()
+                shutil.rmtree(self.socketDir, ignore_errors = True)
+                self.socketDir = None
+            return
+
         for i in range(self.nSlaves):
             try:
                 encodedWork = self.jsonHandler.encode('STOP')
@@ -248,6 +437,39 @@ class ProcessPool:
         self.workers = []
         return
 
+    def stopSlaves(self, timeout = 10):
+        """
+        _stopSlaves_
+
+        Ask the fast mode slaves to stop, kill the ones still running after
+        timeout seconds.  The work they had is put back in the queue.
+        """
+        for slave in self.slaves:
+            for batchID, (work, attempts) in slave["inflight"].items():
+                self.pending.appendleft((batchID, work, attempts))
+            slave["inflight"] = {}
+            if slave["process"] == None:
+                continue
+            try:
+                slave["socket"].send(cPickle.dumps((None, None)), zmq.NOBLOCK)
+            except zmq.ZMQError:
+                pass
+
+        endTime = time.time() + timeout
+        for slave in self.slaves:
+            if slave["process"] == None:
+                continue
+            while slave["process"].poll() == None and time.time() < endTime:
+                time.sleep(0.1)
+            if slave["process"].poll() == None:
+                logging.error("Killing ProcessPool slave %s" % slave["process"].pid)
+                slave["process"].kill()
+                slave["process"].wait()
+            slave["socket"].close()
+            slave["socket"] = None
+            slave["process"] = None
+        return
+
     def enqueue(self, work, list = False):
         """
         __enqeue__
@@ -256,7 +478,21 @@ class ProcessPool:
         list where each item in the list can be serialized into JSON.
 
         If list is True, the entire list is sent as one piece of work
+
+        In fast mode the work is pickled instead and split in batches small
+        enough to keep all the slaves busy.
         """
+        if self.fastMode:
+            if list:
+                work = [work]
+            batchSize = min(self.batchSize, len(work) / self.nSlaves + 1)
+            for i in range(0, len(work), batchSize):
+                self.pending.append((self.nextBatchID, work[i:i + batchSize], 0))
+                self.nextBatchID += 1
+            self.runningWork += len(work)
+            self.dispatch()
+            return
+
         if len(self.workers) < 1:
             # Someone's shut down the system
             msg = "Attempting to send work after system failure and shutdown!\n"
@@ -292,6 +528,9 @@ class ProcessPool:
             logging.error(msg)
             raise ProcessPoolException(msg)
 
+        if self.fastMode:
+            return self.dequeueFast(totalItems)
+
         while totalItems > 0:
             try:
                 output = self.sink.recv()
@@ -315,12 +554,53 @@ class ProcessPool:
         return completedWork
 
 
+    def dequeueFast(self, totalItems):
+        """
+        _dequeueFast_
+
+        Wait until totalItems units of work are completed in fast mode, and
+        return their output.  Outputs that are lists are flattened and None
+        outputs dropped, as in JSON mode.  The errors raised by the slave
+        class are reported with a ProcessPoolException, the slaves keep
+        running.
+        """
+        while len(self.results) < totalItems and not self.errors:
+            self.dispatch()
+            if dict(self.poller.poll(1000)).get(self.sink, None):
+                while True:
+                    try:
+                        message = self.sink.recv(zmq.NOBLOCK)
+                    except zmq.ZMQError:
+                        break
+                    self.receiveBatch(message)
+            self.checkSlaves()
+
+        if self.errors:
+            msg = "\n".join(self.errors)
+            self.errors = []
+            raise ProcessPoolException(msg)
+
+        completedWork = []
+        for i in range(totalItems):
+            output = self.results.popleft()
+            self.runningWork -= 1
+            if type(output) == type([]):
+                completedWork.extend(output)
+            elif output != None:
+                completedWork.append(output)
+
+        return completedWork
+
     def restart(self):
         """
         _restart_
 
         Delete everything and restart all pools
         """
+        if self.fastMode:
+            self.stopSlaves()
+            self.createSlaves()
+            return
 
         self.close()
         self.createSlaves()
@@ -364,6 +644,44 @@ def setupDB(config, wmInit):
                                  socketLoc = socket)
     return
 
+def runFastSlave(slaveClass, slaveID, inEndpoint, outEndpoint):
+    """
+    _runFastSlave_
+
+    Fast mode slave loop: receive pickled batches, run the slave class on
+    every unit and send back the status and output of each unit with the
+    time spent on the batch.  Errors are reported per unit and don't stop
+    the slave.
+    """
+    context = zmq.Context()
+    receiver = context.socket(zmq.PULL)
+    receiver.bind(inEndpoint)
+    sender = context.socket(zmq.PUSH)
+    sender.connect(outEndpoint)
+
+    while True:
+        batchID, work = cPickle.loads(receiver.recv())
+        if batchID == None:
+            break
+
+        startTime = time.time()
+        results = []
+        for input in work:
+            try:
+                results.append(("OK", slaveClass(input)))
+            except Exception, ex:
+                crashMessage = slaveCrashMessage()
+                logging.error(crashMessage)
+                results.append(("ERROR", crashMessage))
+
+        sender.send(cPickle.dumps((slaveID, batchID, results, time.time() - startTime),
+                                  cPickle.HIGHEST_PROTOCOL))
+
+    sender.close(linger = 1000)
+    receiver.close()
+    context.term()
+    return
+
 
 if __name__ == "__main__":
     """
@@ -376,6 +694,9 @@ if __name__ == "__main__":
 
     Input variables:
     className, input port, output port, path to pickled config, component dir, namespace
+
+    Fast mode slaves get their input and output ipc endpoints instead of the
+    ports, followed by "fast" and their id.
     """
 
     # Get variables passed in
@@ -386,9 +707,26 @@ if __name__ == "__main__":
     componentDir   = sys.argv[5]
     namespace      = sys.argv[6]
 
+    fastMode = len(sys.argv) > 7 and sys.argv[7] == "fast"
+
     # Set up logging
     setupLogging(componentDir)
 
+    if fastMode:
+        f = open(configPath, 'r')
+        config = cPickle.load(f)
+        f.close()
+
+        wmInit = WMInit()
+        setupDB(config, wmInit)
+
+        wmFactory = WMFactory(name = "slaveFactory", namespace = namespace)
+        slaveClass = wmFactory.loadObject(classname = slaveClassName, args = config)
+
+        runFastSlave(slaveClass, int(sys.argv[8]), inPort, outPort)
+        logging.info("Process with PID %s finished" %(os.getpid()))
+        sys.exit(0)
+
     # Build ZMQ link
     context = zmq.Context()
     receiver = context.socket(zmq.PULL)
@@ -433,16 +771,10 @@ if __name__ == "__main__":
             break
 
         try:
-            logging.error(input)
+            logging.debug(input)
             output = slaveClass(input)
         except Exception, ex:
-            crashMessage = "Slave process crashed with exception: " + str(ex)
-            crashMessage += "\nStacktrace:\n"
-
-            stackTrace = traceback.format_tb(sys.exc_info()[2], None)
-            for stackFrame in stackTrace:
-                crashMessage += stackFrame
-
+            crashMessage = slaveCrashMessage()
             logging.error(crashMessage)
             try:
                 output        = {'type': 'ERROR', 'msg': crashMessage}
@@ -157,7 +157,7 @@ class DashboardReporter(WMObject):
                                  self.destPort))
             apmonFree()
 
-            if 'fwjr' in job:
+            if 'fwjr' in job or 'fwjr_digest' in job:
                 self.handleSteps(job)
 
         return
@@ -166,37 +166,20 @@ class DashboardReporter(WMObject):
         """
         _handleSteps_
 
-        Handle the post-processing step information
+        Handle the post-processing step information, taken from the
+        fwjr_digest of the job if it has one
         """
-        if job['fwjr'] == None:
+        if job.get('fwjr_digest', None) != None:
+            stepPackages = job['fwjr_digest'].get('dashboard', [])
+        elif job.get('fwjr', None) != None:
+            stepPackages = self.stepPackages(job['fwjr'])
+        else:
             return
 
-        steps = job['fwjr'].listSteps()
-        for stepName in steps:
-            step = job['fwjr'].retrieveStep(stepName)
-            if not hasattr(step, 'counter'):
-                continue
-
-            counter = step.counter
-
-            package = {}
-
-            package.update(self.getPerformanceInformation(step))
-            package.update(self.getEventInformation(stepName, job['fwjr']))
-
-            trimmedPackage = {}
-            for key in package:
-                if package[key] != None:
-                    trimmedPackage['%d_%s' % (counter, key)] = package[key]
-            package = trimmedPackage
-
-            if not package:
-                continue
-
+        for stepPackage in stepPackages:
+            package = dict(stepPackage)
             package['jobId']    = '%s_%i' % (job['name'], job['retry_count'])
             package['taskId']   = self.taskPrefix + job['workflow']
-            package['%d_stepName' % counter] = stepName
-
 
             logging.debug("Sending step info: %s" % str(package))
             result = apmonSend(taskid = package['taskId'],
@@ -216,7 +199,43 @@ class DashboardReporter(WMObject):
 
         return
 
-    def getEventInformation(self, stepName, fwjr):
+    @staticmethod
+    def stepPackages(fwjr):
+        """
+        _stepPackages_
+
+        Build the post-processing step information of a report, without the
+        job information, for the steps that have a counter
+        """
+        stepPackages = []
+        for stepName in fwjr.listSteps():
+            step = fwjr.retrieveStep(stepName)
+            if not hasattr(step, 'counter'):
+                continue
+
+            counter = step.counter
+
+            package = {}
+
+            package.update(DashboardReporter.getPerformanceInformation(step))
+            package.update(DashboardReporter.getEventInformation(stepName, fwjr))
+
+            trimmedPackage = {}
+            for key in package:
+                if package[key] != None:
+                    trimmedPackage['%d_%s' % (counter, key)] = package[key]
+            package = trimmedPackage
+
+            if not package:
+                continue
+
+            package['%d_stepName' % counter] = stepName
+            stepPackages.append(package)
+
+        return stepPackages
+
+    @staticmethod
+    def getEventInformation(stepName, fwjr):
         """
         _getEventInformation_
 
@@ -266,7 +285,8 @@ class DashboardReporter(WMObject):
 
         return package
 
-    def getPerformanceInformation(self, step):
+    @staticmethod
+    def getPerformanceInformation(step):
         """
         _getPerformanceInformation_
 
@@ -7,6 +7,11 @@ A set of classes to handle making http and https requests to a remote server and
 deserialising the response.
 
 The response from the remote server is cached if expires/etags are set.
+
+By default the httplib2 connections are taken from a ConnectionPool shared by
+all the Requests of the process, keyed by endpoint and credentials, so the
+Services talking to the same host reuse their keep-alive sockets.  Set
+connection_pool to False in the request dict to keep a private connection.
 """
 
 import urllib
@@ -21,6 +26,9 @@ import tempfile
 import shutil
 import stat
 import sys
+import time
+import threading
+import Queue
 
 try:
     import cStringIO as StringIO
@@ -47,6 +55,126 @@ def check_server_url(srvurl):
         raise ValueError(msg)
 
 
+class ConnectionPool(object):
+    """
+    _ConnectionPool_
+
+    Thread safe pool of keep-alive httplib2.Http objects.  A connection is
+    used by a single thread at a time, there are at most maxSize of them per
+    key and the ones not used for idleTimeout seconds are closed.
+    """
+    def __init__(self, maxSize = 10, idleTimeout = 300):
+        self.maxSize = maxSize
+        self.idleTimeout = idleTimeout
+        self.lock = threading.Condition()
+        self.idle = {}
+        self.busy = {}
+        self.stats = {"created": 0, "reused": 0, "evicted": 0, "discarded": 0}
+
+    def acquire(self, key, factory):
+        """
+        _acquire_
+
+        Return an idle connection for key, create one with factory if there
+        are less than maxSize of them or wait until one is released.
+        """
+        self.lock.acquire()
+        try:
+            self.evict()
+            while True:
+                if self.idle.get(key):
+                    self.busy[key] = self.busy.get(key, 0) + 1
+                    self.stats["reused"] += 1
+                    return self.idle[key].pop()[1]
+                if self.busy.get(key, 0) < self.maxSize:
+                    self.busy[key] = self.busy.get(key, 0) + 1
+                    self.stats["created"] += 1
+                    break
+                self.lock.wait()
+        finally:
+            self.lock.release()
+
+        try:
+            return factory()
+        except:
+            self.release(key, None)
+            raise
+
+    def release(self, key, conn, discard = False):
+        """
+        _release_
+
+        Give a connection back to the pool, close it instead if discard is
+        set, e.g. after a socket error.
+        """
+        self.lock.acquire()
+        try:
+            self.busy[key] -= 1
+            if conn != None:
+                if discard:
+                    self.stats["discarded"] += 1
+                    closeConnection(conn)
+                else:
+                    self.idle.setdefault(key, []).append((time.time(), conn))
+            self.lock.notify()
+        finally:
+            self.lock.release()
+        return
+
+    def evict(self, idleTimeout = None):
+        """
+        _evict_
+
+        Close the connections idle for more than idleTimeout seconds, must be
+        called with the lock held.
+        """
+        if idleTimeout == None:
+            idleTimeout = self.idleTimeout
+        oldest = time.time() - idleTimeout
+        for key in self.idle.keys():
+            conns = self.idle[key]
+            # connections are appended as they are released, oldest first
+            while conns and conns[0][0] <= oldest:
+                closeConnection(conns.pop(0)[1])
+                self.stats["evicted"] += 1
+            if not conns:
+                del self.idle[key]
+        return
+
+    def clear(self):
+        """
+        _clear_
+
+        Close all the idle connections.
+        """
+        self.lock.acquire()
+        try:
+            self.evict(idleTimeout = -1)
+        finally:
+            self.lock.release()
+        return
+
+def closeConnection(conn):
+    """
+    _closeConnection_
+
+    Close the sockets of an httplib2.Http object.
+    """
+    for httpConn in conn.connections.values():
+        httpConn.close()
+    conn.connections = {}
+    return
+
+_connectionPool = ConnectionPool()
+
+def getConnectionPool():
+    """
+    _getConnectionPool_
+
+    Return the connection pool shared by all the Requests.
+    """
+    return _connectionPool
+
 class Requests(dict):
     """
     Generic class for sending different types of HTTP Request to a given URL
@@ -94,10 +222,14 @@ class Requests(dict):
             self["req_cache_path"] = os.path.join(cache_dir, '.cache')
         self.setdefault("timeout", 30)
         self.setdefault("logger", logging)
+        self.setdefault("connection_pool", True)
 
         check_server_url(self['host'])
-        # and then get the URL opener
-        self.setdefault("conn", self._getURLOpener())
+        self.poolKey = None
+        self.requestCache = None
+        if not self['connection_pool']:
+            # and then get the URL opener
+            self.setdefault("conn", self._getURLOpener())
 
 
     def get(self, uri=None, data={}, incoming_headers={},
@@ -237,6 +369,90 @@ class Requests(dict):
             "Data in makeRequest is %s and not encoded to a string" \
                 % type(encoded_data)
 
+        if self['connection_pool']:
+            response, result = self.pooledRequest(uri, verb, encoded_data, headers)
+        else:
+            response, result = self.connRequest(uri, verb, encoded_data, headers)
+
+        if response.status >= 400:
+            e = HTTPException()
+            setattr(e, 'req_data', encoded_data)
+            setattr(e, 'req_headers', headers)
+            setattr(e, 'url', uri)
+            setattr(e, 'result', result)
+            setattr(e, 'status', response.status)
+            setattr(e, 'reason', response.reason)
+            setattr(e, 'headers', response)
+            raise e
+
+        if type(decoder) == type(self.makeRequest) or type(decoder) == type(f):
+            result = decoder(result)
+        elif decoder != False:
+            result = self.decode(result)
+        #TODO: maybe just return result and response...
+        return result, response.status, response.reason, response.fromcache
+
+    def pooledRequest(self, uri, verb, encoded_data, headers):
+        """
+        _pooledRequest_
+
+        Send the request with a connection from the shared pool.  A stale
+        socket is closed and the request retried once on a new connection.
+        """
+        pool = getConnectionPool()
+        key = self.getPoolKey()
+        for attempt in range(2):
+            conn = pool.acquire(key, self._getURLOpener)
+            # the connection may have been opened by another Requests object
+            conn.cache = self.requestCache
+            try:
+                response, result = conn.request(uri, method = verb,
+                                                body = encoded_data,
+                                                headers = headers)
+                if response.status == 408: # timeout can indicate a socket error
+                    response, result = conn.request(uri, method = verb,
+                                                    body = encoded_data,
+                                                    headers = headers)
+            except (socket.error, AttributeError, HTTPException):
+                pool.release(key, conn, discard = True)
+                if attempt > 0:
+                    raise socket.error, 'Error contacting: %s' \
+                            % self.getDomainName()
+                self['logger'].debug("Retrying %s %s on a new connection" % (verb, uri))
+                continue
+            except:
+                pool.release(key, conn, discard = True)
+                raise
+            pool.release(key, conn)
+            return response, result
+
+    def getPoolKey(self):
+        """
+        _getPoolKey_
+
+        Connections are shared by the Requests with the same endpoint,
+        credentials and timeout.
+        """
+        if self.poolKey == None:
+            components = self['endpoint_components']
+            key, cert = None, None
+            if components.scheme == 'https':
+                try:
+                    key, cert = self.getKeyCert()
+                except Exception:
+                    pass
+            self.poolKey = (components.scheme, components.netloc, key, cert,
+                            self['timeout'])
+            if self['req_cache_path']:
+                self.requestCache = httplib2.FileCache(self['req_cache_path'])
+        return self.poolKey
+
+    def connRequest(self, uri, verb, encoded_data, headers):
+        """
+        _connRequest_
+
+        Send the request with the private connection of this object.
+        """
         # httplib2 will allow sockets to close on remote end without retrying
         # try to send request - if this fails try again - should then succeed
         try:
@@ -261,23 +477,46 @@ class Requests(dict):
                 self['conn'].connections = {}
                 raise socket.error, 'Error contacting: %s' \
                         % self.getDomainName()
-        if response.status >= 400:
-            e = HTTPException()
-            setattr(e, 'req_data', encoded_data)
-            setattr(e, 'req_headers', headers)
-            setattr(e, 'url', uri)
-            setattr(e, 'result', result)
-            setattr(e, 'status', response.status)
-            setattr(e, 'reason', response.reason)
-            setattr(e, 'headers', response)
-            raise e
-
-        if type(decoder) == type(self.makeRequest) or type(decoder) == type(f):
-            result = decoder(result)
-        elif decoder != False:
-            result = self.decode(result)
-        #TODO: maybe just return result and response...
-        return result, response.status, response.reason, response.fromcache
+        return response, result
+
+    def makeConcurrentRequests(self, requests, maxThreads = 5):
+        """
+        _makeConcurrentRequests_
+
+        Make several independent requests in parallel.  requests is a list of
+        dicts of makeRequest arguments, the list of their results is returned
+        in the same order, with the exception instead of the result for the
+        requests that failed.  Only requests made through the connection pool
+        can run concurrently, the others are made one after the other.
+        """
+        results = [None] * len(requests)
+        if self.pycurl or not self['connection_pool']:
+            maxThreads = 1
+
+        pending = Queue.Queue()
+        for index in range(len(requests)):
+            pending.put(index)
+
+        def worker():
+            """Make the pending requests"""
+            while True:
+                try:
+                    index = pending.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    results[index] = self.makeRequest(**requests[index])
+                except Exception, ex:
+                    results[index] = ex
+
+        threads = []
+        for i in range(min(maxThreads, len(requests))):
+            thread = threading.Thread(target = worker)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return results
 
     def encode(self, data):
         """
@@ -39,6 +39,12 @@ The Service class provides two layers of caching:
     service fails to respond the second layer cache will be used until the cache
     dies.
 
+Services configured with a memorycacheduration (in hours) also keep the data
+returned by refreshCache in a memory cache shared by all the Services of the
+process, in front of the cache files.  It is bounded in size, least recently
+used data is dropped first, and concurrent refreshes of the same data are
+made only once.  Its counters are returned by memoryCacheStats().
+
 In tabular form:
 
 httplib2 cache  |   yes    |   yes    |    no    |     no     |
@@ -90,10 +96,13 @@ from httplib2 import HttpLib2Error
 
 from urlparse import urlparse
 
+from WMCore.Cache.MemoryCache import MemoryCache
 from WMCore.Services.Requests import Requests
 from WMCore.WMException import WMException
 from WMCore.Wrappers import JsonWrapper as json
 
+memoryCache = MemoryCache(maxSize = 1000)
+
 
 class Service(dict):
 
@@ -119,6 +128,7 @@ class Service(dict):
         self.setdefault("inputdata", {})
         self.setdefault("cacheduration", 0.5)
         self.setdefault("maxcachereuse", 24.0)
+        self.setdefault("memorycacheduration", 0)
         self.supportVerbList = ('GET', 'POST', 'PUT', 'DELETE')
         # this value should be only set when whole service class uses
         # the same verb ('GET', 'POST', 'PUT', 'DELETE')
@@ -194,16 +204,53 @@ class Service(dict):
 
         return cachefile
 
+    def memoryCacheKey(self, cachefile, verb, inputdata):
+        """
+        The memory cache is keyed like the cache files, on the call and its
+        input data, plus the endpoint as it is shared by all the services.
+        """
+        return (self['endpoint'], verb, cachefile,
+                json.dumps(inputdata or self['inputdata']))
+
+    def memoryCacheStats(self):
+        """
+        Hit, miss and fetch time counters of the memory cache.
+        """
+        return memoryCache.getStats()
+
     def refreshCache(self, cachefile, url='', inputdata = {}, openfile=True,
                      encoder = True, decoder = True, verb = 'GET', contentType = None):
         """
         See if the cache has expired. If it has make a new request to the
         service for the input data. Return the cachefile as an open file object.
         If cachefile is None returns StringIO.
+
+        With a memorycacheduration the data is served from memory while it
+        is younger than that and a StringIO is returned.
         """
         verb = self._verbCheck(verb)
 
-        t = datetime.datetime.now() - datetime.timedelta(hours = self['cacheduration'])
+        if self['memorycacheduration'] and cachefile and openfile:
+            def fetch():
+                f = self.refreshFileCache(cachefile, url, inputdata, encoder,
+                                          decoder, verb, contentType)
+                data = f.read()
+                f.close()
+                return data
+
+            data = memoryCache.get(self.memoryCacheKey(cachefile, verb, inputdata),
+                                   fetch, self['memorycacheduration'] * 3600)
+            return StringIO(data)
+
+        return self.refreshFileCache(cachefile, url, inputdata, encoder, decoder,
+                                     verb, contentType, openfile)
+
+    def refreshFileCache(self, cachefile, url='', inputdata = {}, encoder = True,
+                         decoder = True, verb = 'GET', contentType = None,
+                         openfile = True):
+        """
+        The cache file part of refreshCache.
+        """
         cachefile = self.cacheFileName(cachefile, verb, inputdata)
 
         if cache_expired(cachefile):
@@ -224,11 +271,22 @@ class Service(dict):
         """
         verb = self._verbCheck(verb)
 
+        memoryKey = None
+        if self['memorycacheduration'] and cachefile:
+            memoryKey = self.memoryCacheKey(cachefile, verb, inputdata)
         cachefile = self.cacheFileName(cachefile, verb, inputdata)
 
         self['logger'].debug("Forcing cache refresh of %s" % cachefile)
         self.getData(cachefile, url, inputdata, {'cache-control':'no-cache'},
                      encoder, decoder, verb, contentType, force_refresh = True)
+        if memoryKey:
+            if isfile(cachefile):
+                data = cachefile.getvalue()
+            else:
+                f = open(cachefile, 'r')
+                data = f.read()
+                f.close()
+            memoryCache.set(memoryKey, data, self['memorycacheduration'] * 3600)
         if openfile and not isfile(cachefile):
             return open(cachefile, 'r')
         else:
@@ -236,13 +294,16 @@ class Service(dict):
 
     def clearCache(self, cachefile, inputdata = {}, verb = 'GET'):
         """
-        Delete the cache file and the httplib2 cache.
+        Delete the cache file, the httplib2 cache and the data in memory.
         """
+        verb = self._verbCheck(verb)
+        if self['memorycacheduration'] and cachefile:
+            memoryCache.invalidate(self.memoryCacheKey(cachefile, verb, inputdata))
+
         if not self['cachepath'] or not cachefile:
             # nothing to clear
             return
 
-        verb = self._verbCheck(verb)
         os.system("/bin/rm -f %s/*" % self['requests']['req_cache_path'])
         cachefile = self.cacheFileName(cachefile, verb, inputdata)
         try:
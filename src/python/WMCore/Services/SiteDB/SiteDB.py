@@ -26,8 +26,15 @@ class SiteDBJSON(Service):
     API for dealing with retrieving information from SiteDB
     """
 
-    def __init__(self, dict={}):
+    def __init__(self, dict=None):
+        # don't modify the caller's (or a shared default) dictionary
+        if dict == None:
+            dict = {}
+        else:
+            dict = dict.copy()
         dict['endpoint'] = "https://cmsweb.cern.ch/sitedb/json/index/"
+        # name mappings hardly ever change, keep them in memory
+        dict.setdefault('memorycacheduration', 0.5)
         self.parser = JSONParser()
 
         Service.__init__(self, dict)
@@ -219,7 +219,7 @@ class File(WMBSBase, WMFile):
         runs = action.execute(self["lfn"], conn = self.getDBConn(),
                               transaction = self.existingTransaction())
 
-        [self.addRun(run = Run(r, *runs[r])) for r in runs.keys()]
+        self.addRuns([Run(r, *runs[r]) for r in runs.keys()])
 
         action = self.daofactory(classname = "Files.GetLocation")
         self["locations"] = action.execute(self["lfn"], conn = self.getDBConn(),
@@ -363,7 +363,7 @@ class File(WMBSBase, WMFile):
                               transaction = self.existingTransaction())
 
         self["runs"].clear()
-        [self.addRun(run=Run(r, *runs[r])) for r in runs.keys()]
+        self.addRuns([Run(r, *runs[r]) for r in runs.keys()])
 
         self.commitTransaction(existingTransaction)
         return
@@ -503,8 +503,7 @@ class File(WMBSBase, WMFile):
                       events = self['events'], checksums = self['checksums'],
                       parents = parents, merged = self['merged'])
 
-        for run in self['runs']:
-            file.addRun(run)
+        file.addRuns(self['runs'])
 
         for location in self['locations']:
             file.setLocation(se = location)
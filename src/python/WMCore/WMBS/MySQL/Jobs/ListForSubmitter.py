@@ -30,7 +30,16 @@ class ListForSubmitter(DBFormatter):
                  wmbs_subscription.workflow = wmbs_workflow.id
              WHERE wmbs_job_state.name = 'created'"""
 
-    def execute(self, conn = None, transaction = False):
+    def execute(self, conn = None, transaction = False, stream = False):
+        """
+        _execute_
+
+        With stream a generator of job dictionaries is returned, the rows are
+        read from the database while it is consumed.
+        """
+        if stream:
+            return self.formatDictIter(self.stream(conn = conn))
+
         result = self.dbi.processData(self.sql, conn = conn,
                                       transaction = transaction)
         return self.formatDict(result)
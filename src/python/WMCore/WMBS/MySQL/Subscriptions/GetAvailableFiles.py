@@ -27,21 +27,16 @@ class GetAvailableFiles(DBFormatter):
         method turns everything into strings.  Also, fixup the results of the
         Oracle query by renaming 'fileid' to file.
         """
-        formattedResults = DBFormatter.formatDict(self, results)
-
-        for formattedResult in formattedResults:
-            if "file" in formattedResult.keys():
-                formattedResult["file"] = int(formattedResult["file"])
+        tempResults = {}
+        for formattedResult in DBFormatter.formatDictIter(self, results):
+            if "file" in formattedResult:
+                fileID = int(formattedResult["file"])
             else:
-                formattedResult["file"] = int(formattedResult["fileid"])
+                fileID = int(formattedResult["fileid"])
 
-        #Now the tricky part
-        tempResults = {}
-        for formattedResult in formattedResults:
-            fileID = formattedResult['file']
-            if fileID not in tempResults.keys():
+            if fileID not in tempResults:
                 tempResults[fileID] = []
-            if "se_name" in formattedResult.keys():
+            if "se_name" in formattedResult:
                 if not formattedResult['se_name'] in tempResults[fileID]:
                     tempResults[fileID].append(formattedResult["se_name"])
 
@@ -54,7 +49,11 @@ class GetAvailableFiles(DBFormatter):
 
         return finalResults
 
-    def execute(self, subscription, conn = None, transaction = False, returnCursor = False):
+    def execute(self, subscription, conn = None, transaction = False, returnCursor = False,
+                stream = False):
+        if stream:
+            return self.formatDict(self.stream({"subscription": subscription},
+                                               conn = conn))
         if returnCursor:
             return self.dbi.processData(self.sql, {"subscription": subscription},
                                         conn = conn, transaction = transaction,
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""
+_ListIncompleteMarks_
+
+MySQL implementation of Subscription.ListIncompleteMarks
+
+List the subscriptions that have available files with a mark of their
+available files: the number of files, the highest file id and whether the
+fileset is still open.  The mark changes whenever files are added to or
+acquired from a subscription or its fileset is closed.
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class ListIncompleteMarks(DBFormatter):
+    sql = """SELECT wmbs_sub_files_available.subscription AS id,
+                    COUNT(wmbs_sub_files_available.fileid) AS nfiles,
+                    MAX(wmbs_sub_files_available.fileid) AS maxfile,
+                    wmbs_fileset.open AS fileset_open
+             FROM wmbs_sub_files_available
+               INNER JOIN wmbs_subscription ON
+                 wmbs_subscription.id = wmbs_sub_files_available.subscription
+               INNER JOIN wmbs_fileset ON
+                 wmbs_fileset.id = wmbs_subscription.fileset
+             GROUP BY wmbs_sub_files_available.subscription, wmbs_fileset.open"""
+
+    def format(self, result):
+        results = DBFormatter.format(self, result)
+
+        marks = {}
+        for row in results:
+            marks[row[0]] = (int(row[1]), int(row[2]), int(row[3]))
+
+        return marks
+
+    def execute(self, conn = None, transaction = False):
+        result = self.dbi.processData(self.sql, conn = conn,
+                                      transaction = transaction)
+        return self.format(result)
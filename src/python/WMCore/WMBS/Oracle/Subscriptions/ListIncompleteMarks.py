@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+"""
+_ListIncompleteMarks_
+
+Oracle implementation of Subscription.ListIncompleteMarks
+"""
+
+from WMCore.WMBS.MySQL.Subscriptions.ListIncompleteMarks import ListIncompleteMarks as ListIncompleteMarksMySQL
+
+class ListIncompleteMarks(ListIncompleteMarksMySQL):
+    pass
@@ -187,6 +187,12 @@ class Subscription(WMBSBase, WMSubscription):
             action = self.daofactory(classname = "Subscriptions.Get%sFilesByLimit" % status)
             fileList = action.execute(self["id"], limit, conn = self.getDBConn(),
                                       transaction = self.existingTransaction())
+        elif status == "Available":
+            # Stream the rows, there can be a lot of available files
+            action = self.daofactory(classname = "Subscriptions.GetAvailableFiles")
+            fileList = action.execute(self["id"], conn = self.getDBConn(),
+                                      transaction = self.existingTransaction(),
+                                      stream = True)
         else:
             action = self.daofactory(classname = "Subscriptions.Get%sFiles" % status)
             fileList = action.execute(self["id"], conn = self.getDBConn(),
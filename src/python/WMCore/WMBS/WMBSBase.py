@@ -21,6 +21,8 @@ class WMBSBase(WMConnectionBase):
         Initialize all the database connection attributes and the logging
         attritbutes.  Create a DAO factory for WMCore.WMBS as well. Finally,
         check to see if a transaction object has been created.  If none exists,
-        create one but leave the transaction closed.
+        create one but leave the transaction closed.  The WMBS DAOs don't
+        keep state between calls so they are shared.
         """
-        WMConnectionBase.__init__(self, daoPackage = "WMCore.WMBS")
+        WMConnectionBase.__init__(self, daoPackage = "WMCore.WMBS",
+                                  cacheDAOs = True)
@@ -23,7 +23,7 @@ class WMConnectionBase:
     """
     Generic db connection and transaction methods used by all of the WMCore classes.
     """
-    def __init__(self, daoPackage, logger = None, dbi = None):
+    def __init__(self, daoPackage, logger = None, dbi = None, cacheDAOs = False):
         """
         ___init___
 
@@ -31,6 +31,10 @@ class WMConnectionBase:
         attritbutes.  Create a DAO factory for given daoPackage as well. Finally,
         check to see if a transaction object has been created.  If none exists,
         create one but leave the transaction closed.
+
+        With cacheDAOs the factory shares its DAO objects with the other
+        caching factories of the thread, only the packages whose DAOs don't
+        keep any state between calls should turn it on.
         """
         myThread = threading.currentThread()
         if logger:
@@ -44,7 +48,8 @@ class WMConnectionBase:
 
         self.daofactory = DAOFactory(package = daoPackage,
                                      logger = self.logger,
-                                     dbinterface = self.dbi)
+                                     dbinterface = self.dbi,
+                                     cacheInstances = cacheDAOs)
 
         if "transaction" not in dir(myThread):
             myThread.transaction = Transaction(self.dbi)
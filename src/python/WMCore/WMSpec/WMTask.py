@@ -22,6 +22,7 @@ from WMCore.WMSpec.Steps.BuildMaster import BuildMaster
 from WMCore.WMSpec.Steps.ExecuteMaster import ExecuteMaster
 import WMCore.WMSpec.Utilities as SpecUtils
 from WMCore.DataStructs.Workflow import Workflow as DataStructsWorkflow
+from WMCore.DataStructs.LumiMask import LumiMask
 
 def getTaskFromStep(stepRef):
     """
@@ -62,7 +63,7 @@ def buildLumiMask(runs, lumis):
             
             
     lumiLists = [map(list, zip([int(y) for y in x.split(',')][::2], [int(y) for y in x.split(',')][1::2])) for x in lumis]
-    lumiMask = dict(zip(runs, lumiLists))
+    lumiMask = LumiMask(dict(zip(runs, lumiLists)))
     return lumiMask
 
 
@@ -1188,7 +1189,7 @@ class WMTaskHelper(TreeHelper):
         if runs and lumis:
             return buildLumiMask(runs, lumis)
 
-        return {}
+        return LumiMask()
 
     def setInputLocationFlag(self, flag = True):
         """
@@ -0,0 +1,164 @@
+"""
+AvailableWorkIndex
+
+In memory index of the Available WorkQueue elements by site and priority,
+used to find the work that fills free job slots without going through all
+the elements.
+"""
+
+import bisect
+import heapq
+import random
+
+ELEMENT_KEY = 'WMCore.WorkQueue.DataStructs.WorkQueueElement.WorkQueueElement'
+
+def elementPriority(doc):
+    """Priority the availableByPriority view sorts elements by:
+    1 hour queue time == +1 priority boost"""
+    return doc[ELEMENT_KEY]['Priority'] - (doc.get('timestamp', 0) * (1. / 60 / 60))
+
+def elementSites(ele):
+    """Sites an element may run at from its input data, parent data and
+    whitelist, None if any site not blacklisted will do"""
+    sites = None
+    restrictions = list(ele.get('Inputs', {}).values())
+    if ele.get('ParentFlag') and ele.get('ParentData'):
+        restrictions.extend(ele['ParentData'].values())
+    if ele.get('SiteWhitelist'):
+        restrictions.append(ele['SiteWhitelist'])
+    for locations in restrictions:
+        if sites is None:
+            sites = set(locations)
+        else:
+            sites.intersection_update(locations)
+    return sites
+
+class AvailableWorkIndex(object):
+    """
+    Index of Available element documents
+
+    Elements that may only run at some sites are listed under each of them,
+    the others in a list of elements for any site, all lists sorted by
+    decreasing priority.  Documents of elements that are no longer Available
+    are dropped when updated.
+    """
+    def __init__(self):
+        self.docs = {}
+        self.keys = {}
+        self.bySite = {}
+        self.anySite = []
+        self.lastSeq = None
+
+    def __len__(self):
+        return len(self.docs)
+
+    def update(self, doc):
+        """Add or replace an element document"""
+        self.remove(doc['_id'])
+        ele = doc.get(ELEMENT_KEY)
+        if not ele or ele.get('Status') != 'Available':
+            return
+        key = (-elementPriority(doc), doc['_id'])
+        sites = elementSites(ele)
+        self.docs[doc['_id']] = doc
+        self.keys[doc['_id']] = (key, sites)
+        if sites is None:
+            self._insert(self.anySite, key)
+        else:
+            for site in sites:
+                self._insert(self.bySite.setdefault(site, []), key)
+
+    def remove(self, elementId):
+        """Drop an element, if indexed"""
+        if elementId not in self.docs:
+            return
+        del self.docs[elementId]
+        key, sites = self.keys.pop(elementId)
+        if sites is None:
+            self._delete(self.anySite, key)
+        else:
+            for site in sites:
+                self._delete(self.bySite[site], key)
+                if not self.bySite[site]:
+                    del self.bySite[site]
+
+    def clear(self):
+        """Drop all elements"""
+        self.__init__()
+
+    def availableWork(self, conditions, teams = None, wfs = None):
+        """Get the documents of the work that fills the given job slots
+
+        Same selection as the workRestrictions list: go through the elements
+        from the highest priority and give each one to a random site it
+        can run at that still has slots, until no slots are left.
+
+        conditions is a dict of {site : free slots}, it is updated with the
+        slots left.
+        """
+        result = []
+        heap = []
+        for site in conditions:
+            if site in self.bySite:
+                heap.append((self.bySite[site][0], site, 0))
+        if self.anySite:
+            heap.append((self.anySite[0], None, 0))
+        heapq.heapify(heap)
+
+        seen = set()
+        while heap and conditions:
+            key, site, position = heapq.heappop(heap)
+            if site is None:
+                keys = self.anySite
+            elif site in conditions:
+                keys = self.bySite[site]
+            else:
+                # site is full, stop going through its elements
+                continue
+            if position + 1 < len(keys):
+                heapq.heappush(heap, (keys[position + 1], site, position + 1))
+
+            elementId = key[1]
+            if elementId in seen:
+                continue
+            seen.add(elementId)
+
+            doc = self.docs[elementId]
+            ele = doc[ELEMENT_KEY]
+            if teams and ele.get('TeamName') and ele['TeamName'] not in teams:
+                continue
+            if wfs and ele.get('RequestName') not in wfs:
+                continue
+
+            eleSites = self.keys[elementId][1]
+            if eleSites is None:
+                candidates = conditions.keys()
+            elif len(eleSites) < len(conditions):
+                candidates = [x for x in eleSites if x in conditions]
+            else:
+                candidates = [x for x in conditions if x in eleSites]
+            blacklist = ele.get('SiteBlacklist')
+            if blacklist:
+                candidates = [x for x in candidates if x not in blacklist]
+            if not candidates:
+                continue
+
+            result.append(doc)
+            site = random.choice(candidates)
+            slotsLeft = conditions[site] - (ele.get('Jobs') or 0)
+            if slotsLeft > 0:
+                conditions[site] = slotsLeft
+            else:
+                del conditions[site]
+
+        return result, conditions
+
+    def _insert(self, keys, key):
+        """Insert in a sorted list"""
+        bisect.insort(keys, key)
+
+    def _delete(self, keys, key):
+        """Delete from a sorted list"""
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
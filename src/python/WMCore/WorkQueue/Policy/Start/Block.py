@@ -223,8 +223,6 @@ class Block(StartPolicyInterface):
             Return True if the lumi and the run can be found in lumiMask
             E.g.: lumi=3, run=5, lumiMask={'1':[...], '5':[[1,7],...]} => True
         """
-        if str(run) in lumiMask:
-            for section in lumiMask[str(run)]:
-                if int(section[0]) <= int(lumi) <= int(section[1]):
-                    return True
-        return False
+        if not lumiMask:
+            return False
+        return lumiMask.hasLumi(int(run), int(lumi))
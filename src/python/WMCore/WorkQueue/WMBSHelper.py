@@ -32,7 +32,6 @@ from WMCore.JobStateMachine.ChangeState import ChangeState
 
 from WMCore.BossAir.BossAirAPI    import BossAirAPI, BossAirException
 
-from WMCore.JobSplitting.LumiBased import isGoodLumi
 
 def wmbsSubscriptionStatus(logger, dbi, conn, transaction):
     """Function to return status of wmbs subscriptions
@@ -662,6 +661,7 @@ class WMBSHelper(WMConnectionBase):
         """Apply run white/black list and return valid files"""
         runWhiteList = self.topLevelTask.inputRunWhitelist()
         runBlackList = self.topLevelTask.inputRunBlacklist()
+        lumiMask = self.topLevelTask.getLumiMask()
 
         results = []
         for f in files:
@@ -683,7 +683,7 @@ class WMBSHelper(WMConnectionBase):
             for lumi in f['LumiList']:
                 #consider the runs after applying the run white/black lists
                 if lumi['RunNumber'] in runs and \
-                    isGoodLumi(self.topLevelTask.getLumiMask(), lumi['RunNumber'], lumi['LumiSectionNumber']):
+                    lumiMask.hasLumi(lumi['RunNumber'], lumi['LumiSectionNumber']):
                         hasGoodLumi = True
                         break
             #if no good lumi is found continue
@@ -90,11 +90,13 @@ class WorkQueue(WorkQueueBase):
         self.backend = WorkQueueBackend(self.params['CouchUrl'], self.params['DbName'],
                                         self.params['InboxDbName'],
                                         self.params['ParentQueueCouchUrl'], self.params.get('QueueURL'),
-                                        logger = self.logger)
+                                        logger = self.logger,
+                                        useIndex = self.params.get('AvailableWorkIndex', False))
         if self.params.get('ParentQueueCouchUrl'):
             try:
                 self.parent_queue = WorkQueueBackend(self.params['ParentQueueCouchUrl'].rsplit('/', 1)[0],
-                                                     self.params['ParentQueueCouchUrl'].rsplit('/', 1)[1])
+                                                     self.params['ParentQueueCouchUrl'].rsplit('/', 1)[1],
+                                                     useIndex = self.params.get('AvailableWorkIndex', False))
             except IndexError, ex:
                 # Probable cause: Someone didn't put the global WorkQueue name in
                 # the ParentCouchUrl
@@ -131,6 +133,8 @@ class WorkQueue(WorkQueueBase):
             self.params['WMBSUrl'] = Lexicon.sanitizeURL(self.params['WMBSUrl'])['url']
         self.params.setdefault('Teams', [])
         self.params.setdefault('DrainMode', False)
+        # keep available elements in memory to select work
+        self.params.setdefault('AvailableWorkIndex', False)
         if self.params.get('CacheDir'):
             try:
                 os.makedirs(self.params['CacheDir'])
@@ -12,6 +12,7 @@ import urllib
 from WMCore.Database.CMSCouch import CouchServer, CouchNotFoundError, Document
 from WMCore.WorkQueue.WorkQueueExceptions import WorkQueueNoMatchingElements
 from WMCore.WorkQueue.DataStructs.CouchWorkQueueElement import CouchWorkQueueElement, fixElementConflicts
+from WMCore.WorkQueue.DataStructs.AvailableWorkIndex import AvailableWorkIndex
 from WMCore.Wrappers import JsonWrapper as json
 from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 from WMCore.Lexicon import sanitizeURL
@@ -37,7 +38,7 @@ class WorkQueueBackend(object):
     """
     def __init__(self, db_url, db_name = 'workqueue',
                  inbox_name = 'workqueue_inbox', parentQueue = None,
-                 queueUrl = None, logger = None):
+                 queueUrl = None, logger = None, useIndex = False):
         if logger:
             self.logger = logger
         else:
@@ -53,6 +54,10 @@ class WorkQueueBackend(object):
         self.hostWithAuth = db_url
         self.inbox = self.server.connectDatabase(inbox_name, create = False, size = 10000)
         self.queueUrl = sanitizeURL(queueUrl or (db_url + '/' + db_name))['url']
+        # Available elements kept in memory and updated from the changes feed
+        self.index = None
+        if useIndex:
+            self.index = AvailableWorkIndex()
 
     def forceQueueSync(self):
         """Force a blocking replication
@@ -299,6 +304,21 @@ class WorkQueueBackend(object):
                 pass
 
 
+    def updateIndex(self):
+        """Apply the element changes since the last update to the index,
+        the first update reads the whole changes feed"""
+        since = self.index.lastSeq or 0
+        data = self.db.get('/%s/_changes?%s' % (self.db.name,
+                                                urllib.urlencode({'since' : since,
+                                                                  'include_docs' : 'true'})))
+        for change in data.get('results', []):
+            if change.get('deleted') or not change.get('doc'):
+                self.index.remove(change['id'])
+            else:
+                self.index.update(change['doc'])
+        self.index.lastSeq = data['last_seq']
+        return
+
     def availableWork(self, conditions, teams = None, wfs = None):
         """Get work which is available to be run"""
         elements = []
@@ -308,6 +328,18 @@ class WorkQueueBackend(object):
         if not conditions:
             return elements, conditions
 
+        if self.index is not None:
+            try:
+                self.updateIndex()
+            except Exception, ex:
+                self.logger.warning('Failed to update available work index, reloading it next time: %s' % str(ex))
+                self.index.clear()
+            else:
+                result, conditions = self.index.availableWork(conditions, teams, wfs)
+                # elements are changed by the caller, don't touch the index
+                elements = [CouchWorkQueueElement.fromDocument(self.db, dict(x)) for x in result]
+                return elements, conditions
+
         options = {}
         options['include_docs'] = True
         options['descending'] = True
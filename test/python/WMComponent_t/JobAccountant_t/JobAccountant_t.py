@@ -13,6 +13,7 @@ import time
 import copy
 import random
 import tempfile
+import cPickle
 
 import WMCore.WMBase
 from WMCore.FwkJobReport.Report import Report
@@ -32,7 +33,8 @@ from WMCore.DataStructs.Run   import Run
 
 from WMComponent.JobAccountant.JobAccountantPoller import JobAccountantPoller
 from WMComponent.DBSBuffer.Database.Interface.DBSBufferFile import DBSBufferFile
-from WMComponent.JobAccountant.AccountantWorker import AccountantWorker
+from WMComponent.JobAccountant.AccountantWorker import AccountantWorker, digestJobReport
+from WMCore.JobStateMachine.ChangeState import summarizeReport
 from nose.plugins.attrib import attr
 
 class JobAccountantTest(unittest.TestCase):
@@ -1261,6 +1263,78 @@ class JobAccountantTest(unittest.TestCase):
 
         return
 
+    def testLoaderProcesses(self):
+        """
+        _testLoaderProcesses_
+
+        Verify that jobs are accounted the same way when the framework job
+        reports are loaded by loader processes, with several slices of jobs
+        in the pipeline.
+        """
+        self.setupDBForLoadTest(maxJobs = 25)
+
+        config = self.createConfig()
+        config.JobAccountant.loaderProcesses = 2
+        config.JobAccountant.accountantWorkSize = 10
+        accountant = JobAccountantPoller(config)
+        accountant.setup()
+        accountant.algorithm()
+
+        self.assertEqual(len(accountant.pool), 2)
+        self.assertEqual(accountant.pendingJobs, {})
+        self.assertEqual(accountant.loadedRecords, {})
+
+        for (jobID, fwjrPath) in self.jobs:
+            jobReport = Report()
+            jobReport.unpersist(fwjrPath)
+
+            self.verifyFileMetaData(jobID, jobReport.getAllFilesFromStep("cmsRun1"))
+            self.verifyJobSuccess(jobID)
+
+        accountant.terminate(None)
+        self.assertEqual(accountant.pool, [])
+        return
+
+    def testDigestJobReport(self):
+        """
+        _testDigestJobReport_
+
+        Verify that the records sent back by the loader processes are made of
+        plain python types, without the report, and that they carry the
+        couch documents and the output files of the report.
+        """
+        fwjrPath = os.path.join(WMCore.WMBase.getTestBase(),
+                                "WMComponent_t/JobAccountant_t/fwjrs",
+                                "LoadTest00.pkl")
+        record = digestJobReport({"id": 1, "fwjr_path": fwjrPath},
+                                 maxInputFiles = 1000, maxSummaryFiles = 1000,
+                                 maxErrorLength = 10000)
+
+        pickledRecord = cPickle.dumps(record, cPickle.HIGHEST_PROTOCOL)
+        self.assertFalse("WMCore.FwkJobReport" in pickledRecord)
+        self.assertFalse("WMCore.Configuration" in pickledRecord)
+        self.assertFalse("WMCore.DataStructs" in pickledRecord)
+
+        jobReport = Report()
+        jobReport.unpersist(fwjrPath)
+        self.assertTrue(record["jobSuccess"])
+        self.assertEqual(record["task"], jobReport.getTaskName())
+        self.assertEqual(record["fwjr_digest"]["fwjr"], jobReport.__to_json__(None))
+        self.assertEqual(record["fwjr_digest"]["summary"],
+                         summarizeReport(jobReport, 1000, 10000))
+        self.assertEqual(record["fwjr_digest"]["exitcode"], 0)
+
+        reportFiles = jobReport.getAllFiles()
+        self.assertEqual(len(record["files"]), len(reportFiles))
+        for (fileRecord, reportFile) in zip(record["files"], reportFiles):
+            self.assertEqual(fileRecord["lfn"], reportFile["lfn"])
+            self.assertEqual(fileRecord["checksums"], reportFile["checksums"])
+            self.assertEqual(fileRecord["locations"], list(reportFile["locations"]))
+            self.assertEqual(fileRecord["runs"],
+                             [(x.run, x.lumis) for x in reportFile["runs"]])
+
+        return
+
     def setupDBFor4GMerge(self):
         """
         _setupDBFor4GMerge_
@@ -30,6 +30,7 @@ from WMCore.WMBS.Workflow     import Workflow
 from WMCore.WMBS.Subscription import Subscription
 from WMCore.WMBS.JobGroup     import JobGroup
 from WMCore.DataStructs.Run   import Run
+from WMCore.Cache.JobCacheStore import JobCacheReader
 
 from WMCore.Agent.Configuration              import loadConfigurationFile, Configuration
 from WMComponent.JobCreator.JobCreator       import JobCreator
@@ -324,12 +325,10 @@ class JobCreatorTest(unittest.TestCase):
         self.assertTrue('job_1' in listOfDirs)
         self.assertTrue('job_2' in listOfDirs)
         self.assertTrue('job_3' in listOfDirs)
-        jobDir = os.listdir(groupDirectory)[0]
-        jobFile = os.path.join(groupDirectory, jobDir, 'job.pkl')
-        self.assertTrue(os.path.isfile(jobFile))
-        f = open(jobFile, 'r')
-        job = cPickle.load(f)
-        f.close()
+        jobDir = [x for x in os.listdir(groupDirectory) if x.startswith('job_')][0]
+        job = JobCacheReader().loadJob(int(jobDir.split('_')[1]),
+                                       os.path.join(groupDirectory, jobDir))
+        self.assertNotEqual(job, None)
 
         self.assertEqual(job.baggage.PresetSeeder.generator.initialSeed, 1001)
         self.assertEqual(job.baggage.PresetSeeder.evtgenproducer.initialSeed, 1001)
@@ -616,6 +615,61 @@ class JobCreatorTest(unittest.TestCase):
 
         return
 
+    def testF_ChangedSubscriptions(self):
+        """
+        _testF_ChangedSubscriptions_
+
+        Verify that only the subscriptions that changed since they were last
+        split are split again, except in the full polls.
+        """
+        myThread = threading.currentThread()
+
+        config = self.getConfig()
+        config.JobCreator.fullPollInterval = 3600
+
+        name         = makeUUID()
+        nSubs        = 3
+        nFiles       = 10
+        workloadName = 'TestWorkload'
+
+        workload = self.createWorkload(workloadName = workloadName)
+        workloadPath = os.path.join(self.testDir, 'workloadTest', 'TestWorkload', 'WMSandbox', 'WMWorkload.pkl')
+
+        self.createJobCollection(name = name, nSubs = nSubs, nFiles = nFiles, workflowURL = workloadPath)
+
+        testJobCreator = JobCreatorPoller(config = config)
+        subscriptions, marks = testJobCreator.listChangedSubscriptions()
+        self.assertEqual(len(subscriptions), nSubs)
+
+        # Pretend the first subscription was split without acquiring anything
+        testJobCreator.splitMarks[subscriptions[0]] = marks[subscriptions[0]]
+        self.assertEqual(testJobCreator.listChangedSubscriptions()[0], subscriptions[1:])
+
+        # Everything is split in a full poll
+        testJobCreator.lastFullPoll = 0
+        self.assertEqual(testJobCreator.listChangedSubscriptions()[0], subscriptions)
+
+        testJobCreator.algorithm()
+
+        getJobsAction = self.daoFactory(classname = "Jobs.GetAllJobs")
+        result = getJobsAction.execute(state = 'Created', jobType = "Processing")
+        self.assertEqual(len(result), (nSubs - 1) * nFiles)
+
+        # A new file makes the subscription change
+        testFileset = Fileset(name = '%s-0' % name)
+        testFileset.loadData()
+        testFile = File(lfn = "/lfn/%s-0/new" % name, size = 1024, events = 10)
+        testFile.setLocation(self.sites[0])
+        testFile.create()
+        testFileset.addFile(testFile)
+        testFileset.commit()
+
+        self.assertEqual(testJobCreator.listChangedSubscriptions()[0], [subscriptions[0]])
+        testJobCreator.algorithm()
+        result = getJobsAction.execute(state = 'Created', jobType = "Processing")
+        self.assertEqual(len(result), nSubs * nFiles + 1)
+        return
+
 
 if __name__ == "__main__":
 
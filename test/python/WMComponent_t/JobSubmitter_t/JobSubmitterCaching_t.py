@@ -171,29 +171,29 @@ class JobSubmitterCachingTest(unittest.TestCase):
         mySubmitterPoller = JobSubmitterPoller(config)
         mySubmitterPoller.refreshCache()
 
-        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 0,
+        self.assertEqual(len(mySubmitterPoller.submitQueue), 0,
                          "Error: The job cache should be empty.")
 
         self.injectJobs()
         mySubmitterPoller.refreshCache()
 
         # Verify the cache is full
-        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 20,
-                         "Error: The job cache should contain 20 jobs.  Contains: %i" % len(mySubmitterPoller.cachedJobIDs))
+        self.assertEqual(len(mySubmitterPoller.submitQueue), 20,
+                         "Error: The job cache should contain 20 jobs.  Contains: %i" % len(mySubmitterPoller.submitQueue))
 
         killWorkflow("wf001", jobCouchConfig = config)
         mySubmitterPoller.refreshCache()
 
         # Verify that the workflow is gone from the cache
-        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 10,
-                         "Error: The job cache should contain 10 jobs. Contains: %i" % len(mySubmitterPoller.cachedJobIDs))
+        self.assertEqual(len(mySubmitterPoller.submitQueue), 10,
+                         "Error: The job cache should contain 10 jobs. Contains: %i" % len(mySubmitterPoller.submitQueue))
 
         killWorkflow("wf002", jobCouchConfig = config)
         mySubmitterPoller.refreshCache()
 
         # Verify that the workflow is gone from the cache
-        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 0,
-                         "Error: The job cache should be empty.  Contains: %i" % len(mySubmitterPoller.cachedJobIDs))
+        self.assertEqual(len(mySubmitterPoller.submitQueue), 0,
+                         "Error: The job cache should be empty.  Contains: %i" % len(mySubmitterPoller.submitQueue))
         return
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+_ResourceSnapshot_t_
+
+Unittest for the JobSubmitter ResourceSnapshot
+"""
+
+import unittest
+
+from WMComponent.JobSubmitter.ResourceSnapshot import ResourceSnapshot
+
+class ResourceSnapshotTest(unittest.TestCase):
+    """
+    _ResourceSnapshotTest_
+
+    """
+    def setUp(self):
+        """
+        _setUp_
+
+        Two CMS sites, one of them with two entry points and one draining.
+        """
+        self.rcThresholds = {"T1_US_FNAL": {"cms_name": "T1_US_FNAL", "state": "Normal",
+                                            "se_names": ["se.fnal.gov"]},
+                             "T1_US_FNAL_Disk": {"cms_name": "T1_US_FNAL", "state": "Normal",
+                                                 "se_names": ["se.fnal.gov", "disk.fnal.gov"]},
+                             "T2_CH_CERN": {"cms_name": "T2_CH_CERN", "state": "Draining",
+                                            "se_names": ["se.cern.ch"]}}
+        return
+
+    def testMapping(self):
+        """
+        _testMapping_
+
+        SE and CMS names must resolve to all their sites.
+        """
+        snapshot = ResourceSnapshot(self.rcThresholds)
+        self.assertEqual(snapshot.seNames["se.fnal.gov"],
+                         frozenset(["T1_US_FNAL", "T1_US_FNAL_Disk"]))
+        self.assertEqual(snapshot.resolveSiteList(["T1_US_FNAL", "T3_XX_Unknown"]),
+                         frozenset(["T1_US_FNAL", "T1_US_FNAL_Disk"]))
+        self.assertEqual(snapshot.drainSites, frozenset(["T2_CH_CERN"]))
+        return
+
+    def testPossibleSites(self):
+        """
+        _testPossibleSites_
+
+        Check the white and black lists and the draining sites handling.
+        """
+        snapshot = ResourceSnapshot(self.rcThresholds)
+        allSEs = ["se.fnal.gov", "se.cern.ch", "se.unknown.org"]
+
+        self.assertEqual(snapshot.getPossibleSites(allSEs),
+                         frozenset(["T1_US_FNAL", "T1_US_FNAL_Disk"]))
+        self.assertEqual(snapshot.getPossibleSites(allSEs, ["T2_CH_CERN"]),
+                         frozenset(["T2_CH_CERN"]))
+        self.assertEqual(snapshot.getPossibleSites(allSEs, [], ["T1_US_FNAL"]),
+                         frozenset(["T2_CH_CERN"]))
+        self.assertEqual(snapshot.getPossibleSites(["disk.fnal.gov"], ["T2_CH_CERN"]),
+                         frozenset())
+        self.assertEqual(ResourceSnapshot().getPossibleSites(allSEs), frozenset())
+
+        # Results are memoised
+        self.assertTrue(snapshot.getPossibleSites(allSEs, ["T2_CH_CERN"]) is
+                        snapshot.getPossibleSites(allSEs, ["T2_CH_CERN"]))
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+_SubmitQueue_t_
+
+Unittest for the JobSubmitter SubmitQueue
+"""
+
+import random
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+from WMComponent.JobSubmitter.SubmitQueue import SubmitQueue
+
+class SubmitQueueTest(unittest.TestCase):
+    """
+    _SubmitQueueTest_
+
+    """
+    def testPriority(self):
+        """
+        _testPriority_
+
+        Jobs come out ordered by priority key, only once, and only for the
+        sites and task type they were queued for.
+        """
+        queue = SubmitQueue()
+        queue.add(1, ["T1_A", "T2_B"], "Processing", "wf1", (20, 1), "job1")
+        queue.add(2, ["T1_A"], "Processing", "wf1", (20, 2), "job2")
+        queue.add(3, ["T2_B"], "Processing", "wf2", (10, 3), "job3")
+        queue.add(4, ["T1_A"], "Merge", "wf2", (10, 4), "job4")
+
+        self.assertEqual(len(queue), 4)
+        self.assertEqual(queue.sites(), set(["T1_A", "T2_B"]))
+        self.assertTrue(queue.hasJobs("T1_A", "Merge"))
+        self.assertFalse(queue.hasJobs("T2_B", "Merge"))
+
+        self.assertEqual(queue.pop("T2_B", "Processing"), [(3, "job3")])
+        self.assertEqual(queue.pop("T1_A", "Processing", 5), [(1, "job1"), (2, "job2")])
+        self.assertEqual(queue.pop("T2_B", "Processing"), [])
+        self.assertFalse(queue.hasJobs("T2_B"))
+        self.assertFalse(queue.hasWorkflow("wf1"))
+        self.assertTrue(queue.hasWorkflow("wf2"))
+
+        self.assertEqual(queue.pop("T1_A", "Merge", 2), [(4, "job4")])
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(queue.sites(), set())
+        return
+
+    def testRemove(self):
+        """
+        _testRemove_
+
+        Removed jobs must not come out of any site, also after the heaps
+        have been compacted.
+        """
+        queue = SubmitQueue()
+        for jobID in range(1000):
+            queue.add(jobID, ["T1_A", "T2_B"], "Processing", "wf1", (0, jobID), jobID)
+
+        self.assertEqual(queue.remove(1), 1)
+        self.assertEqual(queue.remove(1), None)
+        self.assertFalse(1 in queue)
+
+        purged = queue.retain(set(range(0, 1000, 10)))
+        self.assertEqual(len(purged), 899)
+        self.assertEqual(len(queue), 100)
+
+        jobs = queue.pop("T2_B", "Processing", 1000)
+        self.assertEqual([x[0] for x in jobs], range(0, 1000, 10))
+        self.assertEqual(queue.pop("T1_A", "Processing", 1000), [])
+
+        queue.add(5, ["T1_A"], "Processing", "wf1", (0, 5), 5)
+        self.assertEqual(queue.pop("T1_A", "Processing", 10), [(5, 5)])
+        return
+
+    @attr('performance')
+    def testPerformance(self):
+        """
+        _testPerformance_
+
+        Fill the queue with 500k jobs over 300 sites, remove a tenth of them
+        and pull jobs out of every site.
+        """
+        nJobs = 500000
+        sites = ["T2_XX_Site%i" % x for x in range(300)]
+        random.seed(1)
+
+        queue = SubmitQueue()
+        startTime = time.time()
+        for jobID in xrange(nJobs):
+            jobSites = random.sample(sites, random.randint(1, 5))
+            queue.add(jobID, jobSites, "Processing", "wf%i" % (jobID % 50),
+                      (jobID % 50, jobID), None)
+        print "Adding %i jobs took %f seconds" % (nJobs, time.time() - startTime)
+
+        startTime = time.time()
+        queue.retain(set(xrange(0, nJobs, 10)).symmetric_difference(xrange(nJobs)))
+        print "Removing %i jobs took %f seconds" % (nJobs / 10, time.time() - startTime)
+
+        startTime = time.time()
+        nPopped = 0
+        for site in sites:
+            nPopped += len(queue.pop(site, "Processing", 500))
+        print "Selecting %i jobs took %f seconds" % (nPopped, time.time() - startTime)
+
+        self.assertEqual(nPopped, 150000)
+        self.assertEqual(len(queue), nJobs - nJobs / 10 - nPopped)
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,7 @@ import unittest
 import time
 from WMQuality.TestInit import TestInit
 from WMCore.Agent.HeartbeatAPI import HeartbeatAPI
+from WMCore.DAOFactory import DAOFactory
 # pylint: disable-msg = W0611
 
 class HeartbeatTest(unittest.TestCase):
@@ -91,6 +92,40 @@ class HeartbeatTest(unittest.TestCase):
         self.assertEqual(result[1]['error_message'], "Error1")
 
 
+    def testUpdateWorkerSQL(self):
+        """
+        _testUpdateWorkerSQL_
+
+        Verify that repeated heartbeats through a caching DAO factory send
+        the same UPDATE statement every time.
+        """
+        testComponent = HeartbeatAPI("testComponent")
+        testComponent.daofactory = DAOFactory(package = "WMCore.Agent.Database",
+                                              logger = testComponent.logger,
+                                              dbinterface = testComponent.dbi,
+                                              cacheInstances = True)
+        testComponent.registerComponent()
+        testComponent.updateWorkerHeartbeat("testWorker")
+
+        updates = []
+        processData = testComponent.dbi.processData
+        def recordUpdate(sql, *args, **kwargs):
+            if sql.strip().startswith("UPDATE wm_workers"):
+                updates.append(sql)
+            return processData(sql, *args, **kwargs)
+
+        testComponent.dbi.processData = recordUpdate
+        try:
+            testComponent.updateWorkerHeartbeat("testWorker", pid = 1234)
+            testComponent.updateWorkerHeartbeat("testWorker", pid = 1234)
+        finally:
+            del testComponent.dbi.processData
+
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(updates[0], updates[1])
+        self.assertEqual(updates[0].count(":state"), 1)
+        self.assertEqual(updates[0].count(":pid"), 1)
+        return
 
 if __name__ == "__main__":
     unittest.main()
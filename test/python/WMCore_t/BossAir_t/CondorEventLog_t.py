@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+_CondorEventLog_t_
+
+Tests for the condor user log reader
+"""
+
+import os
+import unittest
+
+from WMQuality.TestInit import TestInit
+
+from WMCore.BossAir.Plugins.CondorEventLog import CondorEventLog, formatEvent, eventTime
+from WMCore.BossAir.Plugins.CondorEventLog import latestEventLog, parseEvents
+
+class CondorEventLogTest(unittest.TestCase):
+    """
+    _CondorEventLogTest_
+
+    Read user logs as condor writes them
+    """
+
+    def setUp(self):
+        self.testInit = TestInit(__file__)
+        self.testDir  = self.testInit.generateWorkDir()
+        return
+
+    def tearDown(self):
+        self.testInit.delWorkDir()
+        return
+
+    def testA_ParseEvents(self):
+        """
+        _testA_ParseEvents_
+
+        Parse events with escaped notes.
+        """
+        text = formatEvent(0, 12, eventTime = 1000, notes = "a <b> & c")
+        text += formatEvent(1, 12, eventTime = 1100)
+        events = parseEvents(text)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]["MyType"], "SubmitEvent")
+        self.assertEqual(events[0]["LogNotes"], "a <b> & c")
+        self.assertEqual(events[1]["EventTypeNumber"], 1)
+        self.assertEqual(events[1]["Cluster"], 12)
+        self.assertEqual(eventTime(events[1]), 1100)
+        return
+
+    def testB_IncrementalRead(self):
+        """
+        _testB_IncrementalRead_
+
+        Only complete events are returned, each of them once.
+        """
+        logPath  = os.path.join(self.testDir, "condor.12.0.log")
+        eventLog = CondorEventLog(logPath)
+        self.assertEqual(eventLog.readEvents(), [])
+
+        handle = open(logPath, "w")
+        handle.write(formatEvent(0, 12, eventTime = 1000))
+        partial = formatEvent(1, 12, eventTime = 1100)
+        handle.write(partial[:40])
+        handle.flush()
+        self.assertEqual([x["EventTypeNumber"] for x in eventLog.readEvents()], [0])
+        self.assertEqual(eventLog.readEvents(), [])
+
+        handle.write(partial[40:])
+        handle.write(formatEvent(5, 12, eventTime = 1200))
+        handle.close()
+        self.assertEqual([x["EventTypeNumber"] for x in eventLog.readEvents()], [1, 5])
+        self.assertEqual(eventLog.readEvents(), [])
+
+        # The log of a later cluster is the latest one
+        open(os.path.join(self.testDir, "condor.9.0.log"), "w").close()
+        open(os.path.join(self.testDir, "condor.13.0.log"), "w").close()
+        self.assertEqual(latestEventLog(self.testDir),
+                         os.path.join(self.testDir, "condor.13.0.log"))
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ _CondorPlugin_t_
 
 CondorPlugin unittests
 """
+import re
 import time
 import os.path
 import threading
@@ -19,8 +20,46 @@ from WMCore.JobStateMachine.ChangeState          import ChangeState
 from WMComponent.JobSubmitter.JobSubmitterPoller import JobSubmitterPoller
 from WMComponent.JobTracker.JobTrackerPoller     import JobTrackerPoller
 
+from WMCore.BossAir.Plugins.CondorPlugin           import CondorPlugin, parseClassAds, submitEventNotes
+from WMCore.BossAir.Plugins.CondorEventLog         import EventLogReplay
+from WMCore.BossAir.Plugins.VanillaCondorPlugin    import VanillaCondorPlugin
+
 from WMCore_t.BossAir_t.BossAir_t import BossAirTest, getNArcJobs, getCondorRunningJobs
 
+def makeClassAds(jobs, history = False):
+    """
+    _makeClassAds_
+
+    Build the output of the condor_q, or condor_history, query of the
+    CondorPlugin for a dictionary of WMAgent job ids and (JobStatus,
+    EnteredCurrentStatus) tuples.
+    """
+    output = []
+    for jobID, (jobStatus, stateTime) in jobs.items():
+        if not history:
+            output.append("(JobStatus:%i)  (stateTime:%i)  (runningTime:%i)  (submitTime:%i)  " % \
+                          (jobStatus, stateTime, stateTime, stateTime - 100))
+        output.append("(WMAgentID:%i):::" % jobID)
+    return "".join(output)
+
+def expandQueueTable(jdl, nHeader):
+    """
+    Expand the queue ... from table of a compact JDL into one block per job
+    """
+    header = jdl[:nHeader]
+    queue  = [x for x in range(len(jdl)) if jdl[x].startswith("queue ")][0]
+    lines  = jdl[nHeader:queue]
+    names  = [x.strip() for x in jdl[queue][len("queue "):-len(" from (\n")].split(",")]
+    expanded = list(header)
+    for row in jdl[queue + 1:-1]:
+        values = re.split(r"[,\s]+", row.strip(), len(names) - 1)
+        for line in lines:
+            for name, value in zip(names, values):
+                line = line.replace("$(%s)" % name, value)
+            expanded.append(line)
+        expanded.append("Queue 1\n")
+    return expanded
+
 class CondorPluginTest(BossAirTest):
     """
     _CondorPluginTest_
@@ -407,6 +446,282 @@ class CondorPluginTest(BossAirTest):
 
         return
 
+    def testG_ParseClassAds(self):
+        """
+        _testG_ParseClassAds_
+
+        Verify the parsing of the condor_q output, including empty output,
+        ads without a job id and undefined attributes.
+        """
+        self.assertEqual(parseClassAds(""), {})
+
+        output  = "(JobStatus:2)  (stateTime:1000)  (runningTime:1000)  (submitTime:900)  (WMAgentID:1):::"
+        output += "(JobStatus:1)  (stateTime:1001):::"
+        output += "(JobStatus:1)  (stateTime:1002)  (submitTime:1002)  (WMAgentID:3):::"
+        jobInfo = parseClassAds(output)
+
+        self.assertEqual(sorted(jobInfo.keys()), [1, 3])
+        self.assertEqual(jobInfo[1], {"JobStatus": "2", "stateTime": "1000", "runningTime": "1000",
+                                      "submitTime": "900", "WMAgentID": "1"})
+        self.assertFalse("runningTime" in jobInfo[3])
+        return
+
+    def testH_DeltaTracking(self):
+        """
+        _testH_DeltaTracking_
+
+        Replay condor queries to the CondorPlugin in delta tracking mode and
+        verify that the classAds are kept up to date.
+        """
+        config = self.getConfig()
+        config.BossAir.condorDeltaTracking = True
+        plugin = CondorPlugin(config)
+
+        replies  = []
+        commands = []
+        def replay(command):
+            commands.append(command)
+            return replies.pop(0)
+        plugin.runQuery = replay
+
+        jobs = []
+        for jobID in range(1, 6):
+            jobs.append({"jobid": jobID, "status": "New", "status_time": 0})
+
+        replies.append(makeClassAds(dict([(x, (1, 1000)) for x in range(1, 6)])))
+        running, changes, completes = plugin.track(jobs)
+        self.assertEqual(len(running), 5)
+        self.assertEqual(len(changes), 5)
+        self.assertEqual(len(commands[-1]), 20)
+
+        # Job 1 started running, job 2 left the queue
+        replies.append(makeClassAds({2: (4, 1100)}, history = True))
+        replies.append(makeClassAds({1: (2, 1100)}))
+        running, changes, completes = plugin.track(jobs)
+        self.assertEqual(commands[-2][0], "condor_history")
+        self.assertTrue(commands[-1][6].startswith("EnteredCurrentStatus >= "))
+        self.assertEqual([x["jobid"] for x in changes], [1])
+        self.assertEqual(changes[0]["status"], "Running")
+        self.assertEqual(changes[0]["status_time"], 1100)
+        self.assertEqual([x["jobid"] for x in completes], [2])
+        self.assertEqual(sorted(plugin.classAds.keys()), [1, 3, 4, 5])
+
+        # A failed query means a full refresh on the next cycle
+        replies.append(None)
+        replies.append(None)
+        self.assertEqual(plugin.getClassAds(), None)
+        replies.append(makeClassAds({3: (1, 1000)}))
+        self.assertEqual(plugin.getClassAds().keys(), [3])
+        self.assertEqual(len(commands[-1]), 20)
+        return
+
+    @attr('performance')
+    def testI_TrackReplay(self):
+        """
+        _testI_TrackReplay_
+
+        Time the tracking of 200k jobs replaying condor_q output, for a full
+        query and for a delta query where 1% of the jobs changed.
+        """
+        nJobs = 200000
+
+        config = self.getConfig()
+        config.BossAir.condorDeltaTracking = True
+        plugin = CondorPlugin(config)
+
+        queue = dict([(x, (1, 1000)) for x in range(nJobs)])
+        replies = [makeClassAds(queue)]
+        plugin.runQuery = lambda command: replies.pop(0)
+
+        jobs = [{"jobid": x, "status": "Idle", "status_time": 1000} for x in range(nJobs)]
+
+        startTime = time.time()
+        running, changes, completes = plugin.track(jobs)
+        fullTime = time.time() - startTime
+        self.assertEqual(len(running), nJobs)
+
+        changed = dict([(x, (2, 1100)) for x in range(0, nJobs, 100)])
+        replies.append(makeClassAds({}, history = True))
+        replies.append(makeClassAds(changed))
+
+        startTime = time.time()
+        running, changes, completes = plugin.track(jobs)
+        deltaTime = time.time() - startTime
+        self.assertEqual(len(changes), len(changed))
+
+        print "  Tracked %i jobs: full query %.2f s, delta query %.2f s" % (nJobs, fullTime, deltaTime)
+        return
+
+    def testJ_EventTracking(self):
+        """
+        _testJ_EventTracking_
+
+        Replay condor user logs to the CondorPlugin and verify that only the
+        jobs with new events are changed or completed, and that logs of
+        previous retries are not used.
+        """
+        config = self.getConfig()
+        plugin = CondorPlugin(config)
+
+        commands = []
+        def replay(command):
+            commands.append(command)
+            return makeClassAds({3: (1, 1000)})
+        plugin.runQuery = replay
+
+        jobs = []
+        for jobID in range(1, 4):
+            cacheDir = os.path.join(self.testDir, 'job_%i' % jobID)
+            os.makedirs(cacheDir)
+            jobs.append({"id": jobID, "jobid": jobID, "retry_count": 1,
+                         "cache_dir": cacheDir, "status": "New", "status_time": 0})
+        notes = [submitEventNotes(job) for job in jobs]
+
+        # Job 3 only has the log of its previous retry
+        replay = EventLogReplay()
+        replay.addCycle([(jobs[0]["cache_dir"], 10, 0, 1000, notes[0]),
+                         (jobs[1]["cache_dir"], 11, 0, 1000, notes[1]),
+                         (jobs[2]["cache_dir"], 5, 0, 900, "WMAgent_JobID 3 retry 0"),
+                         (jobs[2]["cache_dir"], 5, 5, 950, None)])
+        replay.addCycle([(jobs[0]["cache_dir"], 10, 1, 1100, None)])
+        replay.addCycle([(jobs[0]["cache_dir"], 10, 5, 1200, None),
+                         (jobs[1]["cache_dir"], 11, 12, 1200, None)])
+
+        replay.replayCycle()
+        running, changes, completes = plugin.trackEvents(jobs)
+        self.assertEqual(len(running), 3)
+        self.assertEqual(sorted([x["jobid"] for x in changes]), [1, 2, 3])
+        self.assertEqual(completes, [])
+        self.assertEqual(jobs[0]["status"], "Idle")
+        self.assertEqual(jobs[0]["globalState"], "Pending")
+        self.assertEqual(len(commands), 1)
+        self.assertEqual(sorted(plugin.eventLogs.keys()), [1, 2])
+
+        replay.replayCycle()
+        running, changes, completes = plugin.trackEvents(jobs)
+        self.assertEqual([x["jobid"] for x in changes], [1])
+        self.assertEqual(changes[0]["status"], "Running")
+        self.assertEqual(changes[0]["status_time"], 1100)
+
+        replay.replayCycle()
+        running, changes, completes = plugin.trackEvents(jobs)
+        self.assertEqual([x["jobid"] for x in changes], [2])
+        self.assertEqual(changes[0]["status"], "Held")
+        self.assertEqual(changes[0]["globalState"], "Error")
+        self.assertEqual([x["jobid"] for x in completes], [1])
+        self.assertEqual(plugin.eventLogs.keys(), [2])
+
+        # Nothing new in the logs
+        self.assertFalse(replay.replayCycle())
+        running, changes, completes = plugin.trackEvents(jobs[1:])
+        self.assertEqual(changes, [])
+        self.assertEqual(completes, [])
+        self.assertEqual(len(running), 2)
+        return
+
+    def testK_ConcurrentSubmit(self):
+        """
+        _testK_ConcurrentSubmit_
+
+        Submit jobs of several sandboxes with a stand-in condor_submit and
+        verify that the JDL header is built once per sandbox, the calls run
+        concurrently and failed calls fail only their own jobs.
+        """
+        binDir = os.path.join(self.testDir, 'bin')
+        os.makedirs(binDir)
+        script = os.path.join(binDir, 'condor_submit')
+        handle = open(script, 'w')
+        handle.write("#!/bin/sh\nsleep 1\n")
+        handle.write("if grep -q failingSandbox $1; then echo 'ERROR: no sandbox' >&2; exit 1; fi\n")
+        handle.write("echo 'Submitting job(s).'\n")
+        handle.close()
+        os.chmod(script, 0755)
+
+        config = self.getConfig()
+        config.JobSubmitter.jobsPerWorker = 5
+        config.BossAir.nCondorProcesses   = 4
+        plugin = CondorPlugin(config)
+
+        headers = []
+        initSubmit = plugin.initSubmit
+        def countHeaders(jobList):
+            headers.append(jobList[0]['sandbox'])
+            return initSubmit(jobList)
+        plugin.initSubmit = countHeaders
+
+        jobs = []
+        for jobID in range(40):
+            sandbox = ['sandboxA', 'sandboxB', 'failingSandbox'][jobID % 3]
+            jobs.append({'id': jobID, 'jobid': jobID, 'retry_count': 0,
+                         'sandbox': os.path.join(self.testDir, sandbox),
+                         'packageDir': self.testDir, 'cache_dir': self.testDir,
+                         'location': 'T2_XX_Fake', 'priority': None})
+
+        oldPath = os.environ['PATH']
+        os.environ['PATH'] = "%s:%s" % (binDir, oldPath)
+        try:
+            startTime = time.time()
+            successfulJobs, failedJobs = plugin.submit(jobs, {})
+            elapsed = time.time() - startTime
+        finally:
+            os.environ['PATH'] = oldPath
+
+        self.assertEqual(len(headers), 3)
+        self.assertEqual(sorted([x['id'] for x in successfulJobs]),
+                         [x for x in range(40) if x % 3 != 2])
+        self.assertEqual(sorted([x['id'] for x in failedJobs]), range(2, 40, 3))
+        for job in failedJobs:
+            self.assertTrue(job['fwjr'].getStepErrors("JobSubmit"))
+        # Nine calls of one second on four processes
+        self.assertTrue(elapsed < 6, "Submission took %.1f seconds" % elapsed)
+        return
+
+    def testL_CompactJDL(self):
+        """
+        _testL_CompactJDL_
+
+        Compare the per-job and the compact JDL of a few jobs to the golden
+        files, and verify that expanding the queue table of the compact one
+        gives back the per-job one for both condor plugins.
+        """
+        config = self.getConfig()
+        config.BossAir.submitWMSMode = True
+
+        jobs = []
+        for jobID in range(1, 5):
+            jobs.append({'id': 100 + jobID, 'jobid': jobID, 'retry_count': jobID % 2,
+                         'sandbox': '/wmagent/Workflow/Workflow-Sandbox.tar.bz2',
+                         'packageDir': '/wmagent/Workflow/Batch_1',
+                         'cache_dir': '/wmagent/JobCache/Workflow/Task/job_%i' % jobID,
+                         'location': 'T2_XX_Site%i' % jobID, 'priority': 10,
+                         'possibleSites': ['T2_XX_Site%i' % x for x in range(jobID)],
+                         'requestName': 'Workflow', 'taskType': 'Processing'})
+
+        goldenDir = os.path.dirname(__file__)
+        for pluginClass, goldenName in [(CondorPlugin, 'CondorSubmit'),
+                                        (VanillaCondorPlugin, None)]:
+            plugin = pluginClass(config)
+            plugin.scriptFile = '/wmagent/submit.sh'
+            plugin.unpacker   = '/wmagent/Unpacker.py'
+            nHeader = len(plugin.initSubmit(jobs))
+
+            perJob = plugin.makeSubmit(jobs)
+            plugin.compactJDL = True
+            compact = plugin.makeSubmit(jobs)
+            self.assertTrue(len(compact) < len(perJob))
+            self.assertEqual(expandQueueTable(compact, nHeader), perJob)
+
+            if goldenName:
+                golden = open(os.path.join(goldenDir, '%s.jdl' % goldenName)).readlines()
+                self.assertEqual(perJob, golden)
+                golden = open(os.path.join(goldenDir, '%sCompact.jdl' % goldenName)).readlines()
+                self.assertEqual(compact, golden)
+
+        # Jobs that don't set the same attributes get one block each
+        jobs[0]['priority'] = None
+        self.assertEqual(plugin.makeSubmit(jobs).count("Queue 1\n"), 4)
+        return
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+_JobCacheStore_t_
+
+Unittest for the WMCore.Cache.JobCacheStore module
+"""
+
+import os
+import os.path
+import shutil
+import cPickle
+import tempfile
+import unittest
+
+from WMCore.Cache.JobCacheStore import JobCacheWriter, JobCacheReader, cleanStore
+from WMCore.Cache.JobCacheStore import STORE_DATA, STORE_INDEX, SUBMIT_INFO
+
+class JobCacheStoreTest(unittest.TestCase):
+    """
+    _JobCacheStoreTest_
+
+    """
+    def setUp(self):
+        """
+        _setUp_
+
+        Create a job collection with a few job directories.
+        """
+        self.workDir = tempfile.mkdtemp()
+        self.collectionDir = os.path.join(self.workDir, "JobCollection_1_0")
+        os.mkdir(self.collectionDir)
+        return
+
+    def tearDown(self):
+        """
+        _tearDown_
+
+        Remove the job collection.
+        """
+        shutil.rmtree(self.workDir)
+        return
+
+    def makeJobs(self, jobIDs):
+        """
+        _makeJobs_
+
+        Create a job directory and a job dictionary for each id.
+        """
+        jobs = []
+        for jobID in jobIDs:
+            cacheDir = os.path.join(self.collectionDir, "job_%i" % jobID)
+            os.mkdir(cacheDir)
+            inputFiles = [{"lfn": "/store/file%i" % x, "locations": set(["se.example.com"])}
+                          for x in range(10)]
+            jobs.append({"id": jobID, "cache_dir": cacheDir,
+                         "name": "job%i" % jobID, "input_files": inputFiles,
+                         "sandbox": "/some/sandbox.tar.bz2", "priority": 10,
+                         "siteWhitelist": ["T2_XX_Site"]})
+        return jobs
+
+    def testStore(self):
+        """
+        _testStore_
+
+        Write jobs in two batches and read them back in any order.
+        """
+        jobs = self.makeJobs(range(1, 11))
+
+        writer = JobCacheWriter()
+        for job in jobs[:5]:
+            writer.add(job)
+        writer.flush()
+        for job in jobs[5:]:
+            writer.add(job)
+        writer.flush()
+
+        self.assertTrue(os.path.isfile(os.path.join(self.collectionDir, STORE_DATA)))
+        self.assertTrue(os.path.isfile(os.path.join(self.collectionDir, STORE_INDEX)))
+        for job in jobs:
+            self.assertFalse(os.path.exists(os.path.join(job["cache_dir"], "job.pkl")))
+
+        reader = JobCacheReader()
+        for job in reversed(jobs):
+            self.assertEqual(reader.loadJob(job["id"], job["cache_dir"]), job)
+        self.assertEqual(reader.loadJob(99, os.path.join(self.collectionDir, "job_99")), None)
+        reader.close()
+        return
+
+    def testFallback(self):
+        """
+        _testFallback_
+
+        Jobs written with the per job layout must still be readable, also
+        when they share a collection with jobs in a store.
+        """
+        jobs = self.makeJobs([1, 2])
+
+        writer = JobCacheWriter(useStore = False)
+        writer.add(jobs[0])
+        self.assertTrue(os.path.isfile(os.path.join(jobs[0]["cache_dir"], "job.pkl")))
+
+        writer = JobCacheWriter()
+        writer.add(jobs[1])
+        writer.flush()
+
+        reader = JobCacheReader()
+        self.assertEqual(reader.loadJob(1, jobs[0]["cache_dir"]), jobs[0])
+        self.assertEqual(reader.loadJob(2, jobs[1]["cache_dir"]), jobs[1])
+        self.assertEqual(cPickle.loads(reader.loadRaw(2, jobs[1]["cache_dir"])), jobs[1])
+        reader.close()
+        return
+
+    def testInterruptedIndex(self):
+        """
+        _testInterruptedIndex_
+
+        A partially written index line must be ignored.
+        """
+        jobs = self.makeJobs([1])
+        writer = JobCacheWriter()
+        writer.add(jobs[0])
+        writer.flush()
+
+        indexFile = open(os.path.join(self.collectionDir, STORE_INDEX), "a")
+        indexFile.write("2 1000")
+        indexFile.close()
+
+        reader = JobCacheReader()
+        self.assertEqual(reader.loadJob(1, jobs[0]["cache_dir"]), jobs[0])
+        self.assertEqual(reader.loadJob(2, os.path.join(self.collectionDir, "job_2")), None)
+        reader.close()
+        return
+
+    def testSubmitInfo(self):
+        """
+        _testSubmitInfo_
+
+        Submit information is written for both layouts and read back without
+        the job pickle.  Jobs without a sidecar entry are unpickled.
+        """
+        jobs = self.makeJobs([1, 2, 3])
+
+        writer = JobCacheWriter(useStore = False)
+        writer.add(jobs[0])
+        writer.flush()
+        writer = JobCacheWriter()
+        writer.add(jobs[1])
+        writer.flush()
+        self.assertTrue(os.path.isfile(os.path.join(self.collectionDir, SUBMIT_INFO)))
+
+        jobHandle = open(os.path.join(jobs[2]["cache_dir"], "job.pkl"), "w")
+        cPickle.dump(jobs[2], jobHandle)
+        jobHandle.close()
+        os.remove(os.path.join(jobs[1]["cache_dir"], "..", STORE_DATA))
+
+        reader = JobCacheReader()
+        for job in jobs:
+            submitInfo = reader.loadSubmitInfo(job["id"], job["cache_dir"])
+            self.assertEqual(submitInfo["id"], job["id"])
+            self.assertEqual(submitInfo["name"], job["name"])
+            self.assertEqual(submitInfo["sandbox"], job["sandbox"])
+            self.assertEqual(submitInfo["priority"], 10)
+            self.assertEqual(submitInfo["locations"], ["se.example.com"])
+            self.assertEqual(submitInfo["siteWhitelist"], ["T2_XX_Site"])
+            self.assertEqual(submitInfo["siteBlacklist"], [])
+            self.assertEqual(submitInfo["ownerGroup"], "")
+        self.assertEqual(reader.loadSubmitInfo(4, os.path.join(self.collectionDir, "job_4")), None)
+        reader.close()
+        return
+
+    def testCleanStore(self):
+        """
+        _testCleanStore_
+
+        The store is only removed once the job directories are gone.
+        """
+        jobs = self.makeJobs([1, 2])
+        writer = JobCacheWriter()
+        for job in jobs:
+            writer.add(job)
+        writer.flush()
+
+        shutil.rmtree(jobs[0]["cache_dir"])
+        cleanStore(self.collectionDir)
+        self.assertTrue(os.path.isfile(os.path.join(self.collectionDir, STORE_DATA)))
+
+        shutil.rmtree(jobs[1]["cache_dir"])
+        cleanStore(self.collectionDir)
+        self.assertEqual(os.listdir(self.collectionDir), [])
+        return
+
+if __name__ == '__main__':
+    unittest.main()
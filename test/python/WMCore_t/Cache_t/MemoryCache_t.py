@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+_MemoryCache_t_
+
+Unittest for the WMCore.Cache.MemoryCache module
+"""
+
+import time
+import threading
+import unittest
+
+from WMCore.Cache.MemoryCache import MemoryCache
+
+class MemoryCacheTest(unittest.TestCase):
+    """
+    _MemoryCacheTest_
+
+    """
+    def testHitsAndExpiry(self):
+        """
+        _testHitsAndExpiry_
+
+        Values are fetched once and again when they expire.
+        """
+        cache = MemoryCache()
+        calls = []
+        def fetch():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(cache.get("a", fetch, 60), 1)
+        self.assertEqual(cache.get("a", fetch, 60), 1)
+        self.assertEqual(cache.get("b", fetch, 0), 2)
+        self.assertEqual(cache.get("b", fetch, 0), 3)
+
+        cache.invalidate("a")
+        self.assertEqual(cache.get("a", fetch, 60), 4)
+
+        stats = cache.getStats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 4)
+        self.assertEqual(stats["expired"], 1)
+        self.assertEqual(stats["size"], 2)
+        return
+
+    def testLRUEviction(self):
+        """
+        _testLRUEviction_
+
+        The least recently used values are dropped first.
+        """
+        cache = MemoryCache(maxSize = 2)
+        cache.get("a", lambda: "a", 60)
+        cache.get("b", lambda: "b", 60)
+        cache.get("a", lambda: "new a", 60)
+        cache.get("c", lambda: "c", 60)
+
+        self.assertEqual(cache.get("a", lambda: "new a", 60), "a")
+        self.assertEqual(cache.get("b", lambda: "new b", 60), "new b")
+        self.assertEqual(cache.getStats()["evicted"], 2)
+        return
+
+    def testRecentlyUsedList(self):
+        """
+        _testRecentlyUsedList_
+
+        Invalidated, expired and cleared values leave the recently used list
+        consistent with the cached values.
+        """
+        cache = MemoryCache(maxSize = 3)
+        for key in "abcd":
+            cache.get(key, lambda: key, 60)
+        cache.invalidate("c")
+        cache.get("e", lambda: "e", -1)
+        cache.get("e", lambda: "new e", 60)
+
+        keys = []
+        entry = cache.root[1]
+        while entry is not cache.root:
+            keys.append(entry[2])
+            entry = entry[1]
+        self.assertEqual(keys, ["b", "d", "e"])
+        self.assertEqual(sorted(cache.entries.keys()), keys)
+
+        cache.clear()
+        self.assertEqual(cache.getStats()["size"], 0)
+        cache.get("a", lambda: "new a", 60)
+        self.assertEqual(cache.root[1][2], "a")
+        self.assertEqual(cache.root[0][2], "a")
+        return
+
+    def testCoalescing(self):
+        """
+        _testCoalescing_
+
+        Concurrent requests for the same key share a single fetch, errors
+        are raised to all of them and not cached.
+        """
+        cache = MemoryCache()
+        calls = []
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        results = []
+        threads = []
+        for i in range(10):
+            thread = threading.Thread(target = lambda: results.append(cache.get("a", fetch, 60)))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 10)
+        self.assertEqual(cache.getStats()["coalesced"], 9)
+
+        def failure():
+            raise RuntimeError("Service unavailable")
+        self.assertRaises(RuntimeError, cache.get, "b", failure, 60)
+        self.assertEqual(cache.get("b", lambda: "value", 60), "value")
+        self.assertEqual(cache.getStats()["errors"], 1)
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+_DAOFactory_t_
+
+Unit tests for the DAOFactory class caches
+"""
+
+import unittest
+import threading
+
+from WMCore.DAOFactory import DAOFactory, getCacheStats
+from WMQuality.TestInit import TestInit
+
+class DAOFactoryTest(unittest.TestCase):
+    def setUp(self):
+        """
+        _setUp_
+
+        Setup the database connection.
+        """
+        self.testInit = TestInit(__file__)
+        self.testInit.setLogging()
+        self.testInit.setDatabaseConnection()
+        return
+
+    def tearDown(self):
+        """
+        _tearDown_
+
+        Nothing to do.
+        """
+        return
+
+    def testCaching(self):
+        """
+        _testCaching_
+
+        Classes are shared by all the factories, instances only by the ones
+        created with cacheInstances.
+        """
+        myThread = threading.currentThread()
+        factory = DAOFactory(package = "WMCore.WMBS", logger = myThread.logger,
+                             dbinterface = myThread.dbi)
+        cachingFactory = DAOFactory(package = "WMCore.WMBS", logger = myThread.logger,
+                                    dbinterface = myThread.dbi, cacheInstances = True)
+
+        daoA = factory(classname = "Files.GetByID")
+        stats = getCacheStats()
+        daoB = factory(classname = "Files.GetByID")
+        self.assertEqual(getCacheStats()["classHits"], stats["classHits"] + 1)
+        self.assertEqual(daoA.__class__, daoB.__class__)
+        self.assertFalse(daoA is daoB)
+
+        daoC = cachingFactory(classname = "Files.GetByID")
+        daoD = cachingFactory(classname = "Files.GetByID")
+        self.assertTrue(daoC is daoD)
+        self.assertFalse(daoA is daoC)
+        self.assertEqual(getCacheStats()["instanceHits"], stats["instanceHits"] + 1)
+        return
+
+if __name__ == "__main__":
+    unittest.main()
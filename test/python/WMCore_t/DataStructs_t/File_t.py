@@ -12,6 +12,7 @@ Unittest for the WMCore.DataStructs.File class
 
 
 import unittest
+import cPickle
 from WMCore.DataStructs.File import File
 from WMCore.DataStructs.Run import Run
 
@@ -70,6 +71,52 @@ class FileTest(unittest.TestCase):
 
         return
 
+    def testAddRuns(self):
+        """
+        This tests the addRuns() function of a DataStructs File object,
+        runs with the same number must be merged into a single Run
+
+        """
+
+        testFile = File(lfn = "lfn")
+        testFile.addRun(Run(1, 1, 2))
+        testFile.addRuns([Run(1, 2, 3), Run(2, 5), Run(2, 6, 5)])
+
+        self.assertEqual(len(testFile['runs']), 2)
+        runs = sorted(testFile['runs'])
+        self.assertEqual(runs[0].run, 1)
+        self.assertEqual(runs[0].lumis, [1, 2, 3])
+        self.assertEqual(runs[1].run, 2)
+        self.assertEqual(runs[1].lumis, [5, 6])
+
+        self.assertRaises(RuntimeError, testFile.addRuns, [1])
+
+        return
+
+    def testSortedRuns(self):
+        """
+        _testSortedRuns_
+
+        Verify that getSortedRuns() returns the runs in order with sorted
+        lumis, also for runs added to the file without addRuns() and for
+        pickled files.
+        """
+        testFile = File(lfn = "lfn")
+        testFile.addRuns([Run(3, 9, 7), Run(1, 4, 2)])
+        testFile.addRun(Run(3, 8, 1))
+        testFile["runs"].add(Run(2, 6, 5))
+
+        runs = testFile.getSortedRuns()
+        self.assertEqual([run.run for run in runs], [1, 2, 3])
+        self.assertEqual([run.lumis for run in runs], [[2, 4], [5, 6], [1, 7, 8, 9]])
+
+        testFile = cPickle.loads(cPickle.dumps(testFile, cPickle.HIGHEST_PROTOCOL))
+        self.assertFalse("_runIndex" in testFile.__dict__)
+        testFile.addRun(Run(2, 4))
+        self.assertEqual(len(testFile["runs"]), 3)
+        self.assertEqual(testFile.getSortedRuns()[1].lumis, [4, 5, 6])
+        return
+
 
     def testSaveAndLoad(self):
         """
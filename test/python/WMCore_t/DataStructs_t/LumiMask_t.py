@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+_LumiMask_t_
+
+Unittest for the WMCore.DataStructs.LumiMask class
+
+"""
+
+import cPickle
+import unittest
+
+from WMCore.DataStructs.LumiMask import LumiMask
+from WMCore.DataStructs.Run import Run
+
+
+class LumiMaskTest(unittest.TestCase):
+    """
+    _LumiMaskTest_
+
+    """
+
+    def testMerge(self):
+        """
+        _testMerge_
+
+        Ranges must come out sorted and merged, overlapping and adjacent
+        ranges collapse into one.
+        """
+        mask = LumiMask({"1": [[10, 12], [1, 4], [3, 6], [7, 7], [20, 20]]})
+        self.assertEqual(mask["1"], [[1, 7], [10, 12], [20, 20]])
+        self.assertEqual(mask.getRanges(1), [[1, 7], [10, 12], [20, 20]])
+        self.assertEqual(mask.getRanges(2), [])
+        return
+
+    def testLookups(self):
+        """
+        _testLookups_
+
+        Check single run/lumi lookups with both string and integer runs.
+        """
+        mask = LumiMask({"1": [[1, 4], [23, 45]], 2: [[5, 5]]})
+
+        self.assertTrue(mask.hasRun(1))
+        self.assertTrue(mask.hasRun("2"))
+        self.assertFalse(mask.hasRun(3))
+
+        for lumi in [1, 4, 23, 30, 45]:
+            self.assertTrue(mask.hasLumi(1, lumi))
+        for lumi in [0, 5, 22, 46]:
+            self.assertFalse(mask.hasLumi("1", lumi))
+        self.assertTrue(mask.hasLumi(2, 5))
+        self.assertFalse(mask.hasLumi(2, 6))
+        self.assertFalse(mask.hasLumi(3, 1))
+
+        del mask["1"]
+        self.assertFalse(mask.hasRun(1))
+        self.assertFalse(mask.hasLumi(1, 2))
+        return
+
+    def testEmptyMask(self):
+        """
+        _testEmptyMask_
+
+        An empty mask lets everything through.
+        """
+        mask = LumiMask()
+        self.assertTrue(mask.hasRun(1))
+        self.assertTrue(mask.hasLumi(1, 1))
+        self.assertEqual(mask.filterLumis(1, [3, 1, 2]), [3, 1, 2])
+        return
+
+    def testFilter(self):
+        """
+        _testFilter_
+
+        Test the bulk filtering of lumis and Run objects.
+        """
+        mask = LumiMask({"1": [[1, 9], [12, 12], [31, 31]]})
+
+        self.assertEqual(mask.filterLumis(1, [12, 2, 10, 31, 40]), [12, 2, 31])
+        self.assertEqual(mask.filterLumis(2, [1, 2]), [])
+
+        runs = [Run(1, 2, 148), Run(2, 1, 2), Run(1, 9, 2)]
+        newRuns = mask.filterRuns(runs)
+        self.assertEqual(len(newRuns), 1)
+        self.assertEqual(newRuns[0].run, 1)
+        self.assertEqual(newRuns[0].lumis, [2, 9])
+        return
+
+    def testFromLumis(self):
+        """
+        _testFromLumis_
+
+        Build a mask from individual lumis.
+        """
+        mask = LumiMask.fromLumis({"1": [6, 1, 2, 3, 4, 7, 4, 11, 12, 9],
+                                   "3": [20]})
+        self.assertEqual(mask["1"], [[1, 4], [6, 7], [9, 9], [11, 12]])
+        self.assertEqual(mask["3"], [[20, 20]])
+        self.assertTrue(mask.hasLumi(3, 20))
+        return
+
+    def testPickle(self):
+        """
+        _testPickle_
+
+        The index must survive a pickle round trip.
+        """
+        mask = LumiMask({"1": [[1, 4]]})
+        newMask = cPickle.loads(cPickle.dumps(mask))
+        self.assertEqual(newMask, {"1": [[1, 4]]})
+        self.assertTrue(newMask.hasLumi(1, 3))
+        self.assertFalse(newMask.hasLumi(1, 5))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
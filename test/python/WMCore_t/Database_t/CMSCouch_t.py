@@ -363,6 +363,39 @@ class CMSCouchTest(unittest.TestCase):
         self.assertEquals(1, len(self.db.allDocs({'limit':1}, ["1", "3"])['rows']))
         self.assertEquals(True, self.db.allDocs(keys = ["1", "4"])['rows'][1].has_key('error'))
 
+    def testAsyncCommit(self):
+        """
+        Test the background committer
+        """
+        asyncDB = self.server.connectDatabase(self.db.name, size = 10,
+                                              asyncCommit = True)
+        conflicts = []
+        def callback(db, data, result):
+            conflicts.append(result['id'])
+            return result
+
+        self.db.commitOne(Document(id = "0", inputDict = {'foo': 0}))
+        for i in range(55):
+            asyncDB.queue(Document(id = str(i % 50), inputDict = {'foo': i}),
+                          callback = callback)
+        self.assertEqual(asyncDB.commit(callback = callback), None)
+        asyncDB.flush()
+
+        self.assertEquals(50, len(self.db.allDocs()['rows']))
+        self.assertEquals(sorted(conflicts), ["0", "0", "1", "2", "3", "4"])
+
+        metrics = asyncDB.commitMetrics()
+        self.assertEqual(metrics["docs"], 55)
+        self.assertEqual(metrics["batches"], 6)
+        self.assertEqual(metrics["conflicts"], 6)
+        self.assertEqual(metrics["queueDepth"], 0)
+        self.assertTrue(metrics["maxCommitTime"] >= metrics["meanCommitTime"])
+
+        asyncDB.queue(Document(id = "last", inputDict = {'foo': 55}))
+        asyncDB.close()
+        self.assertEquals(51, len(self.db.allDocs()['rows']))
+        self.assertEqual(asyncDB.committer.threads, [])
+
 if __name__ == "__main__":
     if len(sys.argv) >1 :
         suite = unittest.TestSuite()
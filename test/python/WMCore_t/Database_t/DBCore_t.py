@@ -285,6 +285,47 @@ class DBCoreTest(unittest.TestCase):
 
         return
 
+    def testProcessDataBulkSelect(self):
+        """
+        _testProcessDataBulkSelect_
+
+        Verify that a select with a single bind run for several thousand binds
+        returns the same rows with bulkSelect, duplicate binds only once.
+        """
+        binds = []
+        for i in range(1201):
+            binds.append({"one": i, "two": i * 2, "three": str(i * 3)})
+
+        insertSQL = "INSERT INTO test_tablea VALUES (:one, :two, :three)"
+        selectSQL = "SELECT column1, column2, column3 FROM test_tablea WHERE column1 = :one"
+
+        myThread = threading.currentThread()
+        myThread.dbi.processData(insertSQL, binds = binds)
+
+        selectBinds = [{"one": x["one"]} for x in binds]
+        selectBinds.extend([{"one": 5}, {"one": 5000}])
+        resultSets = myThread.dbi.processData(selectSQL, selectBinds, bulkSelect = True)
+
+        assert len(resultSets) == 1, \
+               "Error: Wrong number of ResultSets returned."
+
+        results = resultSets[0].fetchall()
+        assert len(results) == 1201, \
+               "Error: Wrong number of rows returned: %d" % len(results)
+        assert sorted([x[0] for x in results]) == range(1201), \
+               "Error: Wrong rows returned."
+
+        testInterface = myThread.dbi
+        assert testInterface.buildbulkselect("SELECT :one FROM test_tablea WHERE column1 = :one",
+                                             [{"one": 1}, {"one": 2}]) == None, \
+               "Error: Statements using the bind twice can't be rewritten."
+        for operator in [">=", "<=", "!="]:
+            assert testInterface.buildbulkselect("SELECT column1 FROM test_tablea WHERE column1 %s :one" % operator,
+                                                 [{"one": 1}, {"one": 2}]) == None, \
+                   "Error: Only equality comparisons can be rewritten."
+
+        return
+
     def testInsertHugeNumber(self):
         """
         _testInsertHugeNumber_
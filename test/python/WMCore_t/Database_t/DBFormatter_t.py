@@ -97,6 +97,32 @@ insert into test (bind1, bind2) values (:bind1, :bind2) """
         output = dbformatter.formatOneDict(result)
         self.assertEqual( output,  {'bind2': 'value2a', 'bind1': 'value1a'} )
 
+    def testStreaming(self):
+        """
+        Test the streaming formats, the rows come in several fetches
+        """
+
+        myThread = threading.currentThread()
+        dbformatter = DBFormatter(myThread.logger, myThread.dbi)
+        dbformatter.sql = myThread.select
+        dbformatter.fetchSize = 2
+
+        resultSets = list(dbformatter.stream())
+        self.assertEqual([len(x.fetchall()) for x in resultSets], [2, 1])
+
+        output = dbformatter.formatIter(dbformatter.stream())
+        self.assertEqual(output.next(), ['value1a', 'value2a'])
+        self.assertEqual(list(output), [['value1b', 'value2b'], ['value1c', 'value2d']])
+
+        output = dbformatter.formatDictIter(dbformatter.stream())
+        self.assertEqual(list(output), [{'bind2': 'value2a', 'bind1': 'value1a'}, \
+            {'bind2': 'value2b', 'bind1': 'value1b'},\
+            {'bind2': 'value2d', 'bind1': 'value1c'}] )
+
+        dbformatter.sql = "select * from test where bind1 = :bind1"
+        output = dbformatter.formatDict(dbformatter.stream({'bind1': 'value1b'}))
+        self.assertEqual(output, [{'bind2': 'value2b', 'bind1': 'value1b'}])
+
 
 if __name__ == "__main__":
     unittest.main()
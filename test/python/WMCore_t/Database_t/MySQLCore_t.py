@@ -11,7 +11,7 @@ Unit tests for the MySQL version of DBCore.
 import unittest
 import logging
 
-from WMCore.Database.MySQLCore import MySQLInterface
+from WMCore.Database.MySQLCore import MySQLInterface, substituteCacheStats
 from WMQuality.TestInit import TestInit
 
 class DBCoreTest(unittest.TestCase):
@@ -122,5 +122,33 @@ class DBCoreTest(unittest.TestCase):
 
         return
 
+    def testBindSubstitutionCache(self):
+        """
+        _testBindSubstitutionCache_
+
+        Verify that the parsed SQL is reused for the same SQL and bind names
+        and that the cached bind order is applied to new values.
+        """
+        sql = "SELECT id FROM wmbs_file_details WHERE lfn = :lfn AND size = :size AND events = :events"
+        myInterface = MySQLInterface(logger = logging, engine = None)
+
+        misses = substituteCacheStats["misses"]
+        hits = substituteCacheStats["hits"]
+        (updatedSQL, bindList) = myInterface.substitute(sql, {"events": 10, "size": 20, "lfn": "a"})
+        (cachedSQL, cachedBindList) = myInterface.substitute(sql, {"lfn": "b", "events": 30, "size": 40})
+
+        assert substituteCacheStats["misses"] == misses + 1, \
+               "Error: The first substitution should be a cache miss."
+        assert substituteCacheStats["hits"] == hits + 1, \
+               "Error: The second substitution should be a cache hit."
+        assert updatedSQL == cachedSQL, \
+               "Error: Cached SQL is different."
+        assert bindList == [("a", 20, 10)], \
+               "Error: Binds are in the wrong order."
+        assert cachedBindList == [("b", 40, 30)], \
+               "Error: Cached binds are in the wrong order."
+
+        return
+
 if __name__ == "__main__":
     unittest.main()
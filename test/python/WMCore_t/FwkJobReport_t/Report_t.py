@@ -6,6 +6,7 @@ Unit tests for the Report class.
 """
 
 import unittest
+import cPickle
 import os
 import xml.dom.minidom
 import time
@@ -15,7 +16,9 @@ import WMCore.Algorithms.BasicAlgos as BasicAlgos
 from WMCore.Database.CMSCouch import CouchServer
 from WMQuality.TestInitCouchApp import TestInitCouchApp
 
-from WMCore.FwkJobReport.Report import Report
+from WMCore.FwkJobReport.Report import Report, FwkJobReportException
+from WMCore.FwkJobReport.Report import LazyConfigSection, loadReportJSON, convertReport
+from WMCore.Configuration import ConfigSection
 from WMCore.WMSpec.Steps.WMExecutionFailure import WMExecutionFailure
 
 class ReportTest(unittest.TestCase):
@@ -670,7 +673,7 @@ cms::Exception caught in EventProcessor and rethrown
 
         myReport.save(path1)
         info = BasicAlgos.getFileInfo(filename = path1)
-        self.assertEqual(info['Size'], 6821)
+        self.assertEqual(info['Size'], 2757)
 
         inputFiles = myReport.getAllInputFiles()
         self.assertEqual(len(inputFiles), 1)
@@ -679,10 +682,63 @@ cms::Exception caught in EventProcessor and rethrown
 
         myReport.save(path2)
         info = BasicAlgos.getFileInfo(filename = path2)
-        self.assertEqual(info['Size'], 5933)
+        self.assertEqual(info['Size'], 2147)
 
         return
 
+    def testCompactFormat(self):
+        """
+        _testCompactFormat_
+
+        Verify that reports saved in the compact format load the same as
+        pickled ones and that the input sections are only decoded when used,
+        saving the report again or making its JSON document doesn't decode
+        them.
+        """
+        myReport = Report("cmsRun1")
+        myReport.parse(self.xmlPath)
+        myReport.setTaskName("/Some/Task")
+        myReport.setStepStatus("cmsRun1", 0)
+
+        pklPath = os.path.join(self.testDir, "Report.pkl")
+        handle = open(pklPath, "w")
+        cPickle.dump(myReport.data, handle)
+        handle.close()
+
+        compactPath = os.path.join(self.testDir, "Report.compact.pkl")
+        convertReport(pklPath, compactPath)
+        self.assertEqual(open(compactPath).readline(), "WMFWJR 1\n")
+        self.assertEqual(loadReportJSON(compactPath), myReport.__to_json__(None))
+        self.assertEqual(loadReportJSON(pklPath), myReport.__to_json__(None))
+
+        newReport = Report()
+        newReport.load(compactPath)
+        inputSection = newReport.data.cmsRun1.__dict__["input"]
+        self.assertEqual(type(inputSection), LazyConfigSection)
+        self.assertTrue(newReport.taskSuccessful())
+        self.assertEqual(len(newReport.getAllFilesFromStep("cmsRun1")), 2)
+        self.assertEqual(type(inputSection), LazyConfigSection)
+
+        newReport.save(compactPath)
+        self.assertEqual(type(inputSection), LazyConfigSection)
+        newReport.load(compactPath)
+        inputSection = newReport.data.cmsRun1.__dict__["input"]
+        self.assertEqual(type(inputSection), LazyConfigSection)
+        self.assertEqual(newReport.__to_json__(None), myReport.__to_json__(None))
+        self.assertEqual(type(inputSection), LazyConfigSection)
+
+        self.verifyInputData(newReport)
+        self.assertEqual(type(inputSection), ConfigSection)
+        self.assertEqual(newReport.__to_json__(None), myReport.__to_json__(None))
+        outputSection = newReport.data.cmsRun1.output
+        self.assertTrue(outputSection.outputRECORECO._internal_parent_ref is outputSection)
+
+        handle = open(compactPath, "w")
+        handle.write("WMFWJR 2\n")
+        handle.close()
+        self.assertRaises(FwkJobReportException, newReport.load, compactPath)
+        return
+
     def testDuplicatStep(self):
         """
         _testDuplicateStep_
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+_XMLParser_t_
+
+Unit tests for the streaming framework job report XML parser.
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from nose.plugins.attrib import attr
+
+import WMCore.WMBase
+from WMCore.FwkJobReport.Report import Report
+from WMCore.FwkJobReport.XMLParser import xmlToJobReport, nodeXmlToJobReport
+
+class XMLParserTest(unittest.TestCase):
+    """
+    _XMLParserTest_
+
+    Compare the streaming parser to the Node tree based one.
+    """
+    def setUp(self):
+        """
+        _setUp_
+
+        Create a directory for the synthetic reports.
+        """
+        self.testDir = tempfile.mkdtemp()
+        return
+
+    def tearDown(self):
+        """
+        _tearDown_
+
+        Remove the synthetic reports.
+        """
+        shutil.rmtree(self.testDir)
+        return
+
+    def parseBoth(self, xmlPath):
+        """
+        _parseBoth_
+
+        Parse a report with both parsers, verify the reports are the same and
+        return the streamed one.
+        """
+        nodeReport = Report("cmsRun1")
+        nodeXmlToJobReport(nodeReport, xmlPath)
+        streamReport = Report("cmsRun1")
+        xmlToJobReport(streamReport, xmlPath)
+
+        self.assertEqual(streamReport.data.dictionary_whole_tree_(),
+                         nodeReport.data.dictionary_whole_tree_())
+        return streamReport
+
+    def writeLargeReport(self, nInputs, nLumis):
+        """
+        _writeLargeReport_
+
+        Write a synthetic report with nInputs input files and one output file
+        coming from all of them, each file with nLumis lumis.
+        """
+        xmlPath = os.path.join(self.testDir, "Large.xml")
+        handle = open(xmlPath, "w")
+        handle.write("<FrameworkJobReport>\n")
+
+        lumis = "".join(['<LumiSection ID="%i"/>\n' % x for x in range(nLumis)])
+        for i in range(nInputs):
+            handle.write("""<InputFile>
+<State  Value="closed"/>
+<LFN>/store/data/Run/Primary/RAW/v1/%(i)09i.root</LFN>
+<PFN>root://some.host//store/data/Run/Primary/RAW/v1/%(i)09i.root</PFN>
+<Catalog>trivialcatalog_file:storage.xml?protocol=xrootd</Catalog>
+<ModuleLabel>source</ModuleLabel>
+<GUID>142F3F42-C5D6-DE11-945D-%(i)012i</GUID>
+<Branches>
+  <Branch>FEDRawDataCollection_source__HLT.</Branch>
+</Branches>
+<InputType>primaryFiles</InputType>
+<InputSourceClass>PoolSource</InputSourceClass>
+<EventsRead>100</EventsRead>
+<Runs>
+<Run ID="%(run)i">
+%(lumis)s</Run>
+</Runs>
+</InputFile>
+""" % {"i": i, "run": 100000 + i, "lumis": lumis})
+
+        inputs = "".join(["<Input><LFN>/store/data/Run/Primary/RAW/v1/%09i.root</LFN><PFN>%09i.root</PFN></Input>\n" % (x, x)
+                          for x in range(nInputs)])
+        runs = "".join(['<Run ID="%i">\n%s</Run>\n' % (100000 + x, lumis) for x in range(nInputs)])
+        handle.write("""<File>
+<State  Value="closed"/>
+<LFN>/store/unmerged/Primary/RECO/v1/output.root</LFN>
+<PFN>output.root</PFN>
+<Catalog></Catalog>
+<ModuleLabel>outputRECO</ModuleLabel>
+<GUID>7E3359C8-222E-DF11-B2B0-001731230E47</GUID>
+<Branches>
+  <Branch>recoTracks_generalTracks__RECO.</Branch>
+</Branches>
+<OutputModuleClass>PoolOutputModule</OutputModuleClass>
+<TotalEvents>%i</TotalEvents>
+<DataType>Data</DataType>
+<BranchHash>f8ca6f0b8ff3e7e4cb0e3ce4a6d2ad70</BranchHash>
+<Runs>
+%s</Runs>
+<Inputs>
+%s</Inputs>
+</File>
+""" % (nInputs * 100, runs, inputs))
+
+        handle.write("</FrameworkJobReport>\n")
+        handle.close()
+        return xmlPath
+
+    def testSampleReports(self):
+        """
+        _testSampleReports_
+
+        Verify that the streaming parser builds the same reports as the Node
+        tree based one for the sample reports.
+        """
+        for reportName in ["CMSSWProcessingReport.xml", "CMSSWMergeReport.xml",
+                           "CMSSWFailReport.xml", "CMSSWMultipleInput.xml",
+                           "PerformanceReport.xml"]:
+            xmlPath = os.path.join(WMCore.WMBase.getTestBase(),
+                                   "WMCore_t/FwkJobReport_t", reportName)
+            self.parseBoth(xmlPath)
+
+        return
+
+    def testLargeReport(self):
+        """
+        _testLargeReport_
+
+        Verify the runs, lumis and input associations of a report with many
+        input files.
+        """
+        report = self.parseBoth(self.writeLargeReport(50, 20))
+
+        inputFiles = report.getAllInputFiles()
+        self.assertEqual(len(inputFiles), 50)
+        self.assertEqual(inputFiles[7]["lfn"], "/store/data/Run/Primary/RAW/v1/000000007.root")
+        self.assertEqual(list(inputFiles[7]["runs"])[0].lumis, range(20))
+
+        outputFile = report.getAllFilesFromStep("cmsRun1")[0]
+        self.assertEqual(len(outputFile["runs"]), 50)
+        self.assertEqual(len(outputFile["input"]), 50)
+        self.assertEqual(outputFile["events"], 5000)
+        return
+
+    @attr('performance')
+    def testParserPerformance(self):
+        """
+        _testParserPerformance_
+
+        Time both parsers on a report with thousands of input files and lumis.
+        """
+        xmlPath = self.writeLargeReport(5000, 50)
+
+        startTime = time.time()
+        nodeXmlToJobReport(Report("cmsRun1"), xmlPath)
+        nodeTime = time.time() - startTime
+
+        startTime = time.time()
+        xmlToJobReport(Report("cmsRun1"), xmlPath)
+        streamTime = time.time() - startTime
+
+        print "  Node tree parser: %.2f s, streaming parser: %.2f s" % (nodeTime, streamTime)
+        self.assertTrue(streamTime < nodeTime)
+        return
+
+if __name__ == "__main__":
+    unittest.main()
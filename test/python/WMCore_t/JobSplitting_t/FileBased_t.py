@@ -180,5 +180,33 @@ class FileBasedTest(unittest.TestCase):
 
         return
 
+    def testStreaming(self):
+        """
+        _testStreaming_
+
+        Run the splitting in streaming mode and verify that every job is
+        handed out exactly once in committed JobGroups no bigger than the
+        maximum group size.
+        """
+        batches = []
+        splitter = SplitterFactory()
+        jobFactory = splitter(self.multipleFileSubscription)
+
+        nGroups = jobFactory.stream(handler = batches.append, groupsPerBatch = 2,
+                                    maxJobsPerGroup = 3, files_per_job = 1)
+
+        self.assertEqual(nGroups, 4)
+        self.assertEqual([len(x) for x in batches], [2, 2])
+
+        lfns = set()
+        for jobGroups in batches:
+            for jobGroup in jobGroups:
+                self.assertTrue(len(jobGroup.jobs) <= 3)
+                self.assertEqual(jobGroup.newjobs, [])
+                for job in jobGroup.jobs:
+                    lfns.update(job.getFiles(type = "lfn"))
+        self.assertEqual(len(lfns), 10)
+        return
+
 if __name__ == '__main__':
     unittest.main()
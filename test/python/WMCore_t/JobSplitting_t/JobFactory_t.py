@@ -14,8 +14,10 @@ from WMCore.DataStructs.File import File
 from WMCore.DataStructs.Fileset import Fileset
 from WMCore.DataStructs.Subscription import Subscription
 from WMCore.DataStructs.Workflow import Workflow
+from WMCore.DataStructs.Run import Run
 
 from WMCore.JobSplitting.JobFactory import JobFactory
+from WMCore.JobSplitting.SplitterFactory import SplitterFactory
 
 class JobFactoryTest(unittest.TestCase):
     def setUp(self):
@@ -103,5 +105,46 @@ class JobFactoryTest(unittest.TestCase):
 
         return
 
+    def testStreamingJobNames(self):
+        """
+        _testStreamingJobNames_
+
+        Verify that splitters numbering their jobs still give every job a
+        unique name when streaming rolls over to a new JobGroup in the middle
+        of a run or location.
+        """
+        testWorkflow = Workflow(spec = "spec.pkl", owner = "Steve",
+                                name = "TestWorkflow", task = "TestTask")
+
+        testFileset = Fileset(name = "TestFileset")
+        for i in range(10):
+            testFile = File(lfn = "someLFN%i" % i, size = 1000, events = 100,
+                            locations = set(["somese.cern.ch"]))
+            testFile.addRun(Run(1, *[45]))
+            testFileset.addFile(testFile)
+        testFileset.commit()
+
+        splitter = SplitterFactory()
+        for algorithm, arguments in [("RunBased", {"files_per_job": 1}),
+                                     ("MergeBySize", {"merge_size": 1000,
+                                                      "all_files": True})]:
+            testSubscription = Subscription(fileset = testFileset,
+                                            workflow = testWorkflow,
+                                            split_algo = algorithm,
+                                            type = "Processing")
+            batches = []
+            jobFactory = splitter(testSubscription)
+            nGroups = jobFactory.stream(handler = batches.append,
+                                        maxJobsPerGroup = 3, **arguments)
+            self.assertEqual(nGroups, 4)
+
+            jobNames = []
+            for jobGroups in batches:
+                for jobGroup in jobGroups:
+                    jobNames.extend([job["name"] for job in jobGroup.jobs])
+            self.assertEqual(len(jobNames), 10)
+            self.assertEqual(len(set(jobNames)), 10)
+        return
+
 if __name__ == '__main__':
     unittest.main()
@@ -20,6 +20,7 @@ from WMCore.WMFactory import WMFactory
 from WMCore.Database.CMSCouch import CouchServer
 
 from WMCore.JobStateMachine.ChangeState import ChangeState, Transitions
+from WMCore.JobStateMachine.ChangeState import summarizeReport
 
 from WMCore.WMBS.Job import Job
 from WMCore.WMBS.File import File
@@ -147,6 +148,9 @@ class TestChangeState(unittest.TestCase):
 
         testJobADoc = change.jobsdatabase.document(testJobA["couch_record"])
 
+        self.assertEqual(sorted(testJobADoc["states"].keys()), ["0", "1", "2"])
+        self.assertEqual(testJobADoc["states"]["2"]["oldstate"], "created")
+        self.assertEqual(testJobADoc["states"]["2"]["newstate"], "executing")
         for transition in testJobADoc["states"].itervalues():
             self.assertTrue(type(transition["timestamp"]) in (types.IntType,
                                                              types.LongType))
@@ -776,6 +780,50 @@ class TestChangeState(unittest.TestCase):
         del testJobA["fwjr"]
 
         change.propagate([testJobA], 'jobcooloff', 'jobfailed', updatesummary = True)
+
+        fwjrDoc = changeStateDB.document(fwjrDoc["_id"])
+        self.assertEqual(fwjrDoc['state'], 'jobcooloff',
+                         "Error: summary doesn't have the expected job state")
+        self.assertEqual(fwjrDoc['state_history'][-1]['oldstate'], 'jobfailed')
+        self.assertEqual(fwjrDoc['state_history'][-1]['newstate'], 'jobcooloff')
+        return
+
+    def testSummarizeReport(self):
+        """
+        _testSummarizeReport_
+
+        Verify that the job summary has the lumis compacted into ranges and
+        that the input files, output files and error details are capped.
+        """
+        myReport = Report()
+        reportPath = os.path.join(getTestBase(),
+                                  "WMCore_t/JobStateMachine_t/Report.pkl")
+        myReport.unpersist(reportPath)
+        myReport.addStep("cmsRun2", status = 0)
+        for i in range(3):
+            myReport.addInputFile("source", lfn = "/store/data/input%i.root" % i,
+                                  input_type = "primaryFiles",
+                                  runs = [Run(132372, *range(23 + i * 10, 33 + i * 10)),
+                                          Run(132373, 1 + i)])
+
+        summary = summarizeReport(myReport)
+        self.assertEqual(summary["lumis"], {"132372": [[22, 52]], "132373": [[1, 3]]})
+        self.assertEqual(len(summary["inputfiles"]), 4)
+        self.assertEqual(summary["inputfiles"][1], {"lfn": "/store/data/input0.root",
+                                                    "input_type": "primaryFiles"})
+        self.assertEqual(len(summary["output"]), 2)
+        self.assertEqual(summary["output"][0]["type"], "output")
+        self.assertEqual(summary["outputdataset"]["dataTier"], "RECO")
+        self.assertEqual(summary["errors"].keys(), ["stageOut1"])
+        self.assertEqual(summary["errors"]["stageOut1"][0]["exitCode"], 1)
+        self.assertFalse("truncated" in summary)
+
+        summary = summarizeReport(myReport, maxFiles = 1, maxErrorLength = 10)
+        self.assertEqual(len(summary["inputfiles"]), 1)
+        self.assertEqual(len(summary["output"]), 1)
+        self.assertEqual(summary["errors"]["stageOut1"][0]["details"], "StageOutFa")
+        self.assertEqual(summary["truncated"], {"inputfiles": 3, "output": 1, "errors": 1})
+        self.assertEqual(summary["lumis"], {"132372": [[22, 52]], "132373": [[1, 3]]})
         return
 
 
@@ -47,6 +47,7 @@ from WMCore.Agent.Configuration             import Configuration
 # WMCore library imports
 from WMCore.ResourceControl.ResourceControl  import ResourceControl
 from WMCore.FwkJobReport.Report              import Report
+from WMCore.Cache.JobCacheStore             import JobCacheReader
 
 # WMSpec stuff
 from WMCore.WMSpec.Makers.TaskMaker import TaskMaker
@@ -440,11 +441,8 @@ class WMAgentTest(unittest.TestCase):
 
         # First job should be in here
         self.assertTrue('job_1' in os.listdir(groupDirectory))
-        jobFile = os.path.join(groupDirectory, 'job_1', 'job.pkl')
-        self.assertTrue(os.path.isfile(jobFile))
-        f = open(jobFile, 'r')
-        job = cPickle.load(f)
-        f.close()
+        job = JobCacheReader().loadJob(1, os.path.join(groupDirectory, 'job_1'))
+        self.assertNotEqual(job, None)
 
 
         self.assertEqual(job['workflow'], name)
@@ -0,0 +1,27 @@
+"""
+_ProcessPoolCrashWorker_
+
+"""
+
+import os
+
+from WMCore.ProcessPool.ProcessPool import ProcessPoolWorker
+
+class ProcessPoolCrashWorker(ProcessPoolWorker):
+
+    def __call__(self, input):
+        """
+        __call__
+
+        Kill the slave the first time it gets a CRASH:<marker file> input,
+        raise an exception for RAISE and echo anything else.
+        """
+        if input.startswith("CRASH:"):
+            markerFile = input.split(":", 1)[1]
+            if not os.path.exists(markerFile):
+                open(markerFile, "w").close()
+                os._exit(1)
+        if input == "RAISE":
+            raise RuntimeError("Cannot process this input")
+
+        return input
@@ -4,10 +4,11 @@ _ProcessPool_t
 Unit tests for the ProcessPool class.
 """
 
+import os
 import unittest
 import nose
 
-from WMCore.ProcessPool.ProcessPool import ProcessPool
+from WMCore.ProcessPool.ProcessPool import ProcessPool, ProcessPoolException
 from WMQuality.TestInit import TestInit
 
 class ProcessPoolTest(unittest.TestCase):
@@ -122,8 +123,42 @@ class ProcessPoolTest(unittest.TestCase):
             self.assertEqual(len(result), len(input),
                              "Error: Wrong number of results returned.")
 
+    def testD_FastMode(self):
+        """
+        _testFastMode_
+
+        Run batches of work through ipc sockets, kill a slave and make sure
+        its work is done by the others and it is restarted.
+        """
+        config = self.testInit.getConfiguration()
+        config.Agent.useHeartbeat = False
+        self.testInit.generateWorkDir(config)
+
+        processPool = ProcessPool("ProcessPool_t.ProcessPoolCrashWorker",
+                                  totalSlaves = 3,
+                                  componentDir = config.General.workDir,
+                                  namespace = "WMCore_t",
+                                  config = config,
+                                  fastMode = True,
+                                  batchSize = 50)
 
+        markerFile = os.path.join(config.General.workDir, "crashed")
+        input = ["COMMAND%s" % i for i in range(1000)]
+        input.append("CRASH:%s" % markerFile)
+        processPool.enqueue(input)
+        result = processPool.dequeue(len(input))
 
+        self.assertEqual(sorted(result), sorted(input))
+        stats = processPool.getWorkerStats()
+        self.assertEqual(sum([x["items"] for x in stats]), len(input))
+        self.assertEqual(sum([x["starts"] for x in stats]), 4)
+
+        processPool.enqueue(["One", "RAISE", "Two"])
+        self.assertRaises(ProcessPoolException, processPool.dequeue, 3)
+        self.assertEqual(sorted(processPool.dequeue(2)), ["One", "Two"])
+
+        processPool.close()
+        return
 
 
 if __name__ == "__main__":
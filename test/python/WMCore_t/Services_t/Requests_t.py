@@ -12,6 +12,9 @@ import time
 import tempfile
 import shutil
 import nose
+import threading
+import BaseHTTPServer
+import SocketServer
 from httplib import HTTPException
 from WMCore.DataStructs.Run import Run
 from WMCore.DataStructs.Mask import Mask
@@ -207,6 +210,99 @@ class testRepeatCalls(RESTBaseUnitTest):
         self.assertEqual(result[3], False)
         self.assertEqual(result[1], 200)
 
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Keep-alive server answering with the client port, /slow takes a while
+    and /drop closes the socket without telling the client.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path not in ["/", "/slow", "/drop"]:
+            self.send_error(404)
+            return
+        if self.path == "/slow":
+            time.sleep(0.2)
+        body = str(self.client_address[1])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path == "/drop":
+            self.close_connection = 1
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+class testConnectionPool(unittest.TestCase):
+    """
+    Test the shared connection pool against a local stub server
+    """
+    def setUp(self):
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.serverThread = threading.Thread(target = self.server.serve_forever)
+        self.serverThread.setDaemon(True)
+        self.serverThread.start()
+        self.urlbase = "http://127.0.0.1:%s" % self.server.server_address[1]
+        self.idict = {'cachepath': None}
+        Requests.getConnectionPool().clear()
+
+    def tearDown(self):
+        Requests.getConnectionPool().clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def testSharedConnections(self):
+        """Requests to the same endpoint reuse the same socket"""
+        reqA = Requests.Requests(self.urlbase, self.idict)
+        reqB = Requests.Requests(self.urlbase, self.idict)
+        portA = reqA.get('/')[0]
+        portB = reqB.get('/')[0]
+        self.assertEqual(portA, portB)
+        self.assertEqual(reqA.get('/')[0], portA)
+        self.assertEqual(reqA.getPoolKey(), reqB.getPoolKey())
+
+        private = Requests.Requests(self.urlbase, {'cachepath': None,
+                                                   'connection_pool': False})
+        self.assertNotEqual(private.get('/')[0], portA)
+
+    def testStaleConnection(self):
+        """A socket closed by the server is replaced"""
+        req = Requests.Requests(self.urlbase, self.idict)
+        port = req.get('/drop')[0]
+        result = req.get('/')
+        self.assertEqual(result[1], 200)
+        self.assertNotEqual(result[0], port)
+
+    def testIdleEviction(self):
+        """Idle connections are closed"""
+        pool = Requests.getConnectionPool()
+        req = Requests.Requests(self.urlbase, self.idict)
+        port = req.get('/')[0]
+        evicted = pool.stats["evicted"]
+        pool.lock.acquire()
+        pool.evict(idleTimeout = 0)
+        pool.lock.release()
+        self.assertEqual(pool.stats["evicted"], evicted + 1)
+        self.assertNotEqual(req.get('/')[0], port)
+
+    def testConcurrentRequests(self):
+        """Requests run in parallel on bounded connections"""
+        pool = Requests.getConnectionPool()
+        req = Requests.Requests(self.urlbase, self.idict)
+        requests = [{'uri': '/slow'}] * 20
+        requests.append({'uri': '/thispagedoesntexist'})
+        start = time.time()
+        results = req.makeConcurrentRequests(requests, maxThreads = 10)
+        self.assertTrue(time.time() - start < 2)
+        self.assertEqual([x[1] for x in results[:20]], [200] * 20)
+        self.assertTrue(isinstance(results[20], HTTPException))
+        self.assertTrue(len(set([x[0] for x in results[:20]])) <= pool.maxSize)
+
 class testJSONRequests(unittest.TestCase):
     def setUp(self):
         self.testInit = TestInit(__file__)
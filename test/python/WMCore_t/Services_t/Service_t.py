@@ -38,6 +38,13 @@ class CrappyRequest(Requests):
         # METAL \m/
         raise BadStatusLine(666)
 
+class CountingRequest(Requests):
+    calls = 0
+    def makeRequest(self, uri=None, data={}, verb='GET', incoming_headers={},
+                     encoder=True, decoder=True, contentType=None):
+        CountingRequest.calls += 1
+        return "call %s" % CountingRequest.calls, 200, 'OK', False
+
 class RegularServer(object):
     def regular(self):
         return "This is silly."
@@ -258,6 +265,27 @@ class ServiceTest(unittest.TestCase):
 
         service.cacheFileName(cache)
 
+    def testMemoryCache(self):
+        """Data served from memory until cleared"""
+        dict = {'logger': self.logger,
+                'endpoint':'http://cmssw.cvs.cern.ch',
+                'memorycacheduration': 1,
+                'requests': CountingRequest}
+        service = Service(dict)
+        CountingRequest.calls = 0
+        service.clearCache('memorycachetest')
+
+        self.assertEqual(service.refreshCache('memorycachetest', '/').read(), 'call 1')
+        self.assertEqual(service.refreshCache('memorycachetest', '/').read(), 'call 1')
+        self.assertEqual(service.refreshCache('memorycachetest', '/',
+                                              inputdata = {'a': 1}).read(), 'call 2')
+        self.assertTrue(service.memoryCacheStats()['hits'] > 0)
+
+        service.clearCache('memorycachetest')
+        self.assertEqual(service.refreshCache('memorycachetest', '/').read(), 'call 3')
+        self.assertEqual(service.forceRefresh('memorycachetest', '/').read(), 'call 4')
+        self.assertEqual(service.refreshCache('memorycachetest', '/').read(), 'call 4')
+
     def testCacheFileName(self):
         """Hash url + data to get cache file name"""
         hashes = {}
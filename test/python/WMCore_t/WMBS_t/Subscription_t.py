@@ -1109,6 +1109,45 @@ class SubscriptionTest(unittest.TestCase):
 
         return
 
+    def testListIncompleteMarksDAO(self):
+        """
+        _testListIncompleteMarksDAO_
+
+        Test the Subscription.ListIncompleteMarks DAO object and verify that
+        the marks change when files are acquired, added or when the fileset
+        is closed.
+        """
+        (testSubscription, testFileset, testWorkflow,
+         testFileA, testFileB, testFileC) = self.createSubscriptionWithFileABC()
+        testSubscription.create()
+
+        subMarks = self.daofactory(classname = "Subscriptions.ListIncompleteMarks")
+
+        marks = subMarks.execute()
+        self.assertEqual(len(marks), 2)
+        self.assertEqual(marks[testSubscription["id"]], (3, testFileC["id"], 0))
+        otherSub = [subID for subID in marks.keys() if subID != testSubscription["id"]][0]
+        self.assertEqual(marks[otherSub], (1, testFileC["id"], 0))
+
+        testSubscription.acquireFiles([testFileC])
+        marks = subMarks.execute()
+        self.assertEqual(marks[testSubscription["id"]], (2, testFileB["id"], 0))
+
+        testFileD = File(lfn = "/this/is/a/lfnD", size = 1024, events = 20,
+                         locations = set(["goodse.cern.ch"]))
+        testFileD.create()
+        testFileset.addFile(testFileD)
+        testFileset.markOpen(True)
+        testFileset.commit()
+
+        marks = subMarks.execute()
+        self.assertEqual(marks[testSubscription["id"]], (3, testFileD["id"], 1))
+        self.assertEqual(marks[otherSub], (2, testFileD["id"], 1))
+
+        testSubscription.completeFiles([testFileA, testFileB, testFileC, testFileD])
+        self.assertEqual(subMarks.execute().keys(), [otherSub])
+        return
+
     def testGetJobGroups(self):
         """
         _testGetJobGroups_
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+    AvailableWorkIndex unit tests
+"""
+
+import random
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.WorkQueue.DataStructs.AvailableWorkIndex import AvailableWorkIndex, ELEMENT_KEY
+from WMCore.WorkQueue.DataStructs.WorkQueueElement import WorkQueueElement
+
+def elementDoc(elementId, timestamp = 0, **params):
+    """Couch document of an element"""
+    params.setdefault('Status', 'Available')
+    params.setdefault('Jobs', 1)
+    return {'_id' : elementId, '_rev' : '1-0', 'timestamp' : timestamp,
+            'updatetime' : timestamp, ELEMENT_KEY : dict(WorkQueueElement(**params))}
+
+class AvailableWorkIndexTest(unittest.TestCase):
+
+    def testRestrictions(self):
+        """Only elements that can run at the sites are selected, by priority"""
+        index = AvailableWorkIndex()
+        index.update(elementDoc('low', Priority = 1))
+        index.update(elementDoc('high', Priority = 10))
+        index.update(elementDoc('old', Priority = 1, timestamp = -3600 * 5))
+        index.update(elementDoc('data', Priority = 5, Inputs = {'/a/b/c#1' : ['A', 'B']}))
+        index.update(elementDoc('nodata', Priority = 5, Inputs = {'/a/b/c#2' : ['B']}))
+        index.update(elementDoc('white', Priority = 4, SiteWhitelist = ['A']))
+        index.update(elementDoc('black', Priority = 4, SiteBlacklist = ['A']))
+        index.update(elementDoc('parent', Priority = 3, Inputs = {'/a/b/c#3' : ['A']},
+                                ParentFlag = True, ParentData = {'/a/b/d#1' : ['B']}))
+        index.update(elementDoc('team', Priority = 2, TeamName = 'other'))
+        index.update(elementDoc('acquired', Priority = 20, Status = 'Acquired'))
+        self.assertEqual(len(index), 9)
+
+        work, conditions = index.availableWork({'A' : 100}, teams = ['mine'])
+        self.assertEqual([x['_id'] for x in work], ['high', 'old', 'data', 'white', 'low'])
+        self.assertEqual(conditions, {'A' : 95})
+        for doc in work:
+            self.assertTrue(WorkQueueElement(**doc[ELEMENT_KEY]).passesSiteRestriction('A'))
+
+        work, conditions = index.availableWork({'A' : 100}, wfs = ['wf'])
+        self.assertEqual(work, [])
+
+        work, conditions = index.availableWork({'B' : 100})
+        self.assertEqual([x['_id'] for x in work],
+                         ['high', 'old', 'data', 'nodata', 'black', 'team', 'low'])
+
+    def testSlots(self):
+        """Elements take the slots of the site they go to"""
+        index = AvailableWorkIndex()
+        for i in range(10):
+            index.update(elementDoc(str(i), Priority = 10 - i, Jobs = 10,
+                                    Inputs = {'/a/b/c#%i' % i : ['A', 'B']}))
+        index.update(elementDoc('onlyC', Priority = 0, Jobs = 10, SiteWhitelist = ['C']))
+
+        work, conditions = index.availableWork({'A' : 15, 'B' : 5, 'C' : 5})
+        # A takes two elements, B and C one each
+        self.assertEqual([x['_id'] for x in work], ['0', '1', '2', 'onlyC'])
+        self.assertEqual(conditions, {})
+
+        work, conditions = index.availableWork({'A' : 1000})
+        self.assertEqual(len(work), 10)
+        self.assertEqual(conditions, {'A' : 900})
+
+    def testUpdates(self):
+        """Changed elements are moved or dropped"""
+        index = AvailableWorkIndex()
+        index.update(elementDoc('1', Priority = 1, SiteWhitelist = ['A']))
+        index.update(elementDoc('2', Priority = 2, SiteWhitelist = ['A']))
+        index.update(elementDoc('3', Priority = 3))
+        index.update(elementDoc('1', Priority = 5, SiteWhitelist = ['A']))
+        work, _ = index.availableWork({'A' : 100})
+        self.assertEqual([x['_id'] for x in work], ['1', '3', '2'])
+
+        index.update(elementDoc('1', Priority = 5, Status = 'Acquired'))
+        index.remove('3')
+        index.remove('unknown')
+        work, _ = index.availableWork({'A' : 100})
+        self.assertEqual([x['_id'] for x in work], ['2'])
+        self.assertEqual(index.bySite.keys(), ['A'])
+        self.assertEqual(index.anySite, [])
+
+        index.update(elementDoc('2', Priority = 2, SiteWhitelist = ['B']))
+        self.assertEqual(index.bySite.keys(), ['B'])
+
+    @attr('performance')
+    def testPerformance(self):
+        """Fill the slots of 500 sites from 100k elements"""
+        nElements = 100000
+        sites = ['T2_XX_Site%i' % x for x in range(500)]
+        random.seed(1)
+        docs = []
+        for i in range(nElements):
+            params = {'Priority' : random.randint(1, 100), 'Jobs' : random.randint(1, 50)}
+            if i % 10:
+                params['Inputs'] = {'/a/b/c#%i' % i : random.sample(sites, random.randint(1, 3))}
+            if i % 7 == 0:
+                params['SiteBlacklist'] = random.sample(sites, 5)
+            docs.append(elementDoc('element%i' % i, timestamp = random.randint(0, 3600), **params))
+
+        startTime = time.time()
+        index = AvailableWorkIndex()
+        for doc in docs:
+            index.update(doc)
+        buildTime = time.time() - startTime
+
+        # the selection availableWork did from the sorted list output
+        startTime = time.time()
+        elements = [WorkQueueElement(**x[ELEMENT_KEY]) for x in docs]
+        elements.sort(key = lambda x: x['Priority'], reverse = True)
+        conditions = dict([(x, 100) for x in sites])
+        scanned = []
+        for element in elements:
+            names = conditions.keys()
+            random.shuffle(names)
+            for site in names:
+                if element.passesSiteRestriction(site):
+                    scanned.append(element)
+                    slots_left = conditions[site] - element['Jobs']
+                    if slots_left > 0:
+                        conditions[site] = slots_left
+                    else:
+                        conditions.pop(site, None)
+                    break
+            if not conditions:
+                break
+        scanTime = time.time() - startTime
+
+        startTime = time.time()
+        work, conditions = index.availableWork(dict([(x, 100) for x in sites]))
+        indexTime = time.time() - startTime
+        self.assertEqual(conditions, {})
+
+        # changes feed with 1% of the elements acquired
+        startTime = time.time()
+        for doc in docs[::100]:
+            doc[ELEMENT_KEY]['Status'] = 'Acquired'
+            index.update(doc)
+        updateTime = time.time() - startTime
+        self.assertEqual(len(index), nElements - len(docs[::100]))
+
+        print "\n  %i elements, %i sites: index built in %.2f s, %i updates in %.3f s" % \
+              (nElements, len(sites), buildTime, len(docs[::100]), updateTime)
+        print "  %i elements selected from the index in %.3f s, %i by scanning all elements in %.2f s" % \
+              (len(work), indexTime, len(scanned), scanTime)
+
+if __name__ == '__main__':
+    unittest.main()
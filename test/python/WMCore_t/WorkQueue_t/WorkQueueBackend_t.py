@@ -93,5 +93,33 @@ class WorkQueueBackendTest(unittest.TestCase):
         self.assertEqual(len(self.backend.db.allDocs()['rows']), 4) # design doc + workflow + 2 elements
         self.assertEqual(self.backend.db.loadView('WorkQueue', 'conflicts')['total_rows'], 0)
 
+    def testAvailableWorkIndex(self):
+        """Work from the index follows the changes feed"""
+        indexBackend = WorkQueueBackend(db_url = self.testInit.couchUrl,
+                                        db_name = 'wq_backend_test',
+                                        inbox_name = 'wq_backend_test_inbox',
+                                        useIndex = True)
+        elements = [WorkQueueElement(RequestName = 'backend_test_%i' % i,
+                                     WMSpec = self.processingSpec,
+                                     Status = 'Available', Jobs = 10,
+                                     Priority = i,
+                                     SiteWhitelist = i % 2 and ['place'] or [])
+                    for i in range(4)]
+        self.backend.insertElements(elements)
+
+        work = self.backend.availableWork({'place' : 1000})[0]
+        indexWork = indexBackend.availableWork({'place' : 1000})[0]
+        self.assertEqual([x.id for x in indexWork], [x.id for x in work])
+        self.assertEqual([x['RequestName'] for x in indexWork],
+                         ['backend_test_3', 'backend_test_2', 'backend_test_1', 'backend_test_0'])
+        self.assertEqual(indexWork[0].rev, work[0].rev)
+        self.assertEqual(indexBackend.availableWork({'elsewhere' : 1000})[0][0]['RequestName'],
+                         'backend_test_2')
+
+        self.backend.updateElements(work[0].id, Status = 'Acquired')
+        indexWork = indexBackend.availableWork({'place' : 1000})[0]
+        self.assertEqual([x['RequestName'] for x in indexWork],
+                         ['backend_test_2', 'backend_test_1', 'backend_test_0'])
+
 if __name__ == '__main__':
     unittest.main()